@@ -1,98 +1,273 @@
-import json
+import os
+import sys
+import math
+import time
 import numpy as np
 
 import gurobipy as gp
 
-with open("Data4.json", "r") as f:
-    data = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from comun.backend import optimize
+from comun.cli import apply_params, script_args
+from comun.instances import load_instance
+from comun.instrumentation import Profiler
+from comun.lint import clean_model
+from comun.results import extract_results, make_results, status_name, symbols
+
+# "assignment": ItemInBin[i, b] model with B = N candidate bins
+# "set_covering": master over feasible bin patterns priced by a knapsack subproblem
+SOLVE_MODE = "assignment"
+# Run FFD/BFD and the Martello-Toth L2 bound first: skip the solver when they
+# match, otherwise use the heuristic packing as bin count and MIP start
+HEURISTIC_PRESOLVE = True
+
+# Drop constant, duplicate and bound-only rows before optimize (see comun/lint.py)
+CLEAN_MODEL = True
+
+args = script_args("Data4.json", globals())
+profiler = Profiler(args.trace_memory)
+
+profiler.phase("load")
+data = load_instance(args.data, args.prefer_binary)
 
 
 BinCapacity = data["BinCapacity"]
 N = data["N"]
 ItemSizes = data["ItemSizes"]
 
-# Define the number of bins
-B = N
+# ====== Heuristic bounds ====== 
+profiler.phase("build")
 
-# Define model
-model = gp.Model('model')
+def first_fit_decreasing(sizes, capacity):
+    bins, loads = [], []
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i]):
+        for b in range(len(bins)):
+            if loads[b] + sizes[i] <= capacity:
+                bins[b].append(i)
+                loads[b] += sizes[i]
+                break
+        else:
+            bins.append([i])
+            loads.append(sizes[i])
+    return bins
 
 
-# ====== Define variables ====== 
-ItemInBin = model.addVars(N, B, name='ItemInBin', vtype=gp.GRB.BINARY)
-BinUsed = model.addVars(B, name='BinUsed', vtype=gp.GRB.BINARY)
-TotalBinsUsed = model.addVar(name='TotalBinsUsed', vtype=gp.GRB.INTEGER)
+def best_fit_decreasing(sizes, capacity):
+    bins, loads = [], []
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i]):
+        fits = [b for b in range(len(bins)) if loads[b] + sizes[i] <= capacity]
+        if fits:
+            b = max(fits, key=lambda b: loads[b])
+            bins[b].append(i)
+            loads[b] += sizes[i]
+        else:
+            bins.append([i])
+            loads.append(sizes[i])
+    return bins
 
-# ====== Define constraints ====== 
 
-for b in range(B):
-    model.addConstr(gp.quicksum(ItemSizes[i] * ItemInBin[i, b] for i in range(N)) <= BinCapacity * BinUsed[b], name=f"bin_capacity_{b}")
+def martello_toth_l2(sizes, capacity):
+    # max over K of |J1| + |J2| + ceil((sum J3 - free space in J2 bins) / capacity)
+    bound = math.ceil(sum(sizes) / capacity)
+    for k in {0} | {s for s in sizes if s <= capacity / 2}:
+        j1 = [s for s in sizes if s > capacity - k]
+        j2 = [s for s in sizes if capacity / 2 < s <= capacity - k]
+        j3 = [s for s in sizes if k <= s <= capacity / 2]
+        overflow = sum(j3) - (len(j2) * capacity - sum(j2))
+        bound = max(bound, len(j1) + len(j2) + max(0, math.ceil(overflow / capacity)))
+    return bound
 
-for i in range(N):
-    model.addConstr(gp.quicksum(ItemInBin[i, b] for b in range(B)) == 1, name=f"assign_item_{i}_to_one_bin")
 
-for i in range(N):
-    model.addConstr(ItemSizes[i] >= 0, name=f"non_negativity_item_{i}")
+if HEURISTIC_PRESOLVE:
+    heuristic_start = time.time()
+    heuristic_bins = min(first_fit_decreasing(ItemSizes, BinCapacity), best_fit_decreasing(ItemSizes, BinCapacity), key=len)
+    lower_bound = martello_toth_l2(ItemSizes, BinCapacity)
+    heuristic_runtime = time.time() - heuristic_start
+    print(f"Heurística: {len(heuristic_bins)} contenedores, cota inferior L2: {lower_bound}")
+    if len(heuristic_bins) == lower_bound:
+        SOLVE_MODE = "heuristic"
 
-model.addConstr(gp.quicksum(BinUsed[b] for b in range(B)) >= 0, name="non_negative_bins_used")
+if SOLVE_MODE == "set_covering":
+    # Items of equal size are interchangeable: cover each size with its multiplicity
+    Sizes, SizeCount = np.unique(ItemSizes, return_counts=True)
+    Sizes, SizeCount = Sizes[::-1].tolist(), SizeCount[::-1].tolist()
+    T = len(Sizes)
+    # Initial patterns: as many items of a single size as fit in one bin
+    BinPatterns = [[min(SizeCount[t], int(BinCapacity // Sizes[t])) if u == t else 0 for u in range(T)] for t in range(T)]
+    if HEURISTIC_PRESOLVE:
+        for contents in heuristic_bins:
+            pattern = [sum(1 for i in contents if ItemSizes[i] == Sizes[t]) for t in range(T)]
+            if pattern not in BinPatterns:
+                BinPatterns.append(pattern)
+    P = len(BinPatterns)
 
-# ====== Define objective ====== 
+    # Define model
+    profiler.phase("build")
+    model = gp.Model('model')
+    apply_params(model, args)
+    profiler.watch(model)
 
-model.setObjective(gp.quicksum(BinUsed[b] for b in range(B)), gp.GRB.MINIMIZE)
+    # ====== Define variables ====== 
+    PatternUsed = model.addVars(P, name='PatternUsed', vtype=gp.GRB.CONTINUOUS)
 
-# Optimize model
-model.optimize()
+    # ====== Define constraints ====== 
+    cover_size = [
+        model.addConstr(gp.quicksum(BinPatterns[p][t] * PatternUsed[p] for p in range(P)) >= SizeCount[t], name=f"cover_size_{t}")
+        for t in range(T)
+    ]
+
+    # ====== Define objective ====== 
+    model.setObjective(gp.quicksum(PatternUsed[p] for p in range(P)), gp.GRB.MINIMIZE)
+
+    # ====== Column generation ====== 
+    profiler.phase("column_generation")
+
+    # Pricing: bounded knapsack over the item sizes with the cover_size duals as profits
+    pricing = gp.Model('pricing')
+    pricing.Params.OutputFlag = 0
+    Items = pricing.addVars(T, name='Items', vtype=gp.GRB.INTEGER, ub=[min(SizeCount[t], int(BinCapacity // Sizes[t])) for t in range(T)])
+    pricing.addConstr(gp.quicksum(Sizes[t] * Items[t] for t in range(T)) <= BinCapacity, name="bin_capacity")
+    pricing.ModelSense = gp.GRB.MAXIMIZE
+
+    # Quiet master LPs; the log setting given on the command line comes back for the integer solve
+    output_flag = model.Params.OutputFlag
+    model.Params.OutputFlag = 0
+    while True:
+        solution = optimize(model, args.backend)
+        pricing.setAttr("Obj", Items, solution.getAttr("Pi", cover_size))
+        pricing_solution = optimize(pricing, args.backend, share=False)
+        if 1 - pricing_solution.ObjVal > -1e-6:
+            break
+        new_items = pricing_solution.getAttr("X", Items)
+        new_pattern = [int(round(new_items[t])) for t in range(T)]
+        coeffs = [(new_pattern[t], cover_size[t]) for t in range(T) if new_pattern[t] > 0]
+        PatternUsed[P] = model.addVar(obj=1, vtype=gp.GRB.CONTINUOUS, name=f"PatternUsed[{P}]",
+                                      column=gp.Column([c for c, _ in coeffs], [r for _, r in coeffs]))
+        BinPatterns.append(new_pattern)
+        P += 1
+
+    lp_bound = solution.ObjVal
+    print(f"Generación de columnas: {P} patrones, cota LP {lp_bound} (mínimo {math.ceil(lp_bound - 1e-6)} contenedores)")
+
+    # Integer solve restricted to the generated patterns
+    profiler.phase("build")
+    for p in range(P):
+        PatternUsed[p].VType = gp.GRB.INTEGER
+    model.Params.OutputFlag = output_flag
+elif SOLVE_MODE == "assignment":
+    # Define the number of bins
+    B = len(heuristic_bins) if HEURISTIC_PRESOLVE else N
+
+    # Define model
+    profiler.phase("build")
+    model = gp.Model('model')
+    apply_params(model, args)
+    profiler.watch(model)
+
+
+    # ====== Define variables ====== 
+    ItemInBin = model.addVars(N, B, name='ItemInBin', vtype=gp.GRB.BINARY)
+    BinUsed = model.addVars(B, name='BinUsed', vtype=gp.GRB.BINARY)
+    TotalBinsUsed = model.addVar(name='TotalBinsUsed', vtype=gp.GRB.INTEGER)
+
+    # ====== Define constraints ====== 
 
+    for b in range(B):
+        model.addConstr(gp.quicksum(ItemSizes[i] * ItemInBin[i, b] for i in range(N)) <= BinCapacity * BinUsed[b], name=f"bin_capacity_{b}")
 
-# Get model status
-status = model.status
+    for i in range(N):
+        model.addConstr(gp.quicksum(ItemInBin[i, b] for b in range(B)) == 1, name=f"assign_item_{i}_to_one_bin")
+
+    for i in range(N):
+        model.addConstr(bool(ItemSizes[i] >= 0), name=f"non_negativity_item_{i}")
+
+    model.addConstr(gp.quicksum(BinUsed[b] for b in range(B)) >= 0, name="non_negative_bins_used")
+
+    # ====== Define objective ====== 
+
+    model.setObjective(gp.quicksum(BinUsed[b] for b in range(B)), gp.GRB.MINIMIZE)
+
+    if HEURISTIC_PRESOLVE:
+        # Bins are interchangeable: use them in order
+        for b in range(B - 1):
+            model.addConstr(BinUsed[b] >= BinUsed[b + 1], name=f"bin_order_{b}")
+
+        # MIP start from the heuristic packing
+        for b, contents in enumerate(heuristic_bins):
+            BinUsed[b].Start = 1
+            for i in range(N):
+                ItemInBin[i, b].Start = 1 if i in contents else 0
+
+# Optimize model
+if SOLVE_MODE == "heuristic":
+    status = gp.GRB.OPTIMAL
+else:
+    if CLEAN_MODEL:
+        clean_model(model)
+    profiler.phase("optimize")
+    solution = optimize(model, args.backend)
+
+    # Get model status
+    status = solution.Status
+    if SOLVE_MODE == "set_covering" and status == gp.GRB.OPTIMAL and solution.ObjVal > math.ceil(lp_bound - 1e-6) + 1e-6:
+        # Price-and-branch: optimal over the generated patterns only, proven
+        # optimal for the bin packing only when it meets the rounded LP bound
+        status = gp.GRB.SUBOPTIMAL
 
 
 # Get solver information
-solving_info = {}
+profiler.phase("extract")
+if SOLVE_MODE == "heuristic":
+    # The heuristic packing meets the lower bound: no model was built
+    assignment = [(i, b) for b, contents in enumerate(heuristic_bins) for i in contents]
+    solving_info = make_results(status, len(heuristic_bins), {"ItemInBin": (assignment, np.ones(len(assignment)))}, heuristic_runtime, 0)
+elif SOLVE_MODE == "set_covering":
+    solving_info = extract_results(solution, {"PatternUsed": PatternUsed})
+    solving_info["status"] = status_name(status)
+    solving_info["lp_bound"] = lp_bound
+    if status == gp.GRB.SUBOPTIMAL:
+        solving_info["mip_gap"] = (solution.ObjVal - math.ceil(lp_bound - 1e-6)) / solution.ObjVal
+        print(f"Solución entera sobre los patrones generados: {solution.ObjVal} contenedores, "
+              f"no probada óptima (cota LP {lp_bound}, mínimo {math.ceil(lp_bound - 1e-6)})")
+else:
+    solving_info = extract_results(solution, {"ItemInBin": ItemInBin, "BinUsed": BinUsed, "TotalBinsUsed": TotalBinsUsed})
+
+profiler.stop()
+solving_info["profile"] = profiler.record()
 
 if status == gp.GRB.OPTIMAL:
-    solving_info["status"] = "Optimal (2)"
-    solving_info["objective_value"] = model.objVal
-    solving_info["variables"] = [
-        {
-            "symbol": var.VarName,
-            "value": var.X,
-        }
-        for var in model.getVars()
-    ]
-    solving_info["runtime"] = model.Runtime
-    solving_info["iteration_count"] = model.IterCount
-    
     ## Añadido para mostrar información por consola
     print("----------------- Modelo optimizado con éxito. ---------------")
     print("Estado:", solving_info["status"])
     print("Valor objetivo:", solving_info["objective_value"])
     print("Variables seleccionadas:")
     total_size = 0
-    for var in solving_info["variables"]:
-        if var['value'] == 1 and var['symbol'].startswith("ItemInBin"):
+    for symbol, value in symbols(solving_info["variables"]):
+        if value == 1 and symbol.startswith("ItemInBin"):
             # Extraer el índice del item
-            parts = var['symbol'].split('[')[1].split(']')[0].split(',')
+            parts = symbol.split('[')[1].split(']')[0].split(',')
             item_idx = int(parts[0])
             total_size += ItemSizes[item_idx]
-            print(f"  {var['symbol']}: {var['value']}")
+            print(f"  {symbol}: {value}")
     print("Tiempo de ejecución:", solving_info["runtime"])
     print("Iteraciones:", solving_info["iteration_count"])
     print("Suma total de los tamaños de los items asignados:", total_size)
-else:
-    status_dict = {
-        gp.GRB.INFEASIBLE: "Infeasible",
-        gp.GRB.INF_OR_UNBD: "Infeasible or Unbounded",
-        gp.GRB.UNBOUNDED: "Unbounded",
-        gp.GRB.OPTIMAL: "Optimal",
-    }
-    solving_info["status"] = (
-        status_dict[model.status] + f" ({model.status})"
-        if model.status in status_dict
-        else status_dict[model.status]
-    )
-    solving_info["objective_value"] = None
-    solving_info["variables"] = []
-    solving_info["runtime"] = None
-    solving_info["iteration_count"] = None
\ No newline at end of file
+
+    if SOLVE_MODE == "set_covering":
+        # Expand the pattern counts into bins, dropping items that are covered twice
+        remaining = {Sizes[t]: [i for i in range(N) if ItemSizes[i] == Sizes[t]] for t in range(T)}
+        bins = []
+        pattern_counts = solution.getAttr("X", PatternUsed)
+        for p in range(P):
+            for _ in range(int(round(pattern_counts[p]))):
+                contents = []
+                for t in range(T):
+                    for _ in range(BinPatterns[p][t]):
+                        if remaining[Sizes[t]]:
+                            contents.append(remaining[Sizes[t]].pop())
+                if contents:
+                    bins.append(contents)
+        for b, contents in enumerate(bins):
+            print(f"  Contenedor {b}: items {contents} (carga {sum(ItemSizes[i] for i in contents)}/{BinCapacity})")
+
+profiler.report()
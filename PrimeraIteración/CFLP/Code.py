@@ -1,9 +1,17 @@
-import json
+import os
+import sys
 import numpy as np
 import gurobipy as gp
 
-with open("Data5.json", "r") as f:
-    data = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from comun.instances import load_instance
+from comun.instrumentation import Profiler
+from comun.results import extract_results, symbols
+
+profiler = Profiler()
+
+profiler.phase("load")
+data = load_instance("Data5.json")
 
 MaxCapacity = data["MaxCapacity"]
 TransportationCost = data["TransportationCost"]
@@ -13,7 +21,9 @@ L = data["L"]
 OpeningCost = data["OpeningCost"]
 
 # Define model
+profiler.phase("build")
 model = gp.Model('model')
+profiler.watch(model)
 
 
 # ====== Define variables ====== 
@@ -41,6 +51,7 @@ for l in range(L):
 model.setObjective(gp.quicksum(OpeningCost[l] * Y[l] for l in range(L)) + gp.quicksum(TransportationCost[l][c] * X[l, c] for l in range(L) for c in range(C)), gp.GRB.MINIMIZE)
 
 # Optimize model
+profiler.phase("optimize")
 model.optimize()
 
 
@@ -49,43 +60,21 @@ status = model.status
 
 
 # Get solver information
-solving_info = {}
+profiler.phase("extract")
+solving_info = extract_results(model, {"X": X, "NumberOfFacilitiesOpened": NumberOfFacilitiesOpened, "Y": Y, "CustomerAssignment": CustomerAssignment})
 
-if status == gp.GRB.OPTIMAL:
-    solving_info["status"] = "Optimal (2)"
-    solving_info["objective_value"] = model.objVal
-    solving_info["variables"] = [
-        {
-            "symbol": var.VarName,
-            "value": var.X,
-        }
-        for var in model.getVars()
-    ]
-    solving_info["runtime"] = model.Runtime
-    solving_info["iteration_count"] = model.IterCount
+profiler.stop()
+solving_info["profile"] = profiler.record()
 
+if status == gp.GRB.OPTIMAL:
     ## Añadido para mostrar información por consola
     print("----------------- Modelo optimizado con éxito. ---------------")
     print("Estado:", solving_info["status"])
     print("Valor objetivo:", solving_info["objective_value"])
     print("Variables seleccionadas:")
-    for var in solving_info["variables"]:
-        print(f"  {var['symbol']}: {var['value']}")
+    for symbol, value in symbols(solving_info["variables"]):
+        print(f"  {symbol}: {value}")
     print("Tiempo de ejecución:", solving_info["runtime"])
     print("Iteraciones:", solving_info["iteration_count"])
-else:
-    status_dict = {
-        gp.GRB.INFEASIBLE: "Infeasible",
-        gp.GRB.INF_OR_UNBD: "Infeasible or Unbounded",
-        gp.GRB.UNBOUNDED: "Unbounded",
-        gp.GRB.OPTIMAL: "Optimal",
-    }
-    solving_info["status"] = (
-        status_dict[model.status] + f" ({model.status})"
-        if model.status in status_dict
-        else status_dict[model.status]
-    )
-    solving_info["objective_value"] = None
-    solving_info["variables"] = []
-    solving_info["runtime"] = None
-    solving_info["iteration_count"] = None
\ No newline at end of file
+
+profiler.report()
@@ -1,9 +1,30 @@
-import json
+import os
+import sys
 import numpy as np
 import gurobipy as gp
 
-with open("DataMod.json", "r") as f:
-    data = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from comun.backend import optimize
+from comun.candidates import cheapest_arcs, solve_with_pricing
+from comun.cli import apply_params, script_args
+from comun.instances import load_instance
+from comun.instrumentation import Profiler
+from comun.lint import clean_model
+from comun.results import extract_results, symbols
+
+# Drop constant, duplicate and bound-only rows before optimize (see comun/lint.py)
+CLEAN_MODEL = True
+
+# None: every facility/customer pair. k: only the k cheapest facilities of each
+# customer, the omitted arcs are priced with the duals and added when they improve
+# (see comun/candidates.py)
+CANDIDATE_ARCS = None
+
+args = script_args("DataMod.json", globals())
+profiler = Profiler(args.trace_memory)
+
+profiler.phase("load")
+data = load_instance(args.data, args.prefer_binary)
 
 
 MaxCapacity = data["MaxCapacity"]
@@ -14,84 +35,95 @@ L = data["L"]
 OpeningCost = data["OpeningCost"]
 
 # Define model
+profiler.phase("build")
 model = gp.Model('model')
+apply_params(model, args)
+profiler.watch(model)
 
 
+if CANDIDATE_ARCS is None:
+    Arcs = np.ones((L, C), dtype=bool)
+else:
+    Arcs = cheapest_arcs(TransportationCost, CANDIDATE_ARCS)
+ArcList = [(l, c) for l, c in np.argwhere(Arcs).tolist()]
+
 # ====== Define variables ====== 
-X = model.addVars(L, C, name='X', vtype=gp.GRB.CONTINUOUS)
+X = model.addVars(ArcList, name='X', vtype=gp.GRB.CONTINUOUS)
 NumberOfFacilitiesOpened = model.addVar(name='NumberOfFacilitiesOpened', vtype=gp.GRB.INTEGER)
 Y = model.addVars(L, name='Y', vtype=gp.GRB.BINARY)
-CustomerAssignment = model.addVars(L, C, name='CustomerAssignment', vtype=gp.GRB.INTEGER)
+CustomerAssignment = model.addVars(ArcList, name='CustomerAssignment', vtype=gp.GRB.INTEGER)
 
 # ====== Define constraints ====== 
 
-for l in range(L):
-    model.addConstr(gp.quicksum(X[l, c] for c in range(C)) <= MaxCapacity[l] * Y[l], name=f"capacity_constraint_{l}")
-    
-for l in range(L):
-    for c in range(C):
-        model.addConstr(X[l, c] <= CustomerDemand[c] * Y[l], name=f"linking_constraint_{l}_{c}")
+capacity_rows = [
+    model.addConstr(X.sum(l, '*') <= MaxCapacity[l] * Y[l], name=f"capacity_constraint_{l}")
+    for l in range(L)
+]
 
-for c in range(C):
-    model.addConstr(gp.quicksum(X[l, c] for l in range(L)) == CustomerDemand[c], name=f'demand_satisfaction_{c}')
+for l, c in ArcList:
+    model.addConstr(X[l, c] <= CustomerDemand[c] * Y[l], name=f"linking_constraint_{l}_{c}")
+
+demand_rows = [
+    model.addConstr(X.sum('*', c) == CustomerDemand[c], name=f'demand_satisfaction_{c}')
+    for c in range(C)
+]
 
 NumberOfFacilitiesOpened = model.addVar(name="NumberOfFacilitiesOpened", vtype=gp.GRB.INTEGER)
 model.addConstr(NumberOfFacilitiesOpened == gp.quicksum(Y[l] for l in range(L)), "facility_count_constraint")
 
-for l in range(L):
-    for c in range(C):
-        model.addConstr(CustomerAssignment[l, c] >= 0, name=f"non_negativity_{l}_{c}")
+for l, c in ArcList:
+    model.addConstr(CustomerAssignment[l, c] >= 0, name=f"non_negativity_{l}_{c}")
 
 # ====== Define objective ====== 
 
-model.setObjective(gp.quicksum(OpeningCost[l] * Y[l] for l in range(L)) + gp.quicksum(TransportationCost[l][c] * X[l, c] for l in range(L) for c in range(C)), gp.GRB.MINIMIZE)
+model.setObjective(gp.quicksum(OpeningCost[l] * Y[l] for l in range(L)) + gp.quicksum(TransportationCost[l][c] * X[l, c] for l, c in ArcList), gp.GRB.MINIMIZE)
+
+
+def add_arc(l, c):
+    # Priced-in arc: X in its demand and capacity rows, plus its linking row
+    X[l, c] = model.addVar(obj=TransportationCost[l][c], name=f"X[{l},{c}]", vtype=gp.GRB.CONTINUOUS,
+                           column=gp.Column([1, 1], [demand_rows[c], capacity_rows[l]]))
+    model.addConstr(X[l, c] <= CustomerDemand[c] * Y[l], name=f"linking_constraint_{l}_{c}")
+
+
+# The pricing keeps handles to the demand and capacity rows, which a customer
+# with a single candidate arc would lose to the cleaning pass
+if CLEAN_MODEL and CANDIDATE_ARCS is None:
+    clean_model(model)
 
 # Optimize model
-model.optimize()
+profiler.phase("optimize")
+if CANDIDATE_ARCS is None:
+    solution = optimize(model, args.backend)
+else:
+    pricing = solve_with_pricing(model, TransportationCost, Arcs, demand_rows, capacity_rows, add_arc,
+                                 [Y[l] for l in range(L)], args.backend)
+    solution = pricing["solution"]
+    print(f"Arcos candidatos: {int(Arcs.sum())} de {L * C} ({pricing['added']['lp']} añadidos por la relajación, "
+          f"{pricing['added']['mip']} por la solución entera, {pricing['added']['overflow']} por el desbordamiento), "
+          f"cota LP {pricing['lp_bound']}, " + ("óptimo certificado para todos los arcos" if pricing["certified"] else "sin certificar"))
 
 
 # Get model status
-status = model.status
+status = solution.Status
 
 
 # Get solver information
-solving_info = {}
+profiler.phase("extract")
+solving_info = extract_results(solution, {"X": X, "NumberOfFacilitiesOpened": NumberOfFacilitiesOpened, "Y": Y, "CustomerAssignment": CustomerAssignment})
 
-if status == gp.GRB.OPTIMAL:
-    solving_info["status"] = "Optimal (2)"
-    solving_info["objective_value"] = model.objVal
-    solving_info["variables"] = [
-        {
-            "symbol": var.VarName,
-            "value": var.X,
-        }
-        for var in model.getVars() if var.X != 0
-    ]
-    solving_info["runtime"] = model.Runtime
-    solving_info["iteration_count"] = model.IterCount
+profiler.stop()
+solving_info["profile"] = profiler.record()
 
+if status == gp.GRB.OPTIMAL:
     ## Añadido para mostrar información por consola
     print("----------------- Modelo optimizado con éxito. ---------------")
     print("Estado:", solving_info["status"])
     print("Valor objetivo:", solving_info["objective_value"])
     print("Variables seleccionadas:")
-    for var in solving_info["variables"]:
-            print(f"  {var['symbol']}: {var['value']}")
+    for symbol, value in symbols(solving_info["variables"]):
+            print(f"  {symbol}: {value}")
     print("Tiempo de ejecución:", solving_info["runtime"])
     print("Iteraciones:", solving_info["iteration_count"])
-else:
-    status_dict = {
-        gp.GRB.INFEASIBLE: "Infeasible",
-        gp.GRB.INF_OR_UNBD: "Infeasible or Unbounded",
-        gp.GRB.UNBOUNDED: "Unbounded",
-        gp.GRB.OPTIMAL: "Optimal",
-    }
-    solving_info["status"] = (
-        status_dict[model.status] + f" ({model.status})"
-        if model.status in status_dict
-        else status_dict[model.status]
-    )
-    solving_info["objective_value"] = None
-    solving_info["variables"] = []
-    solving_info["runtime"] = None
-    solving_info["iteration_count"] = None
\ No newline at end of file
+
+profiler.report()
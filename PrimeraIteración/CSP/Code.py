@@ -1,9 +1,17 @@
-import json
+import os
+import sys
 import numpy as np
 import gurobipy as gp
 
-with open("Data.json", "r") as f:
-    data = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from comun.instances import load_instance
+from comun.instrumentation import Profiler
+from comun.results import extract_results, symbols
+
+profiler = Profiler()
+
+profiler.phase("load")
+data = load_instance("Data.json")
 
 
 T = data["T"]
@@ -12,7 +20,9 @@ UnitsRequired = data["UnitsRequired"]
 P = data["P"]
 
 # Define model
+profiler.phase("build")
 model = gp.Model('model')
+profiler.watch(model)
 
 # ====== Define variables ====== 
 PatternUsageFrequency = model.addVars(P, name='PatternUsageFrequency', vtype=gp.GRB.INTEGER)
@@ -31,49 +41,28 @@ for p in range(P):
 model.setObjective(gp.quicksum(MaterialUsedForPattern[p] * PatternUsageFrequency[p] for p in range(P)), gp.GRB.MINIMIZE)
 
 # Optimize model
+profiler.phase("optimize")
 model.optimize()
 
 # Get model status
 status = model.status
 
 # Get solver information
-solving_info = {}
+profiler.phase("extract")
+solving_info = extract_results(model, {"PatternUsageFrequency": PatternUsageFrequency, "MaterialUsedForPattern": MaterialUsedForPattern})
 
-if status == gp.GRB.OPTIMAL:
-    solving_info["status"] = "Optimal (2)"
-    solving_info["objective_value"] = model.objVal
-    solving_info["variables"] = [
-        {
-            "symbol": var.VarName,
-            "value": var.X,
-        }
-        for var in model.getVars()
-    ]
-    solving_info["runtime"] = model.Runtime
-    solving_info["iteration_count"] = model.IterCount
+profiler.stop()
+solving_info["profile"] = profiler.record()
 
+if status == gp.GRB.OPTIMAL:
     ## Añadido para mostrar información por consola
     print("----------------- Modelo optimizado con éxito. ---------------")
     print("Estado:", solving_info["status"])
     print("Valor objetivo:", solving_info["objective_value"])
     print("Variables seleccionadas:")
-    for var in solving_info["variables"]:
-        print(f"  {var['symbol']}: {var['value']}")
+    for symbol, value in symbols(solving_info["variables"]):
+        print(f"  {symbol}: {value}")
     print("Tiempo de ejecución:", solving_info["runtime"])
     print("Iteraciones:", solving_info["iteration_count"])
-else:
-    status_dict = {
-        gp.GRB.INFEASIBLE: "Infeasible",
-        gp.GRB.INF_OR_UNBD: "Infeasible or Unbounded",
-        gp.GRB.UNBOUNDED: "Unbounded",
-        gp.GRB.OPTIMAL: "Optimal",
-    }
-    solving_info["status"] = (
-        status_dict[model.status] + f" ({model.status})"
-        if model.status in status_dict
-        else status_dict[model.status]
-    )
-    solving_info["objective_value"] = None
-    solving_info["variables"] = []
-    solving_info["runtime"] = None
-    solving_info["iteration_count"] = None
\ No newline at end of file
+
+profiler.report()
@@ -1,10 +1,25 @@
-import json
+import os
+import sys
 import numpy as np
 
 import gurobipy as gp
 
-with open("DataMod.json", "r") as f:
-    data = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from comun.backend import optimize
+from comun.cli import apply_params, script_args
+from comun.instances import load_instance
+from comun.instrumentation import Profiler
+from comun.lint import clean_model
+from comun.results import extract_results, symbols
+
+# Drop constant, duplicate and bound-only rows before optimize (see comun/lint.py)
+CLEAN_MODEL = True
+
+args = script_args("DataMod.json", globals())
+profiler = Profiler(args.trace_memory)
+
+profiler.phase("load")
+data = load_instance(args.data, args.prefer_binary)
 
 
 T = data["T"]
@@ -16,7 +31,10 @@ P = data["P"]
 MaterialUsedForPattern = data["MaterialUsedForPattern"]
 
 # Define model
+profiler.phase("build")
 model = gp.Model('model')
+apply_params(model, args)
+profiler.watch(model)
 
 
 # ====== Define variables ====== 
@@ -36,52 +54,34 @@ for p in range(P):
 
 model.setObjective(gp.quicksum(MaterialUsedForPattern[p] * PatternUsageFrequency[p] for p in range(P)), gp.GRB.MINIMIZE)
 
+if CLEAN_MODEL:
+    clean_model(model)
+
 # Optimize model
-model.optimize()
+profiler.phase("optimize")
+solution = optimize(model, args.backend)
 
 
 # Get model status
-status = model.status
+status = solution.Status
 
 
 # Get solver information
-solving_info = {}
+profiler.phase("extract")
+solving_info = extract_results(solution, {"PatternUsageFrequency": PatternUsageFrequency})
 
-if status == gp.GRB.OPTIMAL:
-    solving_info["status"] = "Optimal (2)"
-    solving_info["objective_value"] = model.objVal
-    solving_info["variables"] = [
-        {
-            "symbol": var.VarName,
-            "value": var.X,
-        }
-        for var in model.getVars()
-    ]
-    solving_info["runtime"] = model.Runtime
-    solving_info["iteration_count"] = model.IterCount
+profiler.stop()
+solving_info["profile"] = profiler.record()
 
+if status == gp.GRB.OPTIMAL:
     ## Añadido para mostrar información por consola
     print("----------------- Modelo optimizado con éxito. ---------------")
     print("Estado:", solving_info["status"])
     print("Valor objetivo:", solving_info["objective_value"])
     print("Variables seleccionadas:")
-    for var in solving_info["variables"]:
-        print(f"  {var['symbol']}: {var['value']}")
+    for symbol, value in symbols(solving_info["variables"]):
+        print(f"  {symbol}: {value}")
     print("Tiempo de ejecución:", solving_info["runtime"])
     print("Iteraciones:", solving_info["iteration_count"])
-else:
-    status_dict = {
-        gp.GRB.INFEASIBLE: "Infeasible",
-        gp.GRB.INF_OR_UNBD: "Infeasible or Unbounded",
-        gp.GRB.UNBOUNDED: "Unbounded",
-        gp.GRB.OPTIMAL: "Optimal",
-    }
-    solving_info["status"] = (
-        status_dict[model.status] + f" ({model.status})"
-        if model.status in status_dict
-        else status_dict[model.status]
-    )
-    solving_info["objective_value"] = None
-    solving_info["variables"] = []
-    solving_info["runtime"] = None
-    solving_info["iteration_count"] = None
+
+profiler.report()
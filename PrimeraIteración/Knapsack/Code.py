@@ -1,11 +1,33 @@
 
-import json
+import os
+import sys
+import time
 import numpy as np
 
 import gurobipy as gp
 
-with open("Data4.json", "r") as f:
-    data = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from comun.backend import optimize
+from comun.cli import apply_params, script_args
+from comun.instances import load_instance
+from comun.instrumentation import Profiler
+from comun.lint import clean_model
+from comun.results import extract_results, make_results, symbols
+
+import KnapsackDP
+
+# "dp": NumPy dynamic programming over the capacity (integer Weights only)
+# "gurobi": binary model built with gurobipy and solved by --backend
+SOLVER = "dp"
+
+# Drop constant, duplicate and bound-only rows before optimize (see comun/lint.py)
+CLEAN_MODEL = True
+
+args = script_args("Data4.json", globals())
+profiler = Profiler(args.trace_memory)
+
+profiler.phase("load")
+data = load_instance(args.data, args.prefer_binary)
 
 
 MaxCapacity = data["MaxCapacity"]
@@ -13,74 +35,68 @@ Weights = data["Weights"]
 N = data["N"]
 Values = data["Values"]
 
-# Define model
-model = gp.Model('model')
+if SOLVER == "dp":
+    profiler.phase("optimize")
+    dp_start = time.time()
+    best_value, selected = KnapsackDP.solve(Values, Weights, MaxCapacity)
+    selected = set(selected)
+    dp_runtime = time.time() - dp_start
+    status = gp.GRB.OPTIMAL
+else:
+    # Define model
+    profiler.phase("build")
+    model = gp.Model('model')
+    apply_params(model, args)
+    profiler.watch(model)
+
 
+    # ====== Define variables ====== 
+    X = model.addVars(N, name='X', vtype=gp.GRB.BINARY)
 
-# ====== Define variables ====== 
-X = model.addVars(N, name='X', vtype=gp.GRB.BINARY)
+    # ====== Define constraints ====== 
 
-# ====== Define constraints ====== 
+    model.addConstr(gp.quicksum(Weights[i] * X[i] for i in range(N)) <= MaxCapacity, name="weight_capacity")
 
-model.addConstr(gp.quicksum(Weights[i] * X[i] for i in range(N)) <= MaxCapacity, name="weight_capacity")
+    for i in range(N):
+        model.addConstr(X[i] >= 0, name=f"non_negativity_{i}")
 
-for i in range(N):
-    model.addConstr(X[i] >= 0, name=f"non_negativity_{i}")
+    model.addConstr(gp.quicksum(Weights[i] * X[i] for i in range(N)) <= MaxCapacity, name="weight_capacity")
 
-model.addConstr(gp.quicksum(Weights[i] * X[i] for i in range(N)) <= MaxCapacity, name="weight_capacity")
+    # ====== Define objective ====== 
 
-# ====== Define objective ====== 
+    model.setObjective(gp.quicksum(Values[i] * X[i] for i in range(N)), gp.GRB.MAXIMIZE)
 
-model.setObjective(gp.quicksum(Values[i] * X[i] for i in range(N)), gp.GRB.MAXIMIZE)
+    if CLEAN_MODEL:
+        clean_model(model)
 
-# Optimize model
-model.optimize()
+    # Optimize model
+    profiler.phase("optimize")
+    solution = optimize(model, args.backend)
 
 
-# Get model status
-status = model.status
+    # Get model status
+    status = solution.Status
 
 
 # Get solver information
-solving_info = {}
+profiler.phase("extract")
+if SOLVER == "dp":
+    solving_info = make_results(status, best_value, {"X": (np.arange(N)[:, np.newaxis], [1.0 if i in selected else 0.0 for i in range(N)])}, dp_runtime, 0)
+else:
+    solving_info = extract_results(solution, {"X": X})
 
-if status == gp.GRB.OPTIMAL:
-    solving_info["status"] = "Optimal (2)"
-    solving_info["objective_value"] = model.objVal
-    solving_info["variables"] = [
-        {
-            "symbol": var.VarName,
-            "value": var.X,
-        }
-        for var in model.getVars()
-    ]
-    solving_info["runtime"] = model.Runtime
-    solving_info["iteration_count"] = model.IterCount
+profiler.stop()
+solving_info["profile"] = profiler.record()
 
+if status == gp.GRB.OPTIMAL:
     ## Añadido para mostrar información por consola
     print("----------------- Modelo optimizado con éxito. ---------------")
     print("Estado:", solving_info["status"])
     print("Valor objetivo:", solving_info["objective_value"])
     print("Variables seleccionadas:")
-    for var in solving_info["variables"]:
-        print(f"  {var['symbol']}: {var['value']}")
+    for symbol, value in symbols(solving_info["variables"]):
+        print(f"  {symbol}: {value}")
     print("Tiempo de ejecución:", solving_info["runtime"])
     print("Iteraciones:", solving_info["iteration_count"])
 
-else:
-    status_dict = {
-        gp.GRB.INFEASIBLE: "Infeasible",
-        gp.GRB.INF_OR_UNBD: "Infeasible or Unbounded",
-        gp.GRB.UNBOUNDED: "Unbounded",
-        gp.GRB.OPTIMAL: "Optimal",
-    }
-    solving_info["status"] = (
-        status_dict[model.status] + f" ({model.status})"
-        if model.status in status_dict
-        else status_dict[model.status]
-    )
-    solving_info["objective_value"] = None
-    solving_info["variables"] = []
-    solving_info["runtime"] = None
-    solving_info["iteration_count"] = None
-
+profiler.report()
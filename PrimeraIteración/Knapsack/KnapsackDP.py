@@ -0,0 +1,64 @@
+import numpy as np
+
+
+def solve(values, weights, capacity):
+    """Solve one 0/1 knapsack by dynamic programming over the capacity.
+
+    Returns the best value and the sorted list of selected items.
+    """
+    best, selected = solve_batch([{"MaxCapacity": capacity, "N": len(values), "Values": values, "Weights": weights}])
+    return best[0].item(), np.flatnonzero(selected[0]).tolist()
+
+
+def solve_batch(instances):
+    """Solve many 0/1 knapsacks given in the Data*.json shape (MaxCapacity, N, Values, Weights).
+
+    All instances advance one item at a time together: the DP table has one
+    row per instance and one column per capacity, and the take/skip decision
+    of every item is kept bit-packed for solution recovery.
+
+    Returns the array of best values and a boolean selection matrix padded
+    to the largest N (both empty for an empty batch).
+    """
+    B = len(instances)
+    if B == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=bool)
+    N = max(data["N"] for data in instances)
+    capacity = np.array([data["MaxCapacity"] for data in instances], dtype=np.int64)
+    max_capacity = int(capacity.max())
+
+    # Padding items never fit
+    weights = np.full((B, N), max_capacity + 1, dtype=np.int64)
+    values = np.zeros((B, N), dtype=np.result_type(*(np.asarray(data["Values"]) for data in instances)))
+    for b, data in enumerate(instances):
+        item_weights = np.asarray(data["Weights"])
+        if not np.all(np.mod(item_weights, 1) == 0) or np.any(item_weights < 0):
+            raise ValueError("Weights must be non-negative integers for the DP solver")
+        weights[b, :data["N"]] = item_weights
+        values[b, :data["N"]] = data["Values"]
+
+    rows = np.arange(B)[:, None]
+    columns = np.arange(max_capacity + 1)[None, :]
+    dp = np.zeros((B, max_capacity + 1), dtype=values.dtype)
+    choices = np.empty((N, B, (max_capacity + 8) // 8), dtype=np.uint8)
+
+    for i in range(N):
+        source = columns - weights[:, i:i + 1]
+        fits = source >= 0
+        candidate = np.where(fits, dp[rows, np.maximum(source, 0)] + values[:, i:i + 1], -1)
+        take = candidate > dp
+        dp = np.where(take, candidate, dp)
+        choices[i] = np.packbits(take, axis=1)
+
+    best = dp[np.arange(B), capacity]
+
+    # Walk the items backwards reading the packed decision at the remaining capacity
+    selected = np.zeros((B, N), dtype=bool)
+    remaining = capacity.copy()
+    for i in reversed(range(N)):
+        byte = choices[i][np.arange(B), remaining >> 3]
+        taken = ((byte >> (7 - (remaining & 7))) & 1).astype(bool)
+        selected[:, i] = taken
+        remaining -= np.where(taken, weights[:, i], 0)
+
+    return best, selected
@@ -1,95 +1,184 @@
-import json
+import os
+import sys
 import numpy as np
 import gurobipy as gp
 
-with open("DataMod.json", "r") as f:
-    data = json.load(f)
-
-N = data["N"]
-Distances = data["Distances"]
-
-# Define model
-model = gp.Model('model')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from comun.backend import optimize
+from comun.cli import apply_params, script_args
+from comun.instances import load_instance
+from comun.instrumentation import Profiler
+from comun.lint import clean_model
+from comun.model_cache import load_model, model_key, save_model
+from comun.results import extract_results, symbols
+from comun.tsp_candidates import candidate_arcs, improving_arcs, subtour_bound
+from comun.tsp_heuristics import heuristic_tour, tour_arcs
 
+# Drop constant, duplicate and bound-only rows before optimize (see comun/lint.py)
+CLEAN_MODEL = True
 
-# ====== Define variables ====== 
-X = model.addVars(N, N, name='X', vtype=gp.GRB.BINARY)
-# Variables auxiliares MTZ para eliminar subtours
-U = model.addVars(N, name='U', vtype=gp.GRB.CONTINUOUS, lb=0, ub=N-1)
+# Nearest neighbour + 2-opt/Or-opt tour as MIP start, and its length as cutoff
+WARM_START = True
+CUTOFF_TOLERANCE = 1e-6
 
-# ====== Define constraints ====== 
-model.addConstr(gp.quicksum(X[0, j] for j in range(N)) == 1, name="start_city")
-model.addConstr(gp.quicksum(X[i, 0] for i in range(N)) == 1, name="end_city")
+# None: full N x N matrix. k: only the k nearest successors and predecessors of
+# each city and the heuristic tour arcs; the other arcs are priced against the
+# subtour LP and added while they could shorten the tour (see comun/tsp_candidates.py)
+CANDIDATE_EDGES = None
 
-# Cada ciudad debe tener exactamente una salida
-for i in range(N):
-    model.addConstr(gp.quicksum(X[i, j] for j in range(N)) == 1, name=f"out_degree_{i}")
+args = script_args("DataMod.json", globals())
+profiler = Profiler(args.trace_memory)
 
-# Cada ciudad debe tener exactamente una entrada
-for j in range(N):
-    model.addConstr(gp.quicksum(X[i, j] for i in range(N)) == 1, name=f"in_degree_{j}")
+profiler.phase("load")
+data = load_instance(args.data, args.prefer_binary)
 
-# Prohibir que una ciudad se visite a sí misma
-for i in range(N):
-    model.addConstr(X[i, i] == 0, name=f"no_self_visit_{i}")
-
-# Restricciones MTZ para eliminar subtours
-for i in range(1, N):
-    for j in range(1, N):
-        if i != j:
-            model.addConstr(U[i] - U[j] + N * X[i, j] <= N - 1, name=f"MTZ_{i}_{j}")
-
-# ====== Define objective ====== 
+N = data["N"]
+Distances = data["Distances"]
 
-model.setObjective(gp.quicksum(Distances[i][j] * X[i, j] for i in range(N) for j in range(N)), gp.GRB.MINIMIZE)
+if WARM_START or CANDIDATE_EDGES is not None:
+    profiler.phase("heuristic")
+    tour, tour_length = heuristic_tour(Distances)
+    print(f"Heurística: recorrido de longitud {tour_length}")
+
+if CANDIDATE_EDGES is not None:
+    profiler.phase("pricing")
+    pricing = subtour_bound(Distances, candidate_arcs(Distances, CANDIDATE_EDGES, tour), setup=lambda lp: apply_params(lp, args), backend=args.backend)
+    Arcs = pricing["arcs"]
+
+# Reuse the model built for this instance and variant (see comun/model_cache.py)
+key = model_key("TSP_MTZ", {"CLEAN_MODEL": CLEAN_MODEL}, data, __file__) if args.model_cache and CANDIDATE_EDGES is None else None
+cached = load_model(key) if key is not None else None
+
+if cached is None:
+    # Define model
+    profiler.phase("build")
+    model = gp.Model('model')
+    profiler.watch(model)
+
+
+    if CANDIDATE_EDGES is not None:
+        # ====== Define variables ====== 
+        # The objective coefficients are set directly on the variables
+        ArcList = [(i, j) for i, j in np.argwhere(Arcs).tolist()]
+        X = model.addVars(ArcList, obj=[Distances[i][j] for i, j in ArcList], name='X', vtype=gp.GRB.BINARY)
+        U = model.addVars(N, name='U', vtype=gp.GRB.CONTINUOUS, lb=0, ub=N-1)
+        model.ModelSense = gp.GRB.MINIMIZE
+
+        # ====== Define constraints ====== 
+        # start_city/end_city are out_degree_0/in_degree_0 and the diagonal is not in the model
+        out_rows = [model.addConstr(X.sum(i, '*') == 1, name=f"out_degree_{i}") for i in range(N)]
+        in_rows = [model.addConstr(X.sum('*', j) == 1, name=f"in_degree_{j}") for j in range(N)]
+
+        for i, j in ArcList:
+            if i != 0 and j != 0:
+                model.addConstr(U[i] - U[j] + N * X[i, j] <= N - 1, name=f"MTZ_{i}_{j}")
+
+        def add_arc(i, j):
+            # Priced-in arc: binary variable in its degree rows, plus its MTZ row
+            X[i, j] = model.addVar(obj=Distances[i][j], name=f"X[{i},{j}]", vtype=gp.GRB.BINARY,
+                                   column=gp.Column([1, 1], [out_rows[i], in_rows[j]]))
+            if i != 0 and j != 0:
+                model.addConstr(U[i] - U[j] + N * X[i, j] <= N - 1, name=f"MTZ_{i}_{j}")
+            Arcs[i, j] = True
+    else:
+        # ====== Define variables ====== 
+        X = model.addVars(N, N, name='X', vtype=gp.GRB.BINARY)
+        # Variables auxiliares MTZ para eliminar subtours
+        U = model.addVars(N, name='U', vtype=gp.GRB.CONTINUOUS, lb=0, ub=N-1)
+
+        # ====== Define constraints ====== 
+        model.addConstr(gp.quicksum(X[0, j] for j in range(N)) == 1, name="start_city")
+        model.addConstr(gp.quicksum(X[i, 0] for i in range(N)) == 1, name="end_city")
+
+        # Cada ciudad debe tener exactamente una salida
+        for i in range(N):
+            model.addConstr(gp.quicksum(X[i, j] for j in range(N)) == 1, name=f"out_degree_{i}")
+
+        # Cada ciudad debe tener exactamente una entrada
+        for j in range(N):
+            model.addConstr(gp.quicksum(X[i, j] for i in range(N)) == 1, name=f"in_degree_{j}")
+
+        # Prohibir que una ciudad se visite a sí misma
+        for i in range(N):
+            model.addConstr(X[i, i] == 0, name=f"no_self_visit_{i}")
+
+        # Restricciones MTZ para eliminar subtours
+        for i in range(1, N):
+            for j in range(1, N):
+                if i != j:
+                    model.addConstr(U[i] - U[j] + N * X[i, j] <= N - 1, name=f"MTZ_{i}_{j}")
+
+        # ====== Define objective ====== 
+
+        model.setObjective(gp.quicksum(Distances[i][j] * X[i, j] for i in range(N) for j in range(N)), gp.GRB.MINIMIZE)
+
+    # The sparse model has no redundant rows, and the pricing keeps handles to the degree rows
+    if CLEAN_MODEL and CANDIDATE_EDGES is None:
+        clean_model(model)
+
+    if key is not None:
+        save_model(model, key, {"X": X, "U": U})
+else:
+    profiler.phase("model_cache")
+    model, groups = cached
+    profiler.watch(model)
+    print(f"Modelo leído de la caché: {model.NumVars} variables, {model.NumConstrs} restricciones")
+    X, U = groups["X"], groups["U"]
+
+apply_params(model, args)
+
+if WARM_START:
+    # MTZ order: position of each city in the tour, city 0 first
+    arcs = set(tour_arcs(tour))
+    for (i, j), var in X.items():
+        var.Start = 1 if (i, j) in arcs else 0
+    for position, city in enumerate(tour):
+        U[city].Start = position
+    model.Params.Cutoff = tour_length + CUTOFF_TOLERANCE
 
 # Optimize model
-model.optimize()
+profiler.phase("optimize")
+solution = optimize(model, args.backend)
+added = 0
+# Excluded arcs whose reduced cost is below the gap to the LP bound could
+# still shorten the tour: add them and re-solve from the incumbent
+while CANDIDATE_EDGES is not None and solution.Status == gp.GRB.OPTIMAL:
+    missing = improving_arcs(pricing["reduced_costs"], Arcs, solution.ObjVal, pricing["bound"])
+    if not missing:
+        break
+    variables = model.getVars()
+    incumbent = solution.getAttr("X", variables)
+    for i, j in missing:
+        add_arc(i, j)
+    model.setAttr("Start", variables, incumbent)
+    added += len(missing)
+    solution = optimize(model, args.backend)
+if CANDIDATE_EDGES is not None:
+    print(f"Aristas candidatas: {int(Arcs.sum())} de {N * (N - 1)} ({pricing['added']} añadidas por la relajación, "
+          f"{added} por la solución entera), cota LP {pricing['bound']}")
 
 
 # Get model status
-status = model.status
+status = solution.Status
 
 
 # Get solver information
-solving_info = {}
+profiler.phase("extract")
+solving_info = extract_results(solution, {"X": X, "U": U})
 
-if status == gp.GRB.OPTIMAL:
-    solving_info["status"] = "Optimal (2)"
-    solving_info["objective_value"] = model.objVal
-    solving_info["variables"] = [
-        {
-            "symbol": var.VarName,
-            "value": var.X,
-        }
-        for var in model.getVars()
-    ]
-    solving_info["runtime"] = model.Runtime
-    solving_info["iteration_count"] = model.IterCount
+profiler.stop()
+solving_info["profile"] = profiler.record()
 
+if status == gp.GRB.OPTIMAL:
     ## Añadido para mostrar información por consola
     print("----------------- Modelo optimizado con éxito. ---------------")
     print("Estado:", solving_info["status"])
     print("Valor objetivo:", solving_info["objective_value"])
     print("Variables seleccionadas:")
-    for var in solving_info["variables"]:
-        if var['value'] == 1:
-            print(f"  {var['symbol']}: {var['value']}")
+    for symbol, value in symbols(solving_info["variables"]):
+        if value == 1:
+            print(f"  {symbol}: {value}")
     print("Tiempo de ejecución:", solving_info["runtime"])
     print("Iteraciones:", solving_info["iteration_count"])
-else:
-    status_dict = {
-        gp.GRB.INFEASIBLE: "Infeasible",
-        gp.GRB.INF_OR_UNBD: "Infeasible or Unbounded",
-        gp.GRB.UNBOUNDED: "Unbounded",
-        gp.GRB.OPTIMAL: "Optimal",
-    }
-    solving_info["status"] = (
-        status_dict[model.status] + f" ({model.status})"
-        if model.status in status_dict
-        else status_dict[model.status]
-    )
-    solving_info["objective_value"] = None
-    solving_info["variables"] = []
-    solving_info["runtime"] = None
-    solving_info["iteration_count"] = None
+
+profiler.report()
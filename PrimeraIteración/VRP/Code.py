@@ -1,9 +1,17 @@
-import json
+import os
+import sys
 import numpy as np
 import gurobipy as gp
 
-with open("tmpData/TOgiUg9UEwARe4GSn3mI/data.json", "r") as f:
-    data = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from comun.instances import load_instance
+from comun.instrumentation import Profiler
+from comun.results import extract_results
+
+profiler = Profiler()
+
+profiler.phase("load")
+data = load_instance("tmpData/TOgiUg9UEwARe4GSn3mI/data.json")
 
 C = data["C"]
 TravelCost = data["TravelCost"]
@@ -13,7 +21,9 @@ M = data["M"]
 N = C
 
 # Define model
+profiler.phase("build")
 model = gp.Model('model')
+profiler.watch(model)
 
 
 # ====== Define variables ====== 
@@ -51,6 +61,7 @@ for j in range(C):
 model.setObjective(gp.quicksum(TravelCost[j][k] * Route[i, j, k] for i in range(M) for j in range(C) for k in range(C)), gp.GRB.MINIMIZE)
 
 # Optimize model
+profiler.phase("optimize")
 model.optimize()
 
 
@@ -59,33 +70,9 @@ status = model.status
 
 
 # Get solver information
-solving_info = {}
-
-if status == gp.GRB.OPTIMAL:
-    solving_info["status"] = "Optimal (2)"
-    solving_info["objective_value"] = model.objVal
-    solving_info["variables"] = [
-        {
-            "symbol": var.VarName,
-            "value": var.X,
-        }
-        for var in model.getVars()
-    ]
-    solving_info["runtime"] = model.Runtime
-    solving_info["iteration_count"] = model.IterCount
-else:
-    status_dict = {
-        gp.GRB.INFEASIBLE: "Infeasible",
-        gp.GRB.INF_OR_UNBD: "Infeasible or Unbounded",
-        gp.GRB.UNBOUNDED: "Unbounded",
-        gp.GRB.OPTIMAL: "Optimal",
-    }
-    solving_info["status"] = (
-        status_dict[model.status] + f" ({model.status})"
-        if model.status in status_dict
-        else status_dict[model.status]
-    )
-    solving_info["objective_value"] = None
-    solving_info["variables"] = []
-    solving_info["runtime"] = None
-    solving_info["iteration_count"] = None
\ No newline at end of file
+profiler.phase("extract")
+solving_info = extract_results(model, {"Route": Route})
+profiler.stop()
+solving_info["profile"] = profiler.record()
+
+profiler.report()
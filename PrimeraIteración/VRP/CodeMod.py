@@ -1,9 +1,34 @@
-import json
+import os
+import sys
 import numpy as np
 import gurobipy as gp
 
-with open("DataMod.json", "r") as f:
-    data = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from comun.backend import optimize
+from comun.cli import apply_params, script_args
+from comun.instances import load_instance
+from comun.instrumentation import Profiler
+from comun.lint import clean_model
+from comun.model_cache import load_model, model_key, save_model
+from comun.results import extract_results
+from comun.vrp_heuristics import heuristic_routes, route_arcs
+
+# Drop constant, duplicate and bound-only rows before optimize (see comun/lint.py)
+CLEAN_MODEL = True
+
+# "three_index": Route[i, j, k] and Order[i, j] per vehicle (M·N² binaries, M! symmetric copies)
+# "two_index": Arc[j, k] shared by the identical vehicles; routes are assigned to vehicles after the solve
+FORMULATION = "two_index"
+
+# Savings routes improved by local search as MIP start, and their cost as cutoff
+WARM_START = True
+CUTOFF_TOLERANCE = 1e-6
+
+args = script_args("DataMod.json", globals())
+profiler = Profiler(args.trace_memory)
+
+profiler.phase("load")
+data = load_instance(args.data, args.prefer_binary)
 
 C = data["C"]
 TravelCost = data["TravelCost"]
@@ -14,90 +39,192 @@ N = C
 # Define depot as city 0
 DEPOT = 0
 
-# Define model
-model = gp.Model('VRP_Model')
-
-# ====== Define variables ====== 
-# Route[i,j,k] = 1 if vehicle i travels from city j to city k
-Route = model.addVars(M, N, N, name='Route', vtype=gp.GRB.BINARY)
-
-# u[i,j] = order/position of city j in the route of vehicle i (for MTZ subtour elimination)
-u = model.addVars(M, N, name='Order', vtype=gp.GRB.CONTINUOUS, lb=0, ub=N-1)
-
-# ====== Define constraints ====== 
-
-# 1. Each vehicle must start and return to the depot
-for i in range(M):
-    # Each vehicle MUST leave the depot exactly once (forces all vehicles to be used)
-    model.addConstr(gp.quicksum(Route[i, DEPOT, k] for k in range(1, C)) == 1, 
-                   name=f"depot_departure_{i}")
-    # If a vehicle leaves the depot, it must return
-    model.addConstr(gp.quicksum(Route[i, DEPOT, k] for k in range(1, C)) == 
-                   gp.quicksum(Route[i, k, DEPOT] for k in range(1, C)), 
-                   name=f"depot_return_{i}")
-
-# 2. Each non-depot city is visited exactly once
-for j in range(1, C):  # Exclude depot
-    model.addConstr(gp.quicksum(Route[i, j, k] for i in range(M) for k in range(C) if k != j) == 1, 
-                   name=f"visit_city_{j}")
-
-# 3. Flow conservation: if a vehicle enters a city, it must leave
-for i in range(M):
-    for j in range(C):
-        model.addConstr(gp.quicksum(Route[i, k, j] for k in range(C) if k != j) == 
-                       gp.quicksum(Route[i, j, k] for k in range(C) if k != j), 
-                       name=f"flow_conservation_{i}_{j}")
-
-# 4. No self-loops
-for i in range(M):
-    for j in range(C):
-        model.addConstr(Route[i, j, j] == 0, name=f"no_self_loop_{i}_{j}")
-
-# 5. MTZ subtour elimination constraints
-for i in range(M):
-    for j in range(1, C):  # Exclude depot
-        for k in range(1, C):  # Exclude depot
-            if j != k:
-                model.addConstr(u[i, j] - u[i, k] + N * Route[i, j, k] <= N - 1, 
-                               name=f"mtz_{i}_{j}_{k}")
-
-# 6. Depot has order 0 for all vehicles
-for i in range(M):
-    model.addConstr(u[i, DEPOT] == 0, name=f"depot_order_{i}")
-
-# ====== Define objective ====== 
-
-# Minimize total travel cost (excluding self-loops which are already forbidden)
-model.setObjective(gp.quicksum(TravelCost[j][k] * Route[i, j, k] 
-                              for i in range(M) 
-                              for j in range(C) 
-                              for k in range(C) 
-                              if j != k), gp.GRB.MINIMIZE)
+if WARM_START:
+    profiler.phase("heuristic")
+    routes, routes_cost = heuristic_routes(TravelCost, M)
+    print(f"Heurística: {M} rutas de coste total {routes_cost}")
+
+# Reuse the model built for this instance and formulation (see comun/model_cache.py)
+key = model_key("VRP", {"FORMULATION": FORMULATION, "CLEAN_MODEL": CLEAN_MODEL}, data, __file__) if args.model_cache else None
+cached = load_model(key) if key is not None else None
+
+if cached is None:
+    # Define model
+    profiler.phase("build")
+    model = gp.Model('VRP_Model')
+    profiler.watch(model)
+
+    if FORMULATION == "three_index":
+        # ====== Define variables ====== 
+        # Route[i,j,k] = 1 if vehicle i travels from city j to city k
+        Route = model.addVars(M, N, N, name='Route', vtype=gp.GRB.BINARY)
+
+        # u[i,j] = order/position of city j in the route of vehicle i (for MTZ subtour elimination)
+        u = model.addVars(M, N, name='Order', vtype=gp.GRB.CONTINUOUS, lb=0, ub=N-1)
+
+        # ====== Define constraints ====== 
+
+        # 1. Each vehicle must start and return to the depot
+        for i in range(M):
+            # Each vehicle MUST leave the depot exactly once (forces all vehicles to be used)
+            model.addConstr(gp.quicksum(Route[i, DEPOT, k] for k in range(1, C)) == 1, 
+                           name=f"depot_departure_{i}")
+            # If a vehicle leaves the depot, it must return
+            model.addConstr(gp.quicksum(Route[i, DEPOT, k] for k in range(1, C)) == 
+                           gp.quicksum(Route[i, k, DEPOT] for k in range(1, C)), 
+                           name=f"depot_return_{i}")
+
+        # 2. Each non-depot city is visited exactly once
+        for j in range(1, C):  # Exclude depot
+            model.addConstr(gp.quicksum(Route[i, j, k] for i in range(M) for k in range(C) if k != j) == 1, 
+                           name=f"visit_city_{j}")
+
+        # 3. Flow conservation: if a vehicle enters a city, it must leave
+        for i in range(M):
+            for j in range(C):
+                model.addConstr(gp.quicksum(Route[i, k, j] for k in range(C) if k != j) == 
+                               gp.quicksum(Route[i, j, k] for k in range(C) if k != j), 
+                               name=f"flow_conservation_{i}_{j}")
+
+        # 4. No self-loops
+        for i in range(M):
+            for j in range(C):
+                model.addConstr(Route[i, j, j] == 0, name=f"no_self_loop_{i}_{j}")
+
+        # 5. MTZ subtour elimination constraints
+        for i in range(M):
+            for j in range(1, C):  # Exclude depot
+                for k in range(1, C):  # Exclude depot
+                    if j != k:
+                        model.addConstr(u[i, j] - u[i, k] + N * Route[i, j, k] <= N - 1, 
+                                       name=f"mtz_{i}_{j}_{k}")
+
+        # 6. Depot has order 0 for all vehicles
+        for i in range(M):
+            model.addConstr(u[i, DEPOT] == 0, name=f"depot_order_{i}")
+
+        # ====== Define objective ====== 
+
+        # Minimize total travel cost (excluding self-loops which are already forbidden)
+        model.setObjective(gp.quicksum(TravelCost[j][k] * Route[i, j, k] 
+                                      for i in range(M) 
+                                      for j in range(C) 
+                                      for k in range(C) 
+                                      if j != k), gp.GRB.MINIMIZE)
+
+        groups = {"Route": Route, "Order": u}
+    else:
+        # ====== Define variables ====== 
+        # Arc[j,k] = 1 if some vehicle travels from city j to city k (vehicles are identical)
+        Arc = model.addVars(N, N, name='Arc', vtype=gp.GRB.BINARY)
+
+        # Order[j] = position of customer j along its route (for MTZ subtour elimination)
+        Order = model.addVars(range(1, N), name='Order', vtype=gp.GRB.CONTINUOUS, lb=1, ub=N-1)
+
+        # ====== Define constraints ====== 
+
+        # 1. M vehicles leave and return to the depot
+        model.addConstr(gp.quicksum(Arc[DEPOT, k] for k in range(1, C)) == M, name="depot_departure")
+        model.addConstr(gp.quicksum(Arc[k, DEPOT] for k in range(1, C)) == M, name="depot_return")
+
+        # 2. Each non-depot city is entered and left exactly once
+        for j in range(1, C):
+            model.addConstr(gp.quicksum(Arc[k, j] for k in range(C) if k != j) == 1, name=f"visit_city_{j}")
+            model.addConstr(gp.quicksum(Arc[j, k] for k in range(C) if k != j) == 1, name=f"leave_city_{j}")
+
+        # 3. No self-loops
+        for j in range(C):
+            model.addConstr(Arc[j, j] == 0, name=f"no_self_loop_{j}")
+
+        # 4. MTZ subtour elimination constraints
+        for j in range(1, C):
+            for k in range(1, C):
+                if j != k:
+                    model.addConstr(Order[j] - Order[k] + N * Arc[j, k] <= N - 1, name=f"mtz_{j}_{k}")
+
+        # ====== Define objective ====== 
+
+        model.setObjective(gp.quicksum(TravelCost[j][k] * Arc[j, k] for j in range(C) for k in range(C) if j != k), gp.GRB.MINIMIZE)
+
+        groups = {"Arc": Arc, "Order": Order}
+
+    if CLEAN_MODEL:
+        clean_model(model)
+
+    if key is not None:
+        save_model(model, key, groups)
+else:
+    profiler.phase("model_cache")
+    model, groups = cached
+    profiler.watch(model)
+    print(f"Modelo leído de la caché: {model.NumVars} variables, {model.NumConstrs} restricciones")
+    if FORMULATION == "three_index":
+        Route, u = groups["Route"], groups["Order"]
+    else:
+        Arc, Order = groups["Arc"], groups["Order"]
+
+apply_params(model, args)
+
+if WARM_START:
+    if FORMULATION == "three_index":
+        # Vehicle i drives routes[i]; its MTZ order is the position along the route
+        for i, route in enumerate(routes):
+            arcs = set(route_arcs(route))
+            for j in range(N):
+                for k in range(N):
+                    Route[i, j, k].Start = 1 if (j, k) in arcs else 0
+            u[i, DEPOT].Start = 0
+            for position, city in enumerate(route, start=1):
+                u[i, city].Start = position
+    else:
+        arcs = {arc for route in routes for arc in route_arcs(route)}
+        for j in range(N):
+            for k in range(N):
+                Arc[j, k].Start = 1 if (j, k) in arcs else 0
+        for route in routes:
+            for position, city in enumerate(route, start=1):
+                Order[city].Start = position
+    model.Params.Cutoff = routes_cost + CUTOFF_TOLERANCE
 
 # Optimize model
-model.optimize()
+profiler.phase("optimize")
+solution = optimize(model, args.backend)
 
 
 # Get model status
-status = model.status
+status = solution.Status
 
 
 # Get solver information
-solving_info = {}
+profiler.phase("extract")
+if FORMULATION == "three_index":
+    solving_info = extract_results(solution, {"Route": Route, "Order": u})
+else:
+    solving_info = extract_results(solution, {"Arc": Arc, "Order": Order})
 
-if status == gp.GRB.OPTIMAL:
-    solving_info["status"] = "Optimal (2)"
-    solving_info["objective_value"] = model.objVal
-    solving_info["variables"] = [
-        {
-            "symbol": var.VarName,
-            "value": var.X,
-        }
-        for var in model.getVars()
-    ]
-    solving_info["runtime"] = model.Runtime
-    solving_info["iteration_count"] = model.IterCount
+# Arcs driven by each vehicle
+vehicle_arcs = [[] for i in range(M)]
+if FORMULATION == "three_index":
+    for (i, j, k), value in zip(solving_info["variables"]["Route"]["index"].tolist(), solving_info["variables"]["Route"]["value"]):
+        if j != k and value > 0.5:
+            vehicle_arcs[i].append((j, k))
+elif solution.SolCount > 0:
+    # Follow every arc leaving the depot back to the depot and give that route to the next vehicle
+    successor = {}
+    for (j, k), value in zip(solving_info["variables"]["Arc"]["index"].tolist(), solving_info["variables"]["Arc"]["value"]):
+        if j != k and value > 0.5:
+            successor.setdefault(j, []).append(k)
+    for i, first in enumerate(successor.get(DEPOT, [])):
+        city = first
+        vehicle_arcs[i].append((DEPOT, city))
+        while city != DEPOT:
+            vehicle_arcs[i].append((city, successor[city][0]))
+            city = successor[city][0]
+
+profiler.stop()
+solving_info["profile"] = profiler.record()
 
+if status == gp.GRB.OPTIMAL:
     ## Añadido para mostrar información por consola
     print("----------------- Modelo VRP optimizado con éxito. ---------------")
     print("Estado:", solving_info["status"])
@@ -106,13 +233,8 @@ if status == gp.GRB.OPTIMAL:
     
     # Mostrar rutas de manera más legible
     for i in range(M):
-        route_edges = []
-        vehicle_used = False
-        for j in range(C):
-            for k in range(C):
-                if j != k and Route[i, j, k].X > 0.5:  # Variable binaria activa
-                    route_edges.append((j, k))
-                    vehicle_used = True
+        route_edges = vehicle_arcs[i]
+        vehicle_used = bool(route_edges)
         
         if vehicle_used:
             print(f"  Vehículo {i}:")
@@ -142,19 +264,4 @@ if status == gp.GRB.OPTIMAL:
     print("Tiempo de ejecución:", solving_info["runtime"])
     print("Iteraciones:", solving_info["iteration_count"])
 
-else:
-    status_dict = {
-        gp.GRB.INFEASIBLE: "Infeasible",
-        gp.GRB.INF_OR_UNBD: "Infeasible or Unbounded",
-        gp.GRB.UNBOUNDED: "Unbounded",
-        gp.GRB.OPTIMAL: "Optimal",
-    }
-    solving_info["status"] = (
-        status_dict[model.status] + f" ({model.status})"
-        if model.status in status_dict
-        else status_dict[model.status]
-    )
-    solving_info["objective_value"] = None
-    solving_info["variables"] = []
-    solving_info["runtime"] = None
-    solving_info["iteration_count"] = None
\ No newline at end of file
+profiler.report()
@@ -0,0 +1,117 @@
+"""Incremental CFLP: one model per instance, re-solved as demands, capacities and costs change.
+
+Usage::
+
+    python CFLPIncremental.py Data5.json --count 50 --spread 0.2 --compare
+    python CFLPIncremental.py Data5.json --scenarios escenarios.jsonl --output escenarios_resultados.jsonl
+
+The model is the matrix formulation of ``CFLP_P.py``. A new demand vector
+changes the right-hand sides of the demand rows and the ``OpenFacility``
+coefficients of the demand_assignment rows, a new capacity vector those of
+the capacity rows, and new costs the objective, all in place. Each solve
+starts from the open facilities of the previous one, completed by opening
+facilities until the capacity covers the new total demand.
+"""
+
+import os
+import sys
+
+import numpy as np
+import scipy.sparse as sp
+
+import gurobipy as gp
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from comun.backend import optimize
+from comun.cli import apply_params
+from comun.instances import load_instance
+from comun.results import extract_results
+from comun.scenarios import run_scenarios, scenario_args, scenario_parser
+
+
+class IncrementalCFLP:
+    """CFLP model of one instance whose data is changed in place between solves."""
+
+    def __init__(self, TransportCost, OpeningCost, Demand, Capacity, setup=None, backend="gurobi"):
+        self.TransportCost = np.asarray(TransportCost, dtype=float)
+        self.OpeningCost = np.asarray(OpeningCost, dtype=float)
+        self.Demand = np.asarray(Demand, dtype=float)
+        self.Capacity = np.asarray(Capacity, dtype=float)
+        self.backend = backend
+        L, C = self.TransportCost.shape
+
+        self.model = gp.Model('model')
+        if setup is not None:
+            setup(self.model)
+        self.UnitsShipped = self.model.addMVar((L, C), obj=self.TransportCost, name='UnitsShipped', vtype=gp.GRB.CONTINUOUS)
+        self.OpenFacility = self.model.addMVar(L, obj=self.OpeningCost, name='OpenFacility', vtype=gp.GRB.BINARY)
+        self.model.ModelSense = gp.GRB.MINIMIZE
+
+        # Columns: UnitsShipped row by row, then OpenFacility
+        Columns = gp.hstack((self.UnitsShipped.reshape(-1), self.OpenFacility))
+        DemandRows = sp.hstack([sp.kron(np.ones((1, L)), sp.identity(C)), sp.csr_matrix((C, L))], format="csr")
+        self.demand_rows = self.model.addMConstr(DemandRows, Columns, "=", self.Demand)
+        CapacityRows = sp.hstack([sp.kron(sp.identity(L), np.ones((1, C))), -sp.diags(self.Capacity)], format="csr")
+        self.capacity_rows = self.model.addMConstr(CapacityRows, Columns, "<", np.zeros(L)).tolist()
+        AssignmentRows = sp.hstack([sp.identity(L * C), -sp.kron(sp.identity(L), self.Demand[:, np.newaxis])], format="csr")
+        self.assignment_rows = np.reshape(self.model.addMConstr(AssignmentRows, Columns, "<", np.zeros(L * C)).tolist(), (L, C))
+        self.open_vars = self.OpenFacility.tolist()
+        self.opened = None
+
+    def update(self, Demand=None, Capacity=None, TransportCost=None, OpeningCost=None):
+        """Change the data of the model; only the coefficients that differ are touched."""
+        L = len(self.OpeningCost)
+        if Demand is not None:
+            Demand = np.asarray(Demand, dtype=float)
+            self.demand_rows.RHS = Demand
+            for c in np.flatnonzero(Demand != self.Demand).tolist():
+                for l in range(L):
+                    self.model.chgCoeff(self.assignment_rows[l, c], self.open_vars[l], -Demand[c])
+            self.Demand = Demand
+        if Capacity is not None:
+            Capacity = np.asarray(Capacity, dtype=float)
+            for l in np.flatnonzero(Capacity != self.Capacity).tolist():
+                self.model.chgCoeff(self.capacity_rows[l], self.open_vars[l], -Capacity[l])
+            self.Capacity = Capacity
+        if TransportCost is not None:
+            self.TransportCost = np.asarray(TransportCost, dtype=float)
+            self.UnitsShipped.Obj = self.TransportCost
+        if OpeningCost is not None:
+            self.OpeningCost = np.asarray(OpeningCost, dtype=float)
+            self.OpenFacility.Obj = self.OpeningCost
+
+    def start(self):
+        """Previous open set, with the cheapest facilities per unit of capacity added until the demand fits."""
+        opened = self.opened.copy()
+        usable = np.flatnonzero(self.Capacity > 0)
+        for l in usable[np.argsort(self.OpeningCost[usable] / self.Capacity[usable])]:
+            if self.Capacity[opened].sum() >= self.Demand.sum():
+                break
+            opened[l] = True
+        return opened
+
+    def solve(self, **changes):
+        """Apply ``changes`` (see ``update``), re-optimize and return the ``solving_info`` dict."""
+        self.update(**changes)
+        if self.opened is not None:
+            # Partial MIP start: the solver completes the shipments
+            self.OpenFacility.Start = self.start().astype(float)
+        solution = optimize(self.model, self.backend)
+        if solution.SolCount > 0:
+            self.opened = np.asarray(solution.getAttr("X", self.open_vars)) > 0.5
+        return extract_results(solution, {"UnitsShipped": self.UnitsShipped, "OpenFacility": self.OpenFacility})
+
+
+def main():
+    parser = scenario_parser("Resuelve una secuencia de escenarios de un CFLP modificando el modelo en lugar de reconstruirlo.")
+    args = scenario_args("CFLP", parser)
+    data = load_instance(args.data)
+    incremental = IncrementalCFLP(data["TransportCost"], data["OpeningCost"], data["Demand"], data["Capacity"],
+                                  setup=lambda model: apply_params(model, args), backend=args.backend)
+    incremental.model.Params.OutputFlag = 0
+    # The script must build the same matrix MIP
+    run_scenarios("CFLP", args, data, incremental, ["--mode", "SOLVE_MODE=mip", "--mode", "BUILD_MODE=matrix"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+import gurobipy as gp
+
+from comun.backend import optimize
+
+
+def facility_subproblems(TransportCost, OpeningCost, Demand, Capacity, multipliers):
+    """Solve the Lagrangian subproblem with the demand rows relaxed.
+
+    For an open facility the subproblem is a continuous knapsack where every
+    unit shipped to customer c earns multipliers[c] - TransportCost[l, c] and
+    uses one unit of capacity, so the best shipment fills the customers in
+    decreasing order of profit. All facilities are solved at once, and the
+    open set is completed to the capacity needed by the total demand.
+
+    Returns the bound, the facilities worth opening and their shipments.
+    """
+    L, C = TransportCost.shape
+    profit = multipliers[np.newaxis, :] - TransportCost
+    order = np.argsort(-profit, axis=1)
+    rows = np.arange(L)[:, np.newaxis]
+    sorted_profit = profit[rows, order]
+    sorted_demand = Demand[order]
+    # Capacity left before each customer in profit order
+    before = np.cumsum(sorted_demand, axis=1) - sorted_demand
+    amount = np.clip(Capacity[:, np.newaxis] - before, 0, sorted_demand) * (sorted_profit > 0)
+    shipped = np.zeros_like(TransportCost)
+    shipped[rows, order] = amount
+    value = OpeningCost - (sorted_profit * amount).sum(axis=1)
+    share = (value < 0).astype(float)
+
+    # Any feasible open set covers the total demand: complete the set by the
+    # cheapest value per unit of capacity, the last facility only fractionally;
+    # facilities without capacity cannot help
+    missing = Demand.sum() - Capacity @ share
+    usable = np.flatnonzero(Capacity > 0)
+    for l in usable[np.argsort(value[usable] / Capacity[usable])]:
+        if missing <= 0:
+            break
+        if share[l]:
+            continue
+        share[l] = min(1.0, missing / Capacity[l])
+        missing -= Capacity[l]
+    bound = multipliers @ Demand + value @ share
+    return bound, share > 0, shipped * share[:, np.newaxis]
+
+
+class TransportationLP:
+    """Transportation LP over a set of open facilities, re-solved by changing capacities."""
+
+    def __init__(self, TransportCost, Demand, Capacity, setup=None, backend="gurobi"):
+        L, C = TransportCost.shape
+        self.Capacity = Capacity
+        self.backend = backend
+        self.model = gp.Model('transportation')
+        self.model.Params.OutputFlag = 0
+        if setup is not None:
+            setup(self.model)
+        self.UnitsShipped = self.model.addMVar((L, C), obj=TransportCost, name='UnitsShipped')
+        Columns = self.UnitsShipped.reshape(-1)
+        self.model.addMConstr(sp.kron(np.ones((1, L)), sp.identity(C), format="csr"), Columns, "=", Demand)
+        self.capacity_rows = self.model.addMConstr(sp.kron(sp.identity(L), np.ones((1, C)), format="csr"), Columns, "<", Capacity)
+        self.cache = {}
+
+    def solve(self, opened):
+        """Transport cost and shipments with only ``opened`` facilities; None if infeasible."""
+        key = opened.tobytes()
+        if key not in self.cache:
+            self.capacity_rows.RHS = self.Capacity * opened
+            solution = optimize(self.model, self.backend)
+            if solution.Status == gp.GRB.OPTIMAL:
+                shipped = solution.getAttr("X", self.UnitsShipped.reshape(-1).tolist())
+                self.cache[key] = (solution.ObjVal, np.reshape(shipped, self.UnitsShipped.shape))
+            else:
+                self.cache[key] = None
+        return self.cache[key]
+
+
+def repair(OpeningCost, Demand, Capacity, opened, transportation):
+    """Turn a subproblem open set into a feasible solution.
+
+    Facilities are opened by increasing opening cost per unit of capacity
+    until the demand fits (those without capacity are never added), the
+    transportation LP assigns the customers and facilities left without
+    shipments are closed again.
+    """
+    opened = opened.copy()
+    usable = np.flatnonzero(Capacity > 0)
+    for l in usable[np.argsort(OpeningCost[usable] / Capacity[usable])]:
+        if Capacity[opened].sum() >= Demand.sum():
+            break
+        opened[l] = True
+    solution = transportation.solve(opened)
+    if solution is None:
+        return None
+    transport_cost, shipped = solution
+    opened &= shipped.sum(axis=1) > 1e-9
+    return OpeningCost[opened].sum() + transport_cost, opened, shipped
+
+
+def solve(TransportCost, OpeningCost, Demand, Capacity, max_iterations=500, time_limit=None,
+          tolerance=1e-4, setup=None, backend="gurobi"):
+    """Lagrangian relaxation of the demand rows with subgradient steps and LP repair.
+
+    The multipliers follow Polyak steps towards the best known solution; the
+    step factor is halved after 20 iterations without a better bound. Every
+    new open set of the subproblem is repaired into a feasible solution.
+    ``setup`` is called on the transportation LP to apply the solver settings,
+    and ``backend`` (see ``comun.backend``) solves it.
+
+    Returns a dict with the lower and upper bounds, the open facilities and
+    shipments of the best solution, the multipliers and the iteration count.
+    """
+    start = time.time()
+    TransportCost = np.asarray(TransportCost, dtype=float)
+    OpeningCost = np.asarray(OpeningCost, dtype=float)
+    Demand = np.asarray(Demand, dtype=float)
+    Capacity = np.asarray(Capacity, dtype=float)
+    L, C = TransportCost.shape
+
+    transportation = TransportationLP(TransportCost, Demand, Capacity, setup, backend)
+    best = repair(OpeningCost, Demand, Capacity, np.ones(L, dtype=bool), transportation)
+    if best is None:
+        raise ValueError("La capacidad total no cubre la demanda")
+    upper_bound, best_open, best_shipped = best
+
+    multipliers = TransportCost.min(axis=0)
+    best_multipliers = multipliers
+    lower_bound = -np.inf
+    step_factor = 2.0
+    stalled = 0
+    iteration = 0
+    while iteration < max_iterations:
+        iteration += 1
+        bound, opened, shipped = facility_subproblems(TransportCost, OpeningCost, Demand, Capacity, multipliers)
+        if bound > lower_bound + 1e-9:
+            lower_bound, best_multipliers, stalled = bound, multipliers, 0
+        else:
+            stalled += 1
+            if stalled >= 20:
+                step_factor /= 2
+                stalled = 0
+
+        candidate = repair(OpeningCost, Demand, Capacity, opened, transportation)
+        if candidate is not None and candidate[0] < upper_bound - 1e-9:
+            upper_bound, best_open, best_shipped = candidate
+
+        subgradient = Demand - shipped.sum(axis=0)
+        norm = subgradient @ subgradient
+        if (upper_bound - lower_bound <= tolerance * abs(upper_bound) or norm < 1e-12
+                or step_factor < 1e-4 or (time_limit is not None and time.time() - start > time_limit)):
+            break
+        multipliers = multipliers + step_factor * (upper_bound - bound) / norm * subgradient
+
+    return {
+        "lower_bound": lower_bound,
+        "upper_bound": upper_bound,
+        "open": best_open,
+        "shipped": best_shipped,
+        "multipliers": best_multipliers,
+        "iterations": iteration,
+        "runtime": time.time() - start,
+    }
@@ -1,9 +1,42 @@
-import json
+import os
+import sys
 import numpy as np
+import scipy.sparse as sp
 import gurobipy as gp
 
-with open("Data.json", "r") as f:
-    data = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from comun.backend import optimize
+from comun.candidates import cheapest_arcs, solve_with_pricing
+from comun.cli import apply_params, script_args
+from comun.instances import load_instance
+from comun.instrumentation import Profiler
+from comun.lint import clean_model
+from comun.results import extract_results, make_results
+
+import CFLPLagrangian
+
+# "mip": full MIP solved by --backend
+# "lagrangian": demand rows relaxed, per-facility knapsacks in NumPy, subgradient
+# multipliers and transportation LP repair (see CFLPLagrangian.py); no MIP is built
+SOLVE_MODE = "mip"
+# "matrix": NumPy data, matrix variables and one sparse addMConstr per constraint family
+# "loops": one addConstr per facility/customer pair
+# "sparse": only the CANDIDATE_ARCS cheapest facilities of each customer; the
+# omitted arcs are priced with the duals and added when they improve, and the
+# optimum is certified for all arcs (see comun/candidates.py)
+BUILD_MODE = "matrix"
+CANDIDATE_ARCS = 5
+# Constraint names cost time and memory on large instances (matrix mode only)
+NAME_CONSTRAINTS = False
+
+# Drop constant, duplicate and bound-only rows before optimize (see comun/lint.py)
+CLEAN_MODEL = True
+
+args = script_args("Data.json", globals())
+profiler = Profiler(args.trace_memory)
+
+profiler.phase("load")
+data = load_instance(args.data, args.prefer_binary)
 
 TransportCost = data["TransportCost"]
 OpeningCost = data["OpeningCost"]
@@ -12,73 +45,147 @@ Demand = data["Demand"]
 L = data["L"]
 Capacity = data["Capacity"]
 
-# Define model
-model = gp.Model('model')
-
-
-# ====== Define variables ====== 
-UnitsShipped = model.addVars(L, C, name='UnitsShipped', vtype=gp.GRB.CONTINUOUS)
-OpenFacility = model.addVars(L, name='OpenFacility', vtype=gp.GRB.BINARY)
-
-# ====== Define constraints ====== 
-
-for c in range(C):
-    model.addConstr(gp.quicksum(UnitsShipped[l, c] for l in range(L)) == Demand[c], name=f"demand_fulfillment_customer_{c}")
-
-for l in range(L):
-    model.addConstr(gp.quicksum(UnitsShipped[l, c] for c in range(C)) <= Capacity[l] * OpenFacility[l], name=f"capacity_constraint_{l}")
-
-for l in range(L):
-    for c in range(C):
-        model.addConstr(UnitsShipped[l, c] <= Demand[c] * OpenFacility[l], name=f"demand_assignment_{l}_{c}")
-
-for l in range(L):
-    for c in range(C):
-        model.addConstr(UnitsShipped[l, c] >= 0, name=f"non_negative_shipment_{l}_{c}")
-
-for c in range(C):
-    model.addConstr(gp.quicksum(UnitsShipped[l, c] for l in range(L)) <= Demand[c], name=f'demand_constraint_{c}')
-
-# ====== Define objective ====== 
-
-model.setObjective(gp.quicksum(OpeningCost[l] * OpenFacility[l] for l in range(L)) + gp.quicksum(TransportCost[l][c] * UnitsShipped[l, c] for l in range(L) for c in range(C)), gp.GRB.MINIMIZE)
+if SOLVE_MODE == "lagrangian":
+    profiler.phase("optimize")
+    lagrangian = CFLPLagrangian.solve(TransportCost, OpeningCost, Demand, Capacity, time_limit=args.time_limit,
+                                      setup=lambda lp: apply_params(lp, args), backend=args.backend)
+    # A solution of cost 0 is possible (all costs zero)
+    gap = (lagrangian["upper_bound"] - lagrangian["lower_bound"]) / max(abs(lagrangian["upper_bound"]), 1e-10)
+    print(f"Relajación lagrangiana: cota inferior {lagrangian['lower_bound']}, solución {lagrangian['upper_bound']} "
+          f"(gap {100 * gap:.4f}%, {lagrangian['iterations']} iteraciones)")
+    status = gp.GRB.OPTIMAL if gap <= 1e-4 else gp.GRB.SUBOPTIMAL
+else:
+    # Define model
+    profiler.phase("build")
+    model = gp.Model('model')
+    apply_params(model, args)
+    profiler.watch(model)
+
+
+    if BUILD_MODE == "matrix":
+        TransportCost = np.asarray(TransportCost, dtype=float)
+        OpeningCost = np.asarray(OpeningCost, dtype=float)
+        Demand = np.asarray(Demand, dtype=float)
+        Capacity = np.asarray(Capacity, dtype=float)
+
+        def names(pattern, *shape):
+            if not NAME_CONSTRAINTS:
+                return None
+            return [pattern.format(*index) for index in np.ndindex(*shape)]
+
+        # ====== Define variables ====== 
+        # The objective coefficients are set directly on the variables
+        UnitsShipped = model.addMVar((L, C), obj=TransportCost, name='UnitsShipped', vtype=gp.GRB.CONTINUOUS)
+        OpenFacility = model.addMVar(L, obj=OpeningCost, name='OpenFacility', vtype=gp.GRB.BINARY)
+        model.ModelSense = gp.GRB.MINIMIZE
+
+        # Columns: UnitsShipped row by row, then OpenFacility
+        Columns = gp.hstack((UnitsShipped.reshape(-1), OpenFacility))
+
+        # ====== Define constraints ====== 
+        # non_negative_shipment and demand_constraint are implied by the variable
+        # bounds and the demand equality, so they are not generated here
+
+        DemandRows = sp.hstack([sp.kron(np.ones((1, L)), sp.identity(C)), sp.csr_matrix((C, L))], format="csr")
+        model.addMConstr(DemandRows, Columns, "=", Demand, name=names("demand_fulfillment_customer_{}", C))
+
+        CapacityRows = sp.hstack([sp.kron(sp.identity(L), np.ones((1, C))), -sp.diags(Capacity)], format="csr")
+        model.addMConstr(CapacityRows, Columns, "<", np.zeros(L), name=names("capacity_constraint_{}", L))
+
+        AssignmentRows = sp.hstack([sp.identity(L * C), -sp.kron(sp.identity(L), Demand[:, np.newaxis])], format="csr")
+        model.addMConstr(AssignmentRows, Columns, "<", np.zeros(L * C), name=names("demand_assignment_{}_{}", L, C))
+    elif BUILD_MODE == "sparse":
+        Arcs = cheapest_arcs(TransportCost, CANDIDATE_ARCS)
+
+        # ====== Define variables ====== 
+        # The objective coefficients are set directly on the variables
+        ArcList = [(l, c) for l, c in np.argwhere(Arcs).tolist()]
+        UnitsShipped = model.addVars(ArcList, obj=[TransportCost[l][c] for l, c in ArcList], name='UnitsShipped', vtype=gp.GRB.CONTINUOUS)
+        OpenFacility = model.addVars(L, obj=OpeningCost, name='OpenFacility', vtype=gp.GRB.BINARY)
+        model.ModelSense = gp.GRB.MINIMIZE
+
+        # ====== Define constraints ====== 
+
+        demand_rows = [
+            model.addConstr(UnitsShipped.sum('*', c) == Demand[c], name=f"demand_fulfillment_customer_{c}")
+            for c in range(C)
+        ]
+
+        capacity_rows = [
+            model.addConstr(UnitsShipped.sum(l, '*') <= Capacity[l] * OpenFacility[l], name=f"capacity_constraint_{l}")
+            for l in range(L)
+        ]
+
+        for l, c in ArcList:
+            model.addConstr(UnitsShipped[l, c] <= Demand[c] * OpenFacility[l], name=f"demand_assignment_{l}_{c}")
+
+        def add_arc(l, c):
+            # Priced-in arc: shipment variable in its demand and capacity rows, plus its linking row
+            UnitsShipped[l, c] = model.addVar(obj=TransportCost[l][c], name=f"UnitsShipped[{l},{c}]", vtype=gp.GRB.CONTINUOUS,
+                                              column=gp.Column([1, 1], [demand_rows[c], capacity_rows[l]]))
+            model.addConstr(UnitsShipped[l, c] <= Demand[c] * OpenFacility[l], name=f"demand_assignment_{l}_{c}")
+    else:
+        # ====== Define variables ====== 
+        UnitsShipped = model.addVars(L, C, name='UnitsShipped', vtype=gp.GRB.CONTINUOUS)
+        OpenFacility = model.addVars(L, name='OpenFacility', vtype=gp.GRB.BINARY)
+
+        # ====== Define constraints ====== 
+
+        for c in range(C):
+            model.addConstr(gp.quicksum(UnitsShipped[l, c] for l in range(L)) == Demand[c], name=f"demand_fulfillment_customer_{c}")
+
+        for l in range(L):
+            model.addConstr(gp.quicksum(UnitsShipped[l, c] for c in range(C)) <= Capacity[l] * OpenFacility[l], name=f"capacity_constraint_{l}")
+
+        for l in range(L):
+            for c in range(C):
+                model.addConstr(UnitsShipped[l, c] <= Demand[c] * OpenFacility[l], name=f"demand_assignment_{l}_{c}")
+
+        for l in range(L):
+            for c in range(C):
+                model.addConstr(UnitsShipped[l, c] >= 0, name=f"non_negative_shipment_{l}_{c}")
+
+        for c in range(C):
+            model.addConstr(gp.quicksum(UnitsShipped[l, c] for l in range(L)) <= Demand[c], name=f'demand_constraint_{c}')
+
+        # ====== Define objective ====== 
+
+        model.setObjective(gp.quicksum(OpeningCost[l] * OpenFacility[l] for l in range(L)) + gp.quicksum(TransportCost[l][c] * UnitsShipped[l, c] for l in range(L) for c in range(C)), gp.GRB.MINIMIZE)
+
+    # The matrix and sparse models have no redundant rows by construction, and the
+    # pricing keeps handles to the demand and capacity rows, which a customer with
+    # a single arc would lose
+    if CLEAN_MODEL and BUILD_MODE == "loops":
+        clean_model(model)
 
-# Optimize model
-model.optimize()
+    # Optimize model
+    profiler.phase("optimize")
+    if BUILD_MODE == "sparse":
+        pricing = solve_with_pricing(model, TransportCost, Arcs, demand_rows, capacity_rows, add_arc,
+                                     [OpenFacility[l] for l in range(L)], args.backend)
+        solution = pricing["solution"]
+        print(f"Arcos candidatos: {int(Arcs.sum())} de {L * C} ({pricing['added']['lp']} añadidos por la relajación, "
+              f"{pricing['added']['mip']} por la solución entera, {pricing['added']['overflow']} por el desbordamiento), "
+              f"cota LP {pricing['lp_bound']}, " + ("óptimo certificado para todos los arcos" if pricing["certified"] else "sin certificar"))
+    else:
+        solution = optimize(model, args.backend)
 
 
-# Get model status
-status = model.status
+    # Get model status
+    status = solution.Status
 
 
 # Get solver information
-solving_info = {}
-
-if status == gp.GRB.OPTIMAL:
-    solving_info["status"] = "Optimal (2)"
-    solving_info["objective_value"] = model.objVal
-    solving_info["variables"] = [
-        {
-            "symbol": var.VarName,
-            "value": var.X,
-        }
-        for var in model.getVars()
-    ]
-    solving_info["runtime"] = model.Runtime
-    solving_info["iteration_count"] = model.IterCount
+profiler.phase("extract")
+if SOLVE_MODE == "lagrangian":
+    solving_info = make_results(status, lagrangian["upper_bound"], {
+        "UnitsShipped": (np.argwhere(np.ones((L, C), dtype=bool)), lagrangian["shipped"].ravel()),
+        "OpenFacility": (np.arange(L)[:, np.newaxis], lagrangian["open"]),
+    }, lagrangian["runtime"], lagrangian["iterations"], gap)
+    solving_info["lower_bound"] = lagrangian["lower_bound"]
 else:
-    status_dict = {
-        gp.GRB.INFEASIBLE: "Infeasible",
-        gp.GRB.INF_OR_UNBD: "Infeasible or Unbounded",
-        gp.GRB.UNBOUNDED: "Unbounded",
-        gp.GRB.OPTIMAL: "Optimal",
-    }
-    solving_info["status"] = (
-        status_dict[model.status] + f" ({model.status})"
-        if model.status in status_dict
-        else status_dict[model.status]
-    )
-    solving_info["objective_value"] = None
-    solving_info["variables"] = []
-    solving_info["runtime"] = None
-    solving_info["iteration_count"] = None
\ No newline at end of file
+    solving_info = extract_results(solution, {"UnitsShipped": UnitsShipped, "OpenFacility": OpenFacility})
+profiler.stop()
+solving_info["profile"] = profiler.record()
+
+profiler.report()
@@ -0,0 +1,170 @@
+"""Incremental CSP: one model per instance, re-solved as the demands change.
+
+Usage::
+
+    python CPPIncremental.py Data5.json --count 50 --spread 0.2 --compare
+    python CPPIncremental.py DataCG.json --column-generation --scenarios escenarios.jsonl
+
+The integer model is the one ``CPP_P.py`` solves after ``clean_model``:
+one demand_met row per piece and one ``UsageCount`` per pattern. A new
+demand vector only changes the right-hand sides, and new pattern costs the
+objective. Each solve starts from the previous usage counts, raised with
+the patterns richest in the pieces left short.
+
+With ``--column-generation`` the patterns are priced as in ``CPP_P.py``
+(``SOLVE_MODE = "column_generation"``), but the master LP and the pricing
+knapsack live as long as the instance: the patterns generated for earlier
+scenarios stay in both models, and the master LP is re-solved from its
+previous basis. As in the script, the integer model is only solved over the
+patterns generated so far, and those differ from the ones a rebuild would
+price, so the two loops can end a few rolls apart; ``lp_bound`` bounds both.
+"""
+
+import math
+import os
+import sys
+
+import numpy as np
+
+import gurobipy as gp
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from comun.backend import optimize
+from comun.cli import apply_params
+from comun.instances import load_instance
+from comun.results import extract_results
+from comun.scenarios import run_scenarios, scenario_args, scenario_parser
+
+
+class IncrementalCSP:
+    """Cutting stock model of one instance whose demands are changed in place between solves.
+
+    ``Width`` and ``RollWidth`` turn on column generation, with ``RollCost``
+    as the cost of every generated pattern.
+    """
+
+    def __init__(self, Pattern, MaterialUsedForPattern, Demand, Width=None, RollWidth=None, RollCost=1.0,
+                 setup=None, backend="gurobi"):
+        self.Pattern = [list(pattern) for pattern in Pattern]
+        self.MaterialUsedForPattern = list(MaterialUsedForPattern)
+        self.Demand = np.asarray(Demand, dtype=float)
+        self.RollCost = RollCost
+        self.backend = backend
+        T = len(self.Demand)
+
+        # The integer model and, for column generation, its LP master with the same columns
+        self.model = gp.Model('model')
+        self.master = gp.Model('master') if Width is not None else None
+        self.UsageCount = gp.tupledict()
+        self.Columns = []
+        self.demand_met = {}
+        for model in filter(None, (self.model, self.master)):
+            if setup is not None:
+                setup(model)
+            self.demand_met[model] = [model.addConstr(gp.LinExpr() >= self.Demand[t], name=f"demand_met_{t}") for t in range(T)]
+        for p, pattern in enumerate(self.Pattern):
+            self.add_pattern(pattern, self.MaterialUsedForPattern[p])
+
+        if self.master is not None:
+            # Pricing: integer knapsack over the piece widths with the demand_met duals as profits
+            self.pricing = gp.Model('pricing')
+            self.pricing.Params.OutputFlag = 0
+            self.Pieces = self.pricing.addVars(T, name='Pieces', vtype=gp.GRB.INTEGER, ub=[int(RollWidth // Width[t]) for t in range(T)])
+            self.pricing.addConstr(gp.quicksum(Width[t] * self.Pieces[t] for t in range(T)) <= RollWidth, name="roll_width")
+            self.pricing.ModelSense = gp.GRB.MAXIMIZE
+        self.counts = None
+
+    def add_pattern(self, pattern, cost):
+        """Add a ``UsageCount`` column for ``pattern`` to the integer model and to the master."""
+        p = len(self.UsageCount)
+        coeffs = [(pattern[t], t) for t in range(len(pattern)) if pattern[t] > 0]
+        self.UsageCount[p] = self.model.addVar(obj=cost, vtype=gp.GRB.INTEGER, name=f"UsageCount[{p}]",
+                                               column=gp.Column([c for c, _ in coeffs], [self.demand_met[self.model][t] for _, t in coeffs]))
+        if self.master is not None:
+            self.Columns.append(self.master.addVar(obj=cost, vtype=gp.GRB.CONTINUOUS, name=f"UsageCount[{p}]",
+                                                   column=gp.Column([c for c, _ in coeffs], [self.demand_met[self.master][t] for _, t in coeffs])))
+
+    def update(self, Demand=None, MaterialUsedForPattern=None):
+        """Change the demands and the pattern costs (one per current pattern) of the models."""
+        if Demand is not None:
+            self.Demand = np.asarray(Demand, dtype=float)
+            for rows in self.demand_met.values():
+                for row, demand in zip(rows, self.Demand.tolist()):
+                    row.RHS = demand
+        if MaterialUsedForPattern is not None:
+            self.MaterialUsedForPattern = list(MaterialUsedForPattern)
+            self.model.setAttr("Obj", list(self.UsageCount.values()), self.MaterialUsedForPattern)
+            if self.master is not None:
+                self.master.setAttr("Obj", self.Columns, self.MaterialUsedForPattern)
+
+    def generate_columns(self):
+        """Price patterns into both models until the master LP has no negative reduced cost; returns the LP bound."""
+        T = len(self.Demand)
+        while True:
+            solution = optimize(self.master, self.backend)
+            duals = solution.getAttr("Pi", self.demand_met[self.master])
+            self.pricing.setAttr("Obj", self.Pieces, duals)
+            pricing_solution = optimize(self.pricing, self.backend, share=False)
+            if self.RollCost - pricing_solution.ObjVal > -1e-6:
+                return solution.ObjVal
+            new_pieces = pricing_solution.getAttr("X", self.Pieces)
+            new_pattern = [int(round(new_pieces[t])) for t in range(T)]
+            self.add_pattern(new_pattern, self.RollCost)
+            self.Pattern.append(new_pattern)
+            self.MaterialUsedForPattern.append(self.RollCost)
+
+    def start(self):
+        """Previous usage counts, with the patterns richest in each short piece used until its demand is met."""
+        Pattern = np.array(self.Pattern, dtype=float)
+        counts = np.zeros(len(Pattern))
+        counts[:len(self.counts)] = self.counts
+        for t in range(len(self.Demand)):
+            short = self.Demand[t] - Pattern[:, t] @ counts
+            p = int(np.argmax(Pattern[:, t]))
+            if short > 0 and Pattern[p, t] > 0:
+                counts[p] += math.ceil(short / Pattern[p, t])
+        return counts
+
+    def solve(self, **changes):
+        """Apply ``changes`` (see ``update``), re-optimize and return the ``solving_info`` dict."""
+        self.update(**changes)
+        lp_bound = self.generate_columns() if self.master is not None else None
+        if self.counts is not None:
+            self.model.setAttr("Start", list(self.UsageCount.values()), self.start().tolist())
+        solution = optimize(self.model, self.backend)
+        if solution.SolCount > 0:
+            self.counts = np.rint(solution.getAttr("X", list(self.UsageCount.values())))
+        solving_info = extract_results(solution, {"UsageCount": self.UsageCount})
+        solving_info["patterns"] = len(self.Pattern)
+        if lp_bound is not None:
+            solving_info["lp_bound"] = lp_bound
+        return solving_info
+
+
+def main():
+    parser = scenario_parser("Resuelve una secuencia de escenarios de demanda de un CSP modificando el modelo en lugar de reconstruirlo.")
+    parser.add_argument("--column-generation", action="store_true",
+                        help="generar los patrones a partir de Width y RollWidth, como SOLVE_MODE = \"column_generation\"")
+    args = scenario_args("CSP", parser)
+    data = load_instance(args.data)
+    T = data["T"]
+    if args.column_generation:
+        Width = data["Width"]
+        RollWidth = data["RollWidth"]
+        RollCost = data.get("RollCost", 1.0)
+        # Trivial one-width patterns, as in CPP_P.py
+        Pattern = [[int(RollWidth // Width[t]) if u == t else 0 for u in range(T)] for t in range(T)]
+        incremental = IncrementalCSP(Pattern, [RollCost] * T, data["Demand"], Width, RollWidth, RollCost,
+                                     setup=lambda model: apply_params(model, args), backend=args.backend)
+        incremental.master.Params.OutputFlag = 0
+        script_argv = ["--mode", "SOLVE_MODE=column_generation"]
+    else:
+        incremental = IncrementalCSP(data["Pattern"], data["MaterialUsedForPattern"], data["Demand"],
+                                     setup=lambda model: apply_params(model, args), backend=args.backend)
+        script_argv = ["--mode", "SOLVE_MODE=patterns"]
+    incremental.model.Params.OutputFlag = 0
+    run_scenarios("CSP", args, data, incremental, script_argv)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,54 @@
-import json
+import math
+import os
+import sys
 import numpy as np
 import gurobipy as gp
 
-with open("Data5.json", "r") as f:
-    data = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from comun.backend import optimize
+from comun.cli import apply_params, script_args
+from comun.instances import load_instance
+from comun.instrumentation import Profiler
+from comun.lint import clean_model
+from comun.results import extract_results, status_name
+
+# "patterns": every pattern is enumerated in the data file (Pattern, MaterialUsedForPattern)
+# "column_generation": Gilmore-Gomory pricing from the piece widths (Width, RollWidth),
+# starting from the trivial one-width patterns (see DataCG.json)
+SOLVE_MODE = "patterns"
+
+# Drop constant, duplicate and bound-only rows before optimize (see comun/lint.py)
+CLEAN_MODEL = True
+
+args = script_args(None, globals())
+# Column generation needs the piece widths, which only DataCG.json has
+if args.data is None:
+    args.data = "DataCG.json" if SOLVE_MODE == "column_generation" else "Data5.json"
+profiler = Profiler(args.trace_memory)
+
+profiler.phase("load")
+data = load_instance(args.data, args.prefer_binary)
 
 Demand = data["Demand"]
 T = data["T"]
-P = data["P"]
-Pattern = data["Pattern"]
-MaterialUsedForPattern = data["MaterialUsedForPattern"]
+
+if SOLVE_MODE == "column_generation":
+    Width = data["Width"]
+    RollWidth = data["RollWidth"]
+    RollCost = data.get("RollCost", 1.0)
+    P = T
+    Pattern = [[int(RollWidth // Width[t]) if u == t else 0 for u in range(T)] for t in range(T)]
+    MaterialUsedForPattern = [RollCost] * P
+else:
+    P = data["P"]
+    Pattern = data["Pattern"]
+    MaterialUsedForPattern = data["MaterialUsedForPattern"]
 
 # Define model
+profiler.phase("build")
 model = gp.Model('model')
+apply_params(model, args)
+profiler.watch(model)
 
 # ====== Define variables ====== 
 UsageCount = model.addVars(P, name='UsageCount', vtype=gp.GRB.INTEGER)
@@ -27,46 +63,83 @@ for p in range(P):
 
 for p in range(P):
     for t in range(T):
-        model.addConstr(Pattern[p][t] >= 0, name=f"non_negativity_pattern_{p}_{t}")
+        model.addConstr(bool(Pattern[p][t] >= 0), name=f"non_negativity_pattern_{p}_{t}")
 
 # ====== Define objective ====== 
 
 model.setObjective(gp.quicksum(MaterialUsedForPattern[p] * UsageCount[p] for p in range(P)), gp.GRB.MINIMIZE)
 
+# ====== Column generation ====== 
+
+if SOLVE_MODE == "column_generation":
+    profiler.phase("column_generation")
+    # Pricing: integer knapsack over the piece widths with the demand_met duals as profits
+    pricing = gp.Model('pricing')
+    pricing.Params.OutputFlag = 0
+    Pieces = pricing.addVars(T, name='Pieces', vtype=gp.GRB.INTEGER, ub=[int(RollWidth // Width[t]) for t in range(T)])
+    pricing.addConstr(gp.quicksum(Width[t] * Pieces[t] for t in range(T)) <= RollWidth, name="roll_width")
+    pricing.ModelSense = gp.GRB.MAXIMIZE
+
+    model.update()
+    demand_met = [model.getConstrByName(f"demand_met_{t}") for t in range(T)]
+    for p in range(P):
+        UsageCount[p].VType = gp.GRB.CONTINUOUS
+    # Quiet master LPs; the log setting given on the command line comes back for the integer solve
+    output_flag = model.Params.OutputFlag
+    model.Params.OutputFlag = 0
+
+    while True:
+        solution = optimize(model, args.backend)
+        duals = solution.getAttr("Pi", demand_met)
+        pricing.setAttr("Obj", Pieces, duals)
+        pricing_solution = optimize(pricing, args.backend, share=False)
+        if RollCost - pricing_solution.ObjVal > -1e-6:
+            break
+        new_pieces = pricing_solution.getAttr("X", Pieces)
+        new_pattern = [int(round(new_pieces[t])) for t in range(T)]
+        coeffs = [(new_pattern[t], demand_met[t]) for t in range(T) if new_pattern[t] > 0]
+        UsageCount[P] = model.addVar(obj=RollCost, vtype=gp.GRB.CONTINUOUS, name=f"UsageCount[{P}]",
+                                     column=gp.Column([c for c, _ in coeffs], [r for _, r in coeffs]))
+        Pattern.append(new_pattern)
+        MaterialUsedForPattern.append(RollCost)
+        P += 1
+
+    lp_bound = solution.ObjVal
+    print(f"Generación de columnas: {P} patrones, cota LP {lp_bound}")
+
+    # Integer solve restricted to the generated patterns
+    profiler.phase("build")
+    for p in range(P):
+        UsageCount[p].VType = gp.GRB.INTEGER
+    model.Params.OutputFlag = output_flag
+
+if CLEAN_MODEL:
+    clean_model(model)
+
 # Optimize model
-model.optimize()
+profiler.phase("optimize")
+solution = optimize(model, args.backend)
 
 # Get model status
-status = model.status
+status = solution.Status
+if SOLVE_MODE == "column_generation":
+    # Price-and-branch: optimal over the generated patterns only, proven
+    # optimal for the cutting stock only when it meets the rounded LP bound
+    roll_bound = RollCost * math.ceil(lp_bound / RollCost - 1e-6)
+    if status == gp.GRB.OPTIMAL and solution.ObjVal > roll_bound + 1e-6:
+        status = gp.GRB.SUBOPTIMAL
 
 # Get solver information
-solving_info = {}
-
-if status == gp.GRB.OPTIMAL:
-    solving_info["status"] = "Optimal (2)"
-    solving_info["objective_value"] = model.objVal
-    solving_info["variables"] = [
-        {
-            "symbol": var.VarName,
-            "value": var.X,
-        }
-        for var in model.getVars()
-    ]
-    solving_info["runtime"] = model.Runtime
-    solving_info["iteration_count"] = model.IterCount
-else:
-    status_dict = {
-        gp.GRB.INFEASIBLE: "Infeasible",
-        gp.GRB.INF_OR_UNBD: "Infeasible or Unbounded",
-        gp.GRB.UNBOUNDED: "Unbounded",
-        gp.GRB.OPTIMAL: "Optimal",
-    }
-    solving_info["status"] = (
-        status_dict[model.status] + f" ({model.status})"
-        if model.status in status_dict
-        else status_dict[model.status]
-    )
-    solving_info["objective_value"] = None
-    solving_info["variables"] = []
-    solving_info["runtime"] = None
-    solving_info["iteration_count"] = None
\ No newline at end of file
+profiler.phase("extract")
+solving_info = extract_results(solution, {"UsageCount": UsageCount})
+if SOLVE_MODE == "column_generation":
+    solving_info["status"] = status_name(status)
+    solving_info["lp_bound"] = lp_bound
+    if status == gp.GRB.SUBOPTIMAL:
+        solving_info["mip_gap"] = (solution.ObjVal - roll_bound) / solution.ObjVal
+        print(f"Solución entera sobre los patrones generados: {solution.ObjVal}, "
+              f"no probada óptima (cota LP {lp_bound}, mínimo {roll_bound})")
+profiler.stop()
+solving_info["profile"] = profiler.record()
+
+profiler.report()
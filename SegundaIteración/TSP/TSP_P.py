@@ -1,105 +1,223 @@
-import json
+import os
+import sys
 import numpy as np
 
 import gurobipy as gp
 
-with open("Data5.json", "r") as f:
-    data = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from comun.backend import optimize
+from comun.cli import apply_params, script_args
+from comun.instances import load_instance
+from comun.instrumentation import Profiler
+from comun.lint import clean_model
+from comun.model_cache import load_model, model_key, save_model
+from comun.results import extract_results, symbols
+from comun.tsp_candidates import candidate_arcs, improving_arcs, subtour_bound
+from comun.tsp_heuristics import heuristic_tour, tour_arcs
+
+# "lazy": degree constraints only, subtours cut on demand from a MIPSOL callback
+# (with --backend highs, on every integer solution between re-solves)
+# "enumerate": one subtour_elimination row per subset (exponential in N)
+SUBTOUR_MODE = "lazy"
+
+# Drop constant, duplicate and bound-only rows before optimize (see comun/lint.py)
+CLEAN_MODEL = True
+
+# Nearest neighbour + 2-opt/Or-opt tour as MIP start, and its length as cutoff
+WARM_START = True
+CUTOFF_TOLERANCE = 1e-6
+
+# None: full N x N matrix. k: only the k nearest successors and predecessors of
+# each city and the heuristic tour arcs; the other arcs are priced against the
+# subtour LP and added while they could shorten the tour (see comun/tsp_candidates.py).
+# The sparse model always cuts subtours lazily
+CANDIDATE_EDGES = None
+
+args = script_args("Data5.json", globals())
+profiler = Profiler(args.trace_memory)
+
+profiler.phase("load")
+data = load_instance(args.data, args.prefer_binary)
 
 
 Distance = data["Distance"]
 N = data["N"]
 
-# Define model
-model = gp.Model('model')
+if WARM_START or CANDIDATE_EDGES is not None:
+    profiler.phase("heuristic")
+    tour, tour_length = heuristic_tour(Distance)
+    print(f"Heurística: recorrido de longitud {tour_length}")
+
+if CANDIDATE_EDGES is not None:
+    profiler.phase("pricing")
+    pricing = subtour_bound(Distance, candidate_arcs(Distance, CANDIDATE_EDGES, tour), setup=lambda lp: apply_params(lp, args), backend=args.backend)
+    Arcs = pricing["arcs"]
+
+# Reuse the model built for this instance and variant (see comun/model_cache.py)
+key = model_key("TSP", {"SUBTOUR_MODE": SUBTOUR_MODE, "CLEAN_MODEL": CLEAN_MODEL}, data, __file__) if args.model_cache and CANDIDATE_EDGES is None else None
+cached = load_model(key) if key is not None else None
+
+if cached is None:
+    # Define model
+    profiler.phase("build")
+    model = gp.Model('model')
+    profiler.watch(model)
+
+
+    if CANDIDATE_EDGES is not None:
+        # ====== Define variables ====== 
+        # The objective coefficients are set directly on the variables
+        ArcList = [(i, j) for i, j in np.argwhere(Arcs).tolist()]
+        X = model.addVars(ArcList, obj=[Distance[i][j] for i, j in ArcList], name='X', vtype=gp.GRB.BINARY)
+        model.ModelSense = gp.GRB.MINIMIZE
+
+        # ====== Define constraints ====== 
+
+        outgoing_rows = [model.addConstr(X.sum(i, '*') == 1, name=f"outgoing_{i}") for i in range(N)]
+        incoming_rows = [model.addConstr(X.sum('*', j) == 1, name=f"incoming_{j}") for j in range(N)]
+
+        def add_arc(i, j):
+            # Priced-in arc: binary variable in its outgoing and incoming rows
+            X[i, j] = model.addVar(obj=Distance[i][j], name=f"X[{i},{j}]", vtype=gp.GRB.BINARY,
+                                   column=gp.Column([1, 1], [outgoing_rows[i], incoming_rows[j]]))
+            Arcs[i, j] = True
+    else:
+        # ====== Define variables ====== 
+        X = model.addVars(N, N, name='X', vtype=gp.GRB.BINARY)
 
+        # ====== Define constraints ====== 
 
-# ====== Define variables ====== 
-X = model.addVars(N, N, name='X', vtype=gp.GRB.BINARY)
+        for i in range(N):
+            model.addConstr(gp.quicksum(X[i, j] for j in range(N)) == 1, name=f"visit_once_row_{i}")
 
-# ====== Define constraints ====== 
+        for j in range(N):
+            model.addConstr(gp.quicksum(X[i, j] for i in range(N)) == 1, name=f"visit_once_col_{j}")
 
-for i in range(N):
-    model.addConstr(gp.quicksum(X[i, j] for j in range(N)) == 1, name=f"visit_once_row_{i}")
+        model.addConstr(gp.quicksum(X[i, i] for i in range(N)) == 0, name="no_self_loop")
 
-for j in range(N):
-    model.addConstr(gp.quicksum(X[i, j] for i in range(N)) == 1, name=f"visit_once_col_{j}")
+        for j in range(N):
+            model.addConstr(gp.quicksum(X[i, j] for i in range(N)) == 1, name=f"incoming_{j}")
 
-model.addConstr(gp.quicksum(X[i, i] for i in range(N)) == 0, name="no_self_loop")
+        for i in range(N):
+            model.addConstr(gp.quicksum(X[i, j] for j in range(N) if j != i) == 1, name=f"outgoing_{i}")
 
-for j in range(N):
-    model.addConstr(gp.quicksum(X[i, j] for i in range(N)) == 1, name=f"incoming_{j}")
+        if SUBTOUR_MODE == "enumerate":
+            from itertools import combinations
 
-for i in range(N):
-    model.addConstr(gp.quicksum(X[i, j] for j in range(N) if j != i) == 1, name=f"outgoing_{i}")
+            for size in range(2, N):
+                for subset in combinations(range(N), size):
+                    model.addConstr(gp.quicksum(X[i, j] for i in subset for j in subset) <= len(subset) - 1, name="subtour_elimination_{}".format(subset))
 
-from itertools import combinations
+        for i in range(N):
+            model.addConstr(X[i, i] == 0, name=f"no_self_loop_{i}")
 
-for size in range(2, N):
-    for subset in combinations(range(N), size):
-        model.addConstr(gp.quicksum(X[i, j] for i in subset for j in subset) <= len(subset) - 1, name="subtour_elimination_{}".format(subset))
+        # ====== Define objective ====== 
 
-for i in range(N):
-    model.addConstr(X[i, i] == 0, name=f"no_self_loop_{i}")
+        model.setObjective(gp.quicksum(Distance[i][j] * X[i, j] for i in range(N) for j in range(N)), gp.GRB.MINIMIZE)
 
-model.addConstr(N >= 1, name="num_cities_positive")
+    # The sparse model has no redundant rows, and the pricing keeps handles to the degree rows
+    if CLEAN_MODEL and CANDIDATE_EDGES is None:
+        clean_model(model)
 
-for i in range(N):
-    for j in range(N):
-        if i != j:
-            model.addConstr(Distance[i][j] >= 0, name=f"non_negative_distance_{i}_{j}")
+    if key is not None:
+        save_model(model, key, {"X": X})
+else:
+    profiler.phase("model_cache")
+    model, groups = cached
+    profiler.watch(model)
+    print(f"Modelo leído de la caché: {model.NumVars} variables, {model.NumConstrs} restricciones")
+    X = groups["X"]
+
+apply_params(model, args)
+
+if WARM_START:
+    arcs = set(tour_arcs(tour))
+    for (i, j), var in X.items():
+        var.Start = 1 if (i, j) in arcs else 0
+    model.Params.Cutoff = tour_length + CUTOFF_TOLERANCE
+
+# ====== Lazy subtour elimination ====== 
+
+def subtours(values):
+    # Connected components of the successor graph given by the incumbent
+    successor = {i: j for (i, j), v in values.items() if v > 0.5}
+    unvisited = set(range(N))
+    components = []
+    while unvisited:
+        city = unvisited.pop()
+        component = [city]
+        city = successor.get(city)
+        while city in unvisited:
+            unvisited.remove(city)
+            component.append(city)
+            city = successor.get(city)
+        components.append(component)
+    return components
+
+
+def subtour_rows(values):
+    return [gp.quicksum(X[i, j] for i in subset for j in subset if (i, j) in X) <= len(subset) - 1
+            for subset in subtours(values) if len(subset) < N]
 
-# ====== Define objective ====== 
 
-model.setObjective(gp.quicksum(Distance[i][j] * X[i, j] for i in range(N) for j in range(N)), gp.GRB.MINIMIZE)
+def subtour_callback(model, where):
+    if where == gp.GRB.Callback.MIPSOL:
+        for row in subtour_rows(model.cbGetSolution(X)):
+            model.cbLazy(row)
+
+
+def lazy_subtours(solution):
+    return subtour_rows(solution.getAttr("X", X))
+
 
 # Optimize model
-model.optimize()
+profiler.phase("optimize")
+if SUBTOUR_MODE == "lazy" or CANDIDATE_EDGES is not None:
+    model.Params.LazyConstraints = 1
+    solution = optimize(model, args.backend, subtour_callback, lazy_subtours)
+    added = 0
+    # Excluded arcs whose reduced cost is below the gap to the LP bound could
+    # still shorten the tour: add them and re-solve from the incumbent
+    while CANDIDATE_EDGES is not None and solution.Status == gp.GRB.OPTIMAL:
+        missing = improving_arcs(pricing["reduced_costs"], Arcs, solution.ObjVal, pricing["bound"])
+        if not missing:
+            break
+        incumbent = solution.getAttr("X", X)
+        for i, j in missing:
+            add_arc(i, j)
+        for arc, value in incumbent.items():
+            X[arc].Start = value
+        added += len(missing)
+        solution = optimize(model, args.backend, subtour_callback, lazy_subtours)
+    if CANDIDATE_EDGES is not None:
+        print(f"Aristas candidatas: {int(Arcs.sum())} de {N * (N - 1)} ({pricing['added']} añadidas por la relajación, "
+              f"{added} por la solución entera), cota LP {pricing['bound']}")
+else:
+    solution = optimize(model, args.backend)
 
 
 # Get model status
-status = model.status
+status = solution.Status
 
 
 # Get solver information
-solving_info = {}
+profiler.phase("extract")
+solving_info = extract_results(solution, {"X": X})
+
+profiler.stop()
+solving_info["profile"] = profiler.record()
 
 if status == gp.GRB.OPTIMAL:
-    solving_info["status"] = "Optimal (2)"
-    solving_info["objective_value"] = model.objVal
-    solving_info["variables"] = [
-        {
-            "symbol": var.VarName,
-            "value": var.X,
-        }
-        for var in model.getVars()
-    ]
-    solving_info["runtime"] = model.Runtime
-    solving_info["iteration_count"] = model.IterCount
 
      ## Añadido para mostrar información por consola
     print("----------------- Modelo optimizado con éxito. ---------------")
     print("Estado:", solving_info["status"])
     print("Valor objetivo:", solving_info["objective_value"])
     print("Variables seleccionadas:")
-    for var in solving_info["variables"]:
-        if var['value'] == 1:
-            print(f"  {var['symbol']}: {var['value']}")
+    for symbol, value in symbols(solving_info["variables"]):
+        if value == 1:
+            print(f"  {symbol}: {value}")
     print("Tiempo de ejecución:", solving_info["runtime"])
     print("Iteraciones:", solving_info["iteration_count"])
-else:
-    status_dict = {
-        gp.GRB.INFEASIBLE: "Infeasible",
-        gp.GRB.INF_OR_UNBD: "Infeasible or Unbounded",
-        gp.GRB.UNBOUNDED: "Unbounded",
-        gp.GRB.OPTIMAL: "Optimal",
-    }
-    solving_info["status"] = (
-        status_dict[model.status] + f" ({model.status})"
-        if model.status in status_dict
-        else status_dict[model.status]
-    )
-    solving_info["objective_value"] = None
-    solving_info["variables"] = []
-    solving_info["runtime"] = None
-    solving_info["iteration_count"] = None
\ No newline at end of file
+
+profiler.report()
@@ -1,83 +1,225 @@
-import json
+import os
+import sys
 import numpy as np
 import gurobipy as gp
 
-# Load data
-with open("Data5.json", "r") as f:
-    data = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from comun.backend import optimize
+from comun.cli import apply_params, script_args
+from comun.instances import load_instance
+from comun.instrumentation import Profiler
+from comun.lint import clean_model
+from comun.model_cache import load_model, model_key, save_model
+from comun.results import extract_results
+from comun.vrp_heuristics import heuristic_routes, route_arcs
+from collections import deque
+
+# "separate": subtours cut at MIPNODE (max-flow on the fractional Travel values)
+# and MIPSOL (components of the integer solution) callbacks; with --backend highs
+# only the integer cuts, between re-solves
+# "enumerate": one subtour_elimination row per customer subset (exponential in N)
+SUBTOUR_MODE = "separate"
+# Minimum violation for a fractional cut to be added as a user cut
+CUT_VIOLATION = 1e-3
+
+# Drop constant, duplicate and bound-only rows before optimize (see comun/lint.py)
+CLEAN_MODEL = True
+
+# Savings routes improved by local search as MIP start, and their cost as cutoff
+WARM_START = True
+CUTOFF_TOLERANCE = 1e-6
+
+args = script_args("Data5.json", globals())
+profiler = Profiler(args.trace_memory)
+
+profiler.phase("load")
+data = load_instance(args.data, args.prefer_binary)
 
 M = data["M"]
 Distance = data["Distance"]
 N = data["N"]
 
-# Define model
-model = gp.Model('model')
+if WARM_START:
+    profiler.phase("heuristic")
+    routes, routes_cost = heuristic_routes(Distance, M)
+    print(f"Heurística: {M} rutas de coste total {routes_cost}")
 
-# ====== Define variables ====== 
-Travel = model.addVars(N, N, name='Travel', vtype=gp.GRB.BINARY)
+# Reuse the model built for this instance and variant (see comun/model_cache.py)
+key = model_key("VRP", {"SUBTOUR_MODE": SUBTOUR_MODE, "CLEAN_MODEL": CLEAN_MODEL}, data, __file__) if args.model_cache else None
+cached = load_model(key) if key is not None else None
 
-# ====== Define constraints ====== 
+if cached is None:
+    # Define model
+    profiler.phase("build")
+    model = gp.Model('model')
+    profiler.watch(model)
 
-model.addConstr(gp.quicksum(Travel[0, j] for j in range(1, N)) == M, name="vehicles_leave_depot")
+    # ====== Define variables ====== 
+    Travel = model.addVars(N, N, name='Travel', vtype=gp.GRB.BINARY)
 
-model.addConstr(gp.quicksum(Travel[j, 0] for j in range(1, N)) == M, name="vehicles_enter_depot")
+    # ====== Define constraints ====== 
 
-for j in range(1, N):
-    model.addConstr(gp.quicksum(Travel[i, j] for i in range(N)) == 1, name=f"customer_{j}_visit")
+    model.addConstr(gp.quicksum(Travel[0, j] for j in range(1, N)) == M, name="vehicles_leave_depot")
 
-for i in range(1, N):  # Adjusted to start from 1 to N-1
-    model.addConstr(gp.quicksum(Travel[i, j] for j in range(N)) == 1, name=f"customer_{i}_vehicle_leave")
+    model.addConstr(gp.quicksum(Travel[j, 0] for j in range(1, N)) == M, name="vehicles_enter_depot")
 
-for i in range(N):
-    model.addConstr(Travel[i, i] == 0, name=f"no_self_loop_{i}")
+    for j in range(1, N):
+        model.addConstr(gp.quicksum(Travel[i, j] for i in range(N)) == 1, name=f"customer_{j}_visit")
 
-from itertools import combinations
+    for i in range(1, N):  # Adjusted to start from 1 to N-1
+        model.addConstr(gp.quicksum(Travel[i, j] for j in range(N)) == 1, name=f"customer_{i}_vehicle_leave")
 
-# Subtour elimination constraints should be carefully considered
-for size in range(2, N):
-    for S in combinations(range(1, N), size):  # Start from 1 to ignore the depot
-        model.addConstr(gp.quicksum(Travel[i, j] for i in S for j in S) <= len(S) - 1, name=f"subtour_elimination_{S}")
+    for i in range(N):
+        model.addConstr(Travel[i, i] == 0, name=f"no_self_loop_{i}")
 
-# Remove unnecessary non-negativity constraints for distances
+    if SUBTOUR_MODE == "enumerate":
+        from itertools import combinations
 
-# ====== Define objective ====== 
+        # Subtour elimination constraints should be carefully considered
+        for size in range(2, N):
+            for S in combinations(range(1, N), size):  # Start from 1 to ignore the depot
+                model.addConstr(gp.quicksum(Travel[i, j] for i in S for j in S) <= len(S) - 1, name=f"subtour_elimination_{S}")
+
+    # Remove unnecessary non-negativity constraints for distances
+
+    # ====== Define objective ====== 
+
+    model.setObjective(gp.quicksum(Distance[i][j] * Travel[i, j] for i in range(N) for j in range(N)), gp.GRB.MINIMIZE)
+
+    if CLEAN_MODEL:
+        clean_model(model)
+
+    if key is not None:
+        save_model(model, key, {"Travel": Travel})
+else:
+    profiler.phase("model_cache")
+    model, groups = cached
+    profiler.watch(model)
+    print(f"Modelo leído de la caché: {model.NumVars} variables, {model.NumConstrs} restricciones")
+    Travel = groups["Travel"]
+
+apply_params(model, args)
+
+if WARM_START:
+    arcs = {arc for route in routes for arc in route_arcs(route)}
+    for i in range(N):
+        for j in range(N):
+            Travel[i, j].Start = 1 if (i, j) in arcs else 0
+    model.Params.Cutoff = routes_cost + CUTOFF_TOLERANCE
+
+# ====== Subtour separation ====== 
+
+def min_cut_from_depot(capacity, sink):
+    # Edmonds-Karp max-flow from the depot to sink on the support graph.
+    # Returns the flow value and the sink side of a minimum cut.
+    residual = {i: dict(arcs) for i, arcs in capacity.items()}
+    flow = 0.0
+    while True:
+        parent = {0: None}
+        queue = deque([0])
+        while queue and sink not in parent:
+            i = queue.popleft()
+            for j, cap in residual[i].items():
+                if cap > 1e-9 and j not in parent:
+                    parent[j] = i
+                    queue.append(j)
+        if sink not in parent:
+            return flow, set(range(N)) - set(parent)
+        path = []
+        j = sink
+        while parent[j] is not None:
+            path.append((parent[j], j))
+            j = parent[j]
+        push = min(residual[i][j] for i, j in path)
+        for i, j in path:
+            residual[i][j] -= push
+            residual[j][i] = residual[j].get(i, 0.0) + push
+        flow += push
+        if flow >= 1:
+            return flow, None
+
+
+def fractional_subtours(values):
+    # Customer sets S (depot excluded) entered by less than one unit of flow.
+    # The depot is always on the source side, so its degree M is never cut.
+    capacity = {i: {} for i in range(N)}
+    for (i, j), v in values.items():
+        if i != j and v > 1e-6:
+            capacity[i][j] = v
+    cuts = []
+    covered = set()
+    for sink in range(1, N):
+        if sink in covered:
+            continue
+        flow, S = min_cut_from_depot(capacity, sink)
+        if S is not None and 1 - flow > CUT_VIOLATION:
+            cuts.append(sorted(S))
+            covered |= S
+    return cuts
+
+
+def integer_subtours(values):
+    # Customer cycles that are not reachable from the depot
+    successor = {}
+    for (i, j), v in values.items():
+        if i != j and v > 0.5:
+            successor.setdefault(i, []).append(j)
+    reached = {0}
+    stack = [0]
+    while stack:
+        for j in successor.get(stack.pop(), []):
+            if j not in reached:
+                reached.add(j)
+                stack.append(j)
+    unreached = set(range(1, N)) - reached
+    cycles = []
+    while unreached:
+        city = unreached.pop()
+        cycle = [city]
+        city = successor[city][0]
+        while city in unreached:
+            unreached.remove(city)
+            cycle.append(city)
+            city = successor[city][0]
+        cycles.append(cycle)
+    return cycles
+
+
+def subtour_rows(subsets):
+    return [gp.quicksum(Travel[i, j] for i in S for j in S) <= len(S) - 1 for S in subsets]
+
+
+def subtour_callback(model, where):
+    if where == gp.GRB.Callback.MIPSOL:
+        for row in subtour_rows(integer_subtours(model.cbGetSolution(Travel))):
+            model.cbLazy(row)
+    elif where == gp.GRB.Callback.MIPNODE:
+        if model.cbGet(gp.GRB.Callback.MIPNODE_STATUS) != gp.GRB.OPTIMAL:
+            return
+        for row in subtour_rows(fractional_subtours(model.cbGetNodeRel(Travel))):
+            model.cbCut(row)
+
+
+def lazy_subtours(solution):
+    return subtour_rows(integer_subtours(solution.getAttr("X", Travel)))
 
-model.setObjective(gp.quicksum(Distance[i][j] * Travel[i, j] for i in range(N) for j in range(N)), gp.GRB.MINIMIZE)
 
 # Optimize model
-model.optimize()
+profiler.phase("optimize")
+if SUBTOUR_MODE == "separate":
+    model.Params.LazyConstraints = 1
+    model.Params.PreCrush = 1
+    solution = optimize(model, args.backend, subtour_callback, lazy_subtours)
+else:
+    solution = optimize(model, args.backend)
 
 # Get model status
-status = model.status
+status = solution.Status
 
 # Get solver information
-solving_info = {}
-
-if status == gp.GRB.OPTIMAL:
-    solving_info["status"] = "Optimal (2)"
-    solving_info["objective_value"] = model.objVal
-    solving_info["variables"] = [
-        {
-            "symbol": var.VarName,
-            "value": var.X,
-        }
-        for var in model.getVars() if var.x == 1
-    ]
-    solving_info["runtime"] = model.Runtime
-    solving_info["iteration_count"] = model.IterCount
-else:
-    status_dict = {
-        gp.GRB.INFEASIBLE: "Infeasible",
-        gp.GRB.INF_OR_UNBD: "Infeasible or Unbounded",
-        gp.GRB.UNBOUNDED: "Unbounded",
-        gp.GRB.OPTIMAL: "Optimal",
-    }
-    solving_info["status"] = (
-        status_dict[model.status] + f" ({model.status})"
-        if model.status in status_dict
-        else status_dict[model.status]
-    )
-    solving_info["objective_value"] = None
-    solving_info["variables"] = []
-    solving_info["runtime"] = None
-    solving_info["iteration_count"] = None
\ No newline at end of file
+profiler.phase("extract")
+solving_info = extract_results(solution, {"Travel": Travel})
+profiler.stop()
+solving_info["profile"] = profiler.record()
+
+profiler.report()
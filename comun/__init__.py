@@ -0,0 +1 @@
+"""Utilities shared by the optimisation scripts of both iterations."""
@@ -0,0 +1,336 @@
+"""Solver backends for the models the scripts build with gurobipy.
+
+gurobipy stays the modelling layer: building a model needs no license,
+only ``optimize()`` does, and the pip license stops at 2000 variables or
+constraints. ``optimize(model, backend)`` solves the model with Gurobi
+or passes its matrices to HiGHS (``highspy``)::
+
+    solution = optimize(model, args.backend, callback=subtour_callback, lazy=lazy_subtours)
+    status = solution.Status
+    solving_info = extract_results(solution, {"X": X})
+
+With Gurobi the solution is the model itself. With HiGHS it is a
+``Solution`` with the same attribute names (``Status`` in ``GRB`` codes,
+``ObjVal``, ``Runtime``, ``IterCount``, ``MIPGap``, ``SolCount``) and
+``getAttr("X", ...)``/``getAttr("Pi", ...)`` over Var, Constr, lists
+and tupledicts, so ``extract_results`` and the column generation loops
+read both the same way (an MVar is read as ``mvar.reshape(-1).tolist()``,
+which ``Model.getAttr`` accepts too).
+
+HiGHS has no MIPSOL callback: ``lazy(solution)`` is called on every
+integer solution and returns the rows it violates, which are added to
+the gurobipy model and to HiGHS before solving again. The model
+parameters TimeLimit, Threads, MIPGap, Cutoff (minimization only) and
+OutputFlag are passed on, and so are the MIP start values.
+
+Inside a ``comun.portfolio`` worker, Gurobi MIP solves also share their
+incumbents with the other configurations (see ``share_incumbents``), and
+inside a ``comun.tuning`` worker they log the incumbent and bound over
+time (see ``track_progress``).
+"""
+
+import numpy as np
+
+import gurobipy as gp
+
+BACKENDS = ("gurobi", "highs")
+GUROBI_INFINITY = 1e30
+OBJECTIVE_TOLERANCE = 1e-9
+
+# Incumbent store of the portfolio run this process belongs to, if any
+_shared = None
+# Progress log of the tuning run this process belongs to, if any, the
+# solver time of the MIP solves already logged and that of every solve
+_progress = None
+_progress_offset = 0.0
+_solver_time = 0.0
+
+
+class Solution:
+    def __init__(self, model, status, objective, values, duals, runtime, iterations, mip_gap):
+        self.model = model
+        self.Status = status
+        self.ObjVal = objective
+        self.Runtime = runtime
+        self.IterCount = iterations
+        self.MIPGap = mip_gap
+        self.IsMIP = model.IsMIP
+        self.SolCount = 1 if values is not None else 0
+        self._values = {"X": values, "Pi": duals}
+
+    def getVars(self):
+        return self.model.getVars()
+
+    def getAttr(self, name, items):
+        """``X`` or ``Pi`` of a Var/Constr, a list or a tupledict; other attributes come from the model."""
+        if name not in self._values:
+            return self.model.getAttr(name, items)
+        values = self._values[name]
+        if values is None:
+            raise gp.GurobiError(f"No hay valores de {name} en la solución")
+        if isinstance(items, dict):
+            return {key: values[item.index] for key, item in items.items()}
+        if isinstance(items, (gp.Var, gp.Constr)):
+            return values[items.index]
+        return [values[item.index] for item in items]
+
+
+def _highs_status(status):
+    import highspy
+
+    codes = {
+        "kOptimal": gp.GRB.OPTIMAL,
+        "kInfeasible": gp.GRB.INFEASIBLE,
+        "kUnboundedOrInfeasible": gp.GRB.INF_OR_UNBD,
+        "kUnbounded": gp.GRB.UNBOUNDED,
+        "kObjectiveBound": gp.GRB.CUTOFF,
+        "kObjectiveTarget": gp.GRB.USER_OBJ_LIMIT,
+        "kTimeLimit": gp.GRB.TIME_LIMIT,
+        "kIterationLimit": gp.GRB.ITERATION_LIMIT,
+        "kSolutionLimit": gp.GRB.SOLUTION_LIMIT,
+        "kInterrupt": gp.GRB.INTERRUPTED,
+        "kMemoryLimit": gp.GRB.MEM_LIMIT,
+    }
+    for name, code in codes.items():
+        if status == getattr(highspy.HighsModelStatus, name):
+            return code
+    return gp.GRB.NUMERIC
+
+
+def _bounds(values):
+    values = np.asarray(values, dtype=float)
+    return np.where(values >= GUROBI_INFINITY, np.inf, np.where(values <= -GUROBI_INFINITY, -np.inf, values))
+
+
+def _row_bounds(senses, rhs):
+    senses = np.asarray(senses)
+    rhs = np.asarray(rhs, dtype=float)
+    lower = np.where(senses == "<", -np.inf, rhs)
+    upper = np.where(senses == ">", np.inf, rhs)
+    return lower, upper
+
+
+def _add_rows(highs, model, constrs):
+    # Append the gurobipy rows constrs to highs
+    if not constrs:
+        return
+    rows = model.getA()[[constr.index for constr in constrs]].tocsr()
+    lower, upper = _row_bounds(model.getAttr("Sense", constrs), model.getAttr("RHS", constrs))
+    highs.addRows(len(constrs), lower, upper, rows.nnz, rows.indptr.astype(np.int32),
+                  rows.indices.astype(np.int32), rows.data.astype(float))
+
+
+def _highs_model(model):
+    import highspy
+
+    if model.NumQConstrs or model.NumSOS or model.NumGenConstrs or model.NumQNZs:
+        raise ValueError("El backend highs solo admite modelos lineales")
+    variables = model.getVars()
+    n = len(variables)
+    highs = highspy.Highs()
+    lower = _bounds(model.getAttr("LB", variables))
+    upper = _bounds(model.getAttr("UB", variables))
+    vtypes = np.array(model.getAttr("VType", variables))
+    binary = vtypes == gp.GRB.BINARY
+    lower[binary] = np.maximum(lower[binary], 0)
+    upper[binary] = np.minimum(upper[binary], 1)
+    highs.addVars(n, lower, upper)
+    highs.changeColsCost(n, np.arange(n, dtype=np.int32), np.asarray(model.getAttr("Obj", variables), dtype=float))
+    integer = np.flatnonzero(np.isin(vtypes, [gp.GRB.BINARY, gp.GRB.INTEGER]))
+    if integer.size:
+        highs.changeColsIntegrality(len(integer), integer.astype(np.int32),
+                                    np.full(len(integer), highspy.HighsVarType.kInteger.value, dtype=np.uint8))
+    if model.ModelSense == gp.GRB.MAXIMIZE:
+        highs.changeObjectiveSense(highspy.ObjSense.kMaximize)
+    highs.changeObjectiveOffset(model.ObjCon)
+    _add_rows(highs, model, model.getConstrs())
+    return highs
+
+
+def _highs_options(highs, model):
+    params = model.Params
+    highs.setOptionValue("output_flag", bool(params.OutputFlag))
+    if params.TimeLimit < GUROBI_INFINITY:
+        highs.setOptionValue("time_limit", float(params.TimeLimit))
+    if params.Threads > 0:
+        highs.setOptionValue("threads", int(params.Threads))
+    highs.setOptionValue("mip_rel_gap", float(params.MIPGap))
+    if model.ModelSense == gp.GRB.MINIMIZE and params.Cutoff < GUROBI_INFINITY:
+        highs.setOptionValue("objective_bound", float(params.Cutoff))
+
+
+def _highs_start(highs, model):
+    if not model.IsMIP:
+        return
+    start = np.asarray(model.getAttr("Start", model.getVars()), dtype=float)
+    defined = np.flatnonzero(start < gp.GRB.UNDEFINED)
+    if defined.size:
+        highs.setSolution(len(defined), defined.astype(np.int32), start[defined])
+
+
+def _solve_highs(model, lazy=None):
+    model.update()
+    highs = _highs_model(model)
+    _highs_options(highs, model)
+    _highs_start(highs, model)
+    runtime = 0.0
+    iterations = 0
+    while True:
+        highs.run()
+        info = highs.getInfo()
+        # Run time accumulates over the runs of one Highs object; its time_limit applies to each run
+        runtime = highs.getRunTime()
+        iterations += info.simplex_iteration_count
+        status = _highs_status(highs.getModelStatus())
+        solution = highs.getSolution()
+        values = np.array(solution.col_value) if info.primal_solution_status == 2 else None
+        duals = np.array(solution.row_dual) if not model.IsMIP and solution.dual_valid else None
+        result = Solution(model, status, info.objective_function_value if values is not None else None,
+                          values, duals, runtime, iterations, info.mip_gap if model.IsMIP else None)
+        if lazy is None or values is None:
+            return result
+        rows = lazy(result)
+        if not rows:
+            return result
+        constrs = [model.addConstr(row) for row in rows]
+        model.update()
+        _add_rows(highs, model, constrs)
+        # The time limit covers all the rounds
+        if model.Params.TimeLimit < GUROBI_INFINITY:
+            left = model.Params.TimeLimit - runtime
+            if left <= 0:
+                return result
+            highs.setOptionValue("time_limit", float(left))
+
+
+def share_incumbents(shared):
+    """Share the incumbents of the Gurobi MIP solves of this process through ``shared``.
+
+    ``shared`` is a ``comun.portfolio.SharedIncumbent``: objectives are
+    published in minimization form, and the solution vectors are loaded
+    only by models with the same variables and rows.
+    """
+    global _shared
+    _shared = shared
+
+
+def _sharing_callback(model, callback, shared):
+    # Wrap callback to publish accepted incumbents, load better ones found by
+    # the other configurations and stop once the shared incumbent is within
+    # MIPGap of this model's bound
+    variables = model.getVars()
+    signature = (model.NumVars, model.NumConstrs, model.NumNZs)
+    sense = model.ModelSense
+    gap = model.Params.MIPGap
+    # A MIPSOL solution may still be cut off by a lazy constraint, so it is
+    # published once MIP_OBJBST shows that it was accepted
+    pending = []
+    loaded = [0]
+
+    def sharing_callback(model, where):
+        if callback is not None:
+            callback(model, where)
+        if where == gp.GRB.Callback.MIPSOL:
+            pending[:] = [model.cbGet(gp.GRB.Callback.MIPSOL_OBJ), model.cbGetSolution(variables)]
+        elif where == gp.GRB.Callback.MIP:
+            incumbent = model.cbGet(gp.GRB.Callback.MIP_OBJBST)
+            if pending and abs(incumbent - pending[0]) <= OBJECTIVE_TOLERANCE * max(1, abs(incumbent)):
+                shared.publish(signature, sense * pending[0], pending[1])
+                pending.clear()
+            best = shared.objective()
+            bound = sense * model.cbGet(gp.GRB.Callback.MIP_OBJBND)
+            if best < sense * incumbent - OBJECTIVE_TOLERANCE and best - bound <= gap * abs(best):
+                # Another configuration holds a solution this one cannot beat
+                model.terminate()
+        elif where == gp.GRB.Callback.MIPNODE:
+            version = shared.version()
+            if version == loaded[0]:
+                return
+            loaded[0] = version
+            if shared.objective() < sense * model.cbGet(gp.GRB.Callback.MIPNODE_OBJBST) - OBJECTIVE_TOLERANCE:
+                values = shared.values(signature)
+                if values is not None:
+                    model.cbSetSolution(variables, values)
+                    model.cbUseSolution()
+
+    return sharing_callback
+
+
+def track_progress(progress):
+    """Append ``(time, incumbent, bound)`` to ``progress`` during the Gurobi MIP solves of this process.
+
+    A point is added whenever the incumbent or the bound changes, and one
+    more at the end of each solve. Times are solver seconds summed over the
+    successive solves. ``tracked_time`` sums those of every solve, LPs and
+    pricing problems included.
+    """
+    global _progress, _progress_offset, _solver_time
+    _progress = progress
+    _progress_offset = 0.0
+    _solver_time = 0.0
+
+
+def tracked_time():
+    """Solver seconds of all the solves since ``track_progress``."""
+    return _solver_time
+
+
+def _progress_callback(model, callback, progress, offset):
+    # Wrap callback to log the incumbent and bound as they change
+    def progress_callback(model, where):
+        if callback is not None:
+            callback(model, where)
+        if where == gp.GRB.Callback.MIP:
+            point = (model.cbGet(gp.GRB.Callback.MIP_OBJBST), model.cbGet(gp.GRB.Callback.MIP_OBJBND))
+            if not progress or tuple(progress[-1][1:]) != point:
+                progress.append((offset + model.cbGet(gp.GRB.Callback.RUNTIME), *point))
+
+    return progress_callback
+
+
+def optimize(model, backend="gurobi", callback=None, lazy=None, share=True):
+    """Solve ``model`` with ``backend``; returns the model (Gurobi) or a ``Solution`` (HiGHS).
+
+    ``callback`` is the Gurobi callback. ``lazy(solution)`` returns the
+    rows an integer solution violates and stands in for it with HiGHS.
+    ``share=False`` keeps an auxiliary MIP (a pricing problem) out of the
+    portfolio's shared incumbent and the tuning progress log.
+    """
+    global _progress_offset, _solver_time
+    if backend == "gurobi":
+        model.update()
+        tracked = _progress is not None and share and model.IsMIP
+        if tracked:
+            callback = _progress_callback(model, callback, _progress, _progress_offset)
+        if _shared is not None and share and model.IsMIP:
+            callback = _sharing_callback(model, callback, _shared)
+        if callback is None:
+            model.optimize()
+        else:
+            model.optimize(callback)
+        if tracked:
+            _progress_offset += model.Runtime
+            _progress.append((_progress_offset, model.ObjVal if model.SolCount else gp.GRB.INFINITY, model.ObjBound))
+        if _progress is not None:
+            _solver_time += model.Runtime
+        return model
+    if backend == "highs":
+        solution = _solve_highs(model, lazy)
+        if _progress is not None:
+            _solver_time += solution.Runtime
+        return solution
+    raise ValueError(f"Backend desconocido: {backend} (disponibles: {', '.join(BACKENDS)})")
+
+
+def fixed(model, solution):
+    """Continuous copy of ``model`` with the integer variables fixed at their value in ``solution``."""
+    if solution is model:
+        return model.fixed()
+    copy = model.copy()
+    variables = copy.getVars()
+    values = solution.getAttr("X", model.getVars())
+    for var, value in zip(variables, values):
+        if var.VType != gp.GRB.CONTINUOUS:
+            var.LB = var.UB = round(value)
+            var.VType = gp.GRB.CONTINUOUS
+    return copy
@@ -0,0 +1,160 @@
+"""Run one problem's solve script over many instances in a process pool.
+
+Usage::
+
+    python -m comun.batch TSP "SegundaIteración/TSP/Data*.json" --threads 2 --output resultados.jsonl
+
+Every instance runs in its own worker process with the script's usual
+command line (``script.py <data> --threads N --backend B``). One JSON record per
+instance is written to the output file, and the solver log of each run
+goes to ``<output>.logs/<instance>.log``.
+
+Results are cached by content (see ``comun.cache``): an instance already
+solved with the same data, arguments and code is answered from the cache
+without starting a worker. ``--no-cache`` always solves.
+"""
+
+import argparse
+import glob
+import json
+import os
+import runpy
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from comun import cache
+from comun.backend import BACKENDS
+from comun.results import to_json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = {
+    "BPP": os.path.join(ROOT, "PrimeraIteración", "BPP", "Code.py"),
+    "Knapsack": os.path.join(ROOT, "PrimeraIteración", "Knapsack", "Code.py"),
+    "CFLP": os.path.join(ROOT, "SegundaIteración", "CFLP", "CFLP_P.py"),
+    "CSP": os.path.join(ROOT, "SegundaIteración", "CSP", "CPP_P.py"),
+    "TSP": os.path.join(ROOT, "SegundaIteración", "TSP", "TSP_P.py"),
+    "VRP": os.path.join(ROOT, "SegundaIteración", "VRP", "VRP_P.py"),
+}
+
+
+@contextmanager
+def redirect_output(path):
+    # Gurobi writes its log from C, so the file descriptor itself is redirected
+    sys.stdout.flush()
+    saved = os.dup(1)
+    with open(path, "w") as log:
+        os.dup2(log.fileno(), 1)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            os.dup2(saved, 1)
+            os.close(saved)
+
+
+def run_script(problem, data, script_argv=()):
+    """Run the problem's script on ``data`` in this process and return its globals."""
+    script = SCRIPTS[problem]
+    directory = os.path.dirname(script)
+    cwd, argv = os.getcwd(), sys.argv
+    os.chdir(directory)
+    sys.argv = [script, os.path.abspath(os.path.join(cwd, data)), *script_argv]
+    sys.path.insert(0, directory)
+    try:
+        return runpy.run_path(script, run_name="__main__")
+    finally:
+        sys.path.remove(directory)
+        sys.argv = argv
+        os.chdir(cwd)
+
+
+def solve_instance(problem, data, threads, log_path, script_argv=()):
+    """Worker: solve one instance and build its results record."""
+    record = {"problem": problem, "instance": data}
+    script_argv = (["--threads", str(threads)] if threads else []) + list(script_argv)
+    start = time.time()
+    try:
+        with redirect_output(log_path):
+            namespace = run_script(problem, data, script_argv)
+        record.update(to_json(namespace["solving_info"]))
+    except Exception as error:
+        record["status"] = "Error"
+        record["error"] = f"{type(error).__name__}: {error}"
+    record["wall_time"] = time.time() - start
+    return record
+
+
+def cached_record(problem, data, key, cache_dir):
+    """Results record of ``data`` from the cache, or None."""
+    start = time.time()
+    cached = cache.load(key, cache_dir)
+    if cached is None:
+        return None
+    record = {"problem": problem, "instance": data, **cached, "cached": True}
+    record["wall_time"] = time.time() - start
+    return record
+
+
+def run_batch(problem, pattern, output, workers=None, threads=1, use_cache=True, cache_dir=cache.CACHE_DIR,
+              cache_size=cache.MAX_BYTES, backend="gurobi"):
+    """Solve every file matching ``pattern`` and write one JSON line per instance."""
+    instances = sorted(glob.glob(pattern))
+    if not instances:
+        raise SystemExit(f"Ningún fichero coincide con {pattern}")
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // max(1, threads))
+    logs = output + ".logs"
+    os.makedirs(logs, exist_ok=True)
+    script_argv = ["--backend", backend]
+    key_argv = (["--threads", str(threads)] if threads else []) + script_argv
+
+    records = []
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as pool, open(output, "w") as f:
+        def write(record):
+            records.append(record)
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            print(f"{record['instance']}: {record['status']} ({record['wall_time']:.2f} s"
+                  f"{', caché' if record.get('cached') else ''})")
+
+        futures = {}
+        for data in instances:
+            key = cache.cache_key(problem, SCRIPTS[problem], data, key_argv) if use_cache else None
+            record = cached_record(problem, data, key, cache_dir) if use_cache else None
+            if record is not None:
+                write(record)
+                continue
+            future = pool.submit(solve_instance, problem, data, threads,
+                                 os.path.join(logs, os.path.splitext(os.path.basename(data))[0] + ".log"), script_argv)
+            futures[future] = key
+
+        for future in as_completed(futures):
+            record = future.result()
+            if futures[future] is not None and record["status"] != "Error":
+                cache.store(futures[future], {k: v for k, v in record.items() if k not in ("problem", "instance", "wall_time")},
+                            cache_dir, cache_size)
+            write(record)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resuelve en paralelo un conjunto de instancias de un problema.")
+    parser.add_argument("problem", choices=sorted(SCRIPTS), help="problema a resolver")
+    parser.add_argument("pattern", help="patrón glob de los ficheros de datos")
+    parser.add_argument("--workers", type=int, default=None, help="procesos en paralelo (por defecto, núcleos / hilos)")
+    parser.add_argument("--threads", type=int, default=1, help="hilos del solver por instancia")
+    parser.add_argument("--output", default="resultados.jsonl", help="fichero JSON Lines de resultados")
+    parser.add_argument("--backend", choices=BACKENDS, default="gurobi", help="solver de los modelos (ver comun/backend.py)")
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false", help="resolver siempre, sin leer ni escribir la caché")
+    parser.add_argument("--cache-dir", default=cache.CACHE_DIR, help="directorio de la caché de resultados")
+    parser.add_argument("--cache-size", type=float, default=cache.MAX_BYTES / 2**20, help="tamaño máximo de la caché en MB")
+    args = parser.parse_args()
+    run_batch(args.problem, args.pattern, args.output, args.workers, args.threads, args.use_cache, args.cache_dir,
+              int(args.cache_size * 2**20), args.backend)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Scaling benchmark over generated instances.
+
+Usage::
+
+    python -m comun.benchmark TSP --sizes 10 20 40 --seeds 3 --output benchmark.jsonl
+    python -m comun.benchmark TSP --sizes 10 20 40 --baseline benchmark_main.jsonl
+
+For every problem, size and seed an instance is generated with
+``comun.generators`` and solved by the problem's script (see
+``comun.batch``) in a fresh process. Each run records build time, solve
+time, gap, peak memory, iteration count and the script's phase profile
+(see ``comun.instrumentation``) as one JSON line, and a table with the
+median per size is printed at the end, next to the baseline report when
+one is given. ``--binary`` writes the instances in the format of
+``comun.instances`` instead of JSON, and ``--backend highs`` solves them
+with HiGHS (see ``comun.backend``).
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+
+from comun.backend import BACKENDS
+from comun.batch import SCRIPTS, solve_instance
+from comun.generators import dump_instance, generate
+from comun.instances import SUFFIX, save_instance
+
+DEFAULT_SIZES = {
+    "BPP": [10, 20, 40, 80],
+    "Knapsack": [50, 200, 1000, 5000],
+    "CFLP": [10, 20, 40, 80],
+    "CSP": [10, 20, 40, 80],
+    "TSP": [10, 20, 40, 80],
+    "VRP": [10, 15, 20, 30],
+}
+
+METRICS = ["build_time", "solve_time", "mip_gap", "peak_memory_mb", "iteration_count"]
+
+
+def benchmark_instance(problem, size, seed, data, threads, time_limit, trace_memory, log_path, backend="gurobi"):
+    """Worker: solve one generated instance and add the benchmark metrics."""
+    script_argv = ["--backend", backend]
+    if time_limit:
+        script_argv += ["--time-limit", str(time_limit)]
+    if trace_memory:
+        script_argv.append("--trace-memory")
+    # Every run builds its model, so build_time stays comparable
+    script_argv.append("--no-model-cache")
+    record = solve_instance(problem, data, threads, log_path, script_argv)
+    record.pop("variables", None)
+    record["size"] = size
+    record["seed"] = seed
+    record["backend"] = backend
+    record["solve_time"] = record.get("runtime")
+    # Model construction as measured by the script's profiler (see comun/instrumentation.py)
+    phases = record.get("profile", {}).get("phases", {})
+    record["build_time"] = phases["build"]["wall"] if "build" in phases else None
+    # ru_maxrss is in KiB on Linux; the worker process runs a single instance
+    record["peak_memory_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return record
+
+
+def run_benchmark(problem, sizes, seeds, output, workers=1, threads=1, time_limit=None, trace_memory=False,
+                  binary=False, backend="gurobi"):
+    """Generate and solve every (size, seed) pair; write one JSON line per run."""
+    instances = output + ".instances"
+    logs = output + ".logs"
+    os.makedirs(instances, exist_ok=True)
+    os.makedirs(logs, exist_ok=True)
+
+    jobs = []
+    for size in sizes:
+        for seed in range(seeds):
+            stem = f"{problem}_{size}_{seed}"
+            if binary:
+                data = os.path.join(instances, stem + SUFFIX)
+                save_instance(generate(problem, size, seed), data)
+            else:
+                data = os.path.join(instances, stem + ".json")
+                dump_instance(generate(problem, size, seed), data)
+            jobs.append((problem, size, seed, data, threads, time_limit, trace_memory, os.path.join(logs, stem + ".log"),
+                         backend))
+
+    records = []
+    # One run per process so peak memory is not shared between instances
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as pool, open(output, "w") as f:
+        for record in pool.map(benchmark_instance, *zip(*jobs)):
+            records.append(record)
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            print(f"{problem} n={record['size']} semilla={record['seed']}: {record['status']} ({record['wall_time']:.2f} s)")
+    return records
+
+
+def load_report(path):
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(records):
+    """Median of every metric per (problem, size), skipping missing values."""
+    groups = {}
+    for record in records:
+        groups.setdefault((record["problem"], record["size"]), []).append(record)
+    summary = {}
+    for key, group in sorted(groups.items()):
+        row = {"runs": len(group), "solved": sum(record["status"].startswith("Optimal") for record in group)}
+        for metric in METRICS:
+            values = [record[metric] for record in group if record.get(metric) is not None]
+            row[metric] = statistics.median(values) if values else None
+        summary[key] = row
+    return summary
+
+
+def _cell(value, reference=None):
+    if value is None:
+        return "-"
+    text = f"{value:.3g}"
+    if reference:
+        text += f" (x{value / reference:.2f})"
+    return text
+
+
+def print_summary(records, baseline=None):
+    summary = summarize(records)
+    reference = summarize(baseline) if baseline else {}
+    header = ["problema", "tamaño", "óptimas"] + METRICS
+    print("\t".join(header))
+    for (problem, size), row in summary.items():
+        base = reference.get((problem, size), {})
+        cells = [problem, str(size), f"{row['solved']}/{row['runs']}"]
+        cells += [_cell(row[metric], base.get(metric)) for metric in METRICS]
+        print("\t".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide cómo escalan los scripts con instancias generadas.")
+    parser.add_argument("problem", choices=sorted(SCRIPTS), help="problema a medir")
+    parser.add_argument("--sizes", type=int, nargs="+", default=None, help="tamaños a generar (por defecto, los de DEFAULT_SIZES)")
+    parser.add_argument("--seeds", type=int, default=3, help="instancias por tamaño")
+    parser.add_argument("--workers", type=int, default=1, help="procesos en paralelo (1 para tiempos comparables)")
+    parser.add_argument("--threads", type=int, default=1, help="hilos del solver por instancia")
+    parser.add_argument("--time-limit", type=float, default=None, help="límite de tiempo por instancia en segundos")
+    parser.add_argument("--trace-memory", action="store_true", help="medir también la memoria de Python por fase (ralentiza la construcción)")
+    parser.add_argument("--binary", action="store_true", help="generar las instancias en formato binario .inst")
+    parser.add_argument("--backend", choices=BACKENDS, default="gurobi", help="solver de los modelos (ver comun/backend.py)")
+    parser.add_argument("--output", default="benchmark.jsonl", help="fichero JSON Lines con una línea por ejecución")
+    parser.add_argument("--baseline", default=None, help="informe anterior con el que comparar")
+    args = parser.parse_args()
+    records = run_benchmark(args.problem, args.sizes or DEFAULT_SIZES[args.problem], args.seeds,
+                            args.output, args.workers, args.threads, args.time_limit, args.trace_memory, args.binary, args.backend)
+    print_summary(records, load_report(args.baseline) if args.baseline else None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""On-disk cache of solve results, keyed by content.
+
+The key hashes the problem, the instance data after normalization (the
+same numbers give the same key whether they come from JSON or from a
+``.inst`` directory, see ``comun.instances``), the solver arguments and
+tuned parameters (see ``comun.params``), the Gurobi version and the
+source of the script's directory and of ``comun``, so that editing a
+model or a mode constant invalidates its entries. Each entry is the JSON
+record ``comun.batch`` writes for the run (status, objective, nonzero
+variables, runtime...).
+
+Reading an entry refreshes its modification time, and ``store`` deletes
+the least recently used entries while the cache is above ``max_bytes``.
+"""
+
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+
+import gurobipy as gp
+
+from comun.instances import load_instance
+from comun.params import tuned_params
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.environ.get("SOLVE_CACHE_DIR", os.path.join(ROOT, ".solve_cache"))
+MAX_BYTES = 256 * 1024 * 1024
+
+
+def instance_digest(data):
+    """Hash of the instance values: key names, shapes and numbers as float64."""
+    digest = hashlib.sha256()
+    for key in sorted(data):
+        digest.update(key.encode())
+        try:
+            array = np.ascontiguousarray(data[key], dtype=np.float64)
+        except (TypeError, ValueError):
+            digest.update(json.dumps(data[key], sort_keys=True).encode())
+            continue
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def source_digest(script):
+    """Hash of the .py files next to ``script`` and in ``comun``."""
+    digest = hashlib.sha256()
+    paths = glob.glob(os.path.join(os.path.dirname(os.path.abspath(script)), "*.py"))
+    paths += glob.glob(os.path.join(ROOT, "comun", "*.py"))
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def cache_key(problem, script, data_path, script_argv=()):
+    parts = {
+        "problem": problem,
+        "instance": instance_digest(load_instance(data_path)),
+        "argv": list(script_argv),
+        "tuned": tuned_params(problem),
+        "gurobi": ".".join(map(str, gp.gurobi.version())),
+        "source": source_digest(script),
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def _path(key, directory):
+    return os.path.join(directory, key + ".json")
+
+
+def load(key, directory=CACHE_DIR):
+    """Cached record for ``key`` or None; a hit counts as a use for the LRU order."""
+    path = _path(key, directory)
+    try:
+        with open(path, "r") as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    os.utime(path)
+    return record
+
+
+def store(key, record, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+    os.makedirs(directory, exist_ok=True)
+    # Written under a temporary name so a concurrent reader never sees half a file
+    temporary = _path(key, directory) + f".{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(record, f)
+    os.replace(temporary, _path(key, directory))
+    evict(directory, max_bytes)
+
+
+def evict(directory=CACHE_DIR, max_bytes=MAX_BYTES):
+    """Delete the least recently used entries until the cache fits in ``max_bytes``."""
+    entries = []
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
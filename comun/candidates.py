@@ -0,0 +1,184 @@
+"""Sparse facility-customer arcs for the CFLP models, completed by pricing.
+
+The models are built only with the k cheapest facilities of every customer
+(``cheapest_arcs``). ``solve_with_pricing`` then adds the omitted arcs whose
+reduced cost is negative, using the duals of the demand and capacity rows:
+
+- before branching, until the LP relaxation of the sparse model is optimal
+  for the LP relaxation of the dense one (same root bound);
+- after every MIP solve, with the open facilities fixed, until the
+  shipments of the best solution are optimal over all arcs.
+
+If the sparse LP is infeasible, every customer gets its next cheapest
+facility until it is not. A new arc comes with its own linking row, whose dual is taken as zero, so
+its reduced cost is TransportCost[l, c] - Pi(demand c) - Pi(capacity l).
+
+Pricing alone certifies the LP and the fixed open set, not the MIP, so the
+MIP is solved as a relaxation of the dense model: every customer gets an
+overflow variable in its demand row that stands for all its omitted arcs,
+at the cost of the cheapest one, without using capacity, and bounded by
+its demand times the omitted facilities that are open. Any dense solution
+maps to one of the same or lower cost, so when the optimum ships nothing
+through overflow it is optimal for the dense model (within MIPGap). When
+it does, the customers that used it get their cheapest omitted arc to an
+open facility and the MIP is solved again.
+"""
+
+import numpy as np
+
+import gurobipy as gp
+
+from comun.backend import fixed, optimize
+
+TOLERANCE = 1e-6
+
+
+def cheapest_arcs(cost, k):
+    """Boolean L x C mask with the k cheapest facilities of every customer."""
+    cost = np.asarray(cost, dtype=float)
+    L = cost.shape[0]
+    mask = np.zeros(cost.shape, dtype=bool)
+    if k >= L:
+        mask[:] = True
+        return mask
+    nearest = np.argpartition(cost, k - 1, axis=0)[:k]
+    mask[nearest, np.arange(cost.shape[1])] = True
+    return mask
+
+
+def reduced_costs(cost, demand_duals, capacity_duals):
+    return np.asarray(cost, dtype=float) - np.asarray(demand_duals)[np.newaxis, :] - np.asarray(capacity_duals)[:, np.newaxis]
+
+
+class _Overflow:
+    """Overflow variables of the customers that still have omitted arcs (see the module docstring)."""
+
+    def __init__(self, model, cost, arcs, demand_rows, open_vars):
+        self.model, self.cost, self.arcs, self.open_vars = model, cost, arcs, open_vars
+        self.vars, self.rows = [], []
+        for c, row in enumerate(demand_rows):
+            demand = row.RHS
+            var = model.addVar(ub=demand, name=f"Overflow[{c}]", column=gp.Column([1], [row]))
+            omitted = np.flatnonzero(~arcs[:, c]).tolist()
+            self.vars.append(var)
+            self.rows.append(model.addConstr(var <= demand * gp.quicksum(open_vars[l] for l in omitted), name=f"overflow_{c}"))
+            self._price(c)
+        model.update()
+
+    def _price(self, c):
+        omitted = ~self.arcs[:, c]
+        if omitted.any():
+            self.vars[c].Obj = self.cost[omitted, c].min()
+        else:
+            self.vars[c].UB = 0
+
+    def close(self, l, c):
+        # Arc (l, c) is now in the model: l leaves the overflow row of c
+        self.model.chgCoeff(self.rows[c], self.open_vars[l], 0.0)
+        self._price(c)
+
+    def used(self, solution):
+        """Customers that ship through overflow in ``solution``."""
+        return [c for c, value in enumerate(solution.getAttr("X", self.vars)) if value > TOLERANCE]
+
+    def forbid(self, model):
+        # Zero the overflow in model (the model itself or a copy with the same variables)
+        variables = model.getVars()
+        for var in self.vars:
+            variables[var.index].UB = 0
+
+
+def _price(model, lp, cost, arcs, demand_rows, capacity_rows, add, backend):
+    # Solve lp (a relaxed or fixed copy of model), add to model every omitted
+    # arc with negative reduced cost and return how many and the LP objective
+    lp.Params.OutputFlag = 0
+    solution = optimize(lp, backend)
+    if solution.Status in (gp.GRB.INFEASIBLE, gp.GRB.INF_OR_UNBD):
+        # Too few arcs to ship all the demand: give every customer its next cheapest facility
+        cost = np.where(arcs, np.inf, cost)
+        nearest = np.argmin(cost, axis=0)
+        count = 0
+        for c, l in enumerate(nearest):
+            if np.isfinite(cost[l, c]):
+                add(int(l), int(c))
+                count += 1
+        model.update()
+        return count, None
+    if solution.Status != gp.GRB.OPTIMAL:
+        return 0, None
+    constrs = lp.getConstrs()
+    duals = solution.getAttr("Pi", [constrs[row.index] for row in demand_rows + capacity_rows])
+    C = len(demand_rows)
+    negative = (reduced_costs(cost, duals[:C], duals[C:]) < -TOLERANCE) & ~arcs
+    for l, c in np.argwhere(negative):
+        add(int(l), int(c))
+    model.update()
+    return int(negative.sum()), solution.ObjVal
+
+
+def solve_with_pricing(model, cost, arcs, demand_rows, capacity_rows, add_arc, open_vars, backend="gurobi"):
+    """Optimize a sparse CFLP model, adding omitted arcs until none can improve it.
+
+    ``arcs`` is the L x C mask of the arcs in the model (updated in place),
+    ``demand_rows``/``capacity_rows`` the Constr of each customer/facility,
+    ``add_arc(l, c)`` adds the shipment variable and linking row of an arc
+    and ``open_vars`` are the binary opening variables of the facilities.
+    Every LP and MIP is solved with ``backend`` (see ``comun.backend``).
+
+    Returns a dict with the arcs added by each stage, the LP bound of the
+    dense model, the last MIP solution (which never ships through overflow)
+    and ``certified``: whether that solution is proven optimal for the
+    dense model, or the dense model infeasible.
+    """
+    cost = np.asarray(cost, dtype=float)
+    added = {"lp": 0, "mip": 0, "overflow": 0}
+    lp_bound = None
+    overflow = None
+
+    def add(l, c):
+        add_arc(l, c)
+        arcs[l, c] = True
+        if overflow is not None:
+            overflow.close(l, c)
+
+    while True:
+        model.update()
+        count, objective = _price(model, model.relax(), cost, arcs, demand_rows, capacity_rows, add, backend)
+        added["lp"] += count
+        if objective is not None:
+            lp_bound = objective
+        if not count:
+            break
+
+    overflow = _Overflow(model, cost, arcs, demand_rows, open_vars)
+    while True:
+        solution = optimize(model, backend)
+        if solution.SolCount == 0:
+            certified = solution.Status == gp.GRB.INFEASIBLE
+            break
+
+        # The shipments of the incumbent are priced with its open facilities
+        # fixed and no overflow
+        variables = model.getVars()
+        values = solution.getAttr("X", variables)
+        opened = np.asarray(solution.getAttr("X", open_vars)) > 0.5
+        used = overflow.used(solution)
+        lp = fixed(model, solution)
+        overflow.forbid(lp)
+        count, _ = _price(model, lp, cost, arcs, demand_rows, capacity_rows, add, backend)
+        added["mip"] += count
+
+        # Customers shipping through overflow get their cheapest omitted arc, to an open facility if any
+        for c in used:
+            omitted = np.flatnonzero(~arcs[:, c])
+            if omitted.size:
+                candidates = omitted[opened[omitted]] if opened[omitted].any() else omitted
+                add(int(candidates[np.argmin(cost[candidates, c])]), c)
+                added["overflow"] += 1
+        model.update()
+        if not count and not used:
+            certified = solution.Status == gp.GRB.OPTIMAL
+            break
+        # Keep the incumbent as MIP start; new arcs start at zero
+        model.setAttr("Start", variables, values)
+    return {"added": added, "lp_bound": lp_bound, "solution": solution, "certified": certified}
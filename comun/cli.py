@@ -0,0 +1,76 @@
+"""Command-line arguments shared by the solve scripts."""
+
+import argparse
+import ast
+import os
+
+from comun.backend import BACKENDS
+from comun.batch import SCRIPTS
+from comun.params import TUNED_PARAMS, tuned_params
+
+
+def _assignment(text):
+    # "NAME=VALUE" -> (NAME, VALUE), VALUE as a Python literal when it is one
+    name, separator, value = text.partition("=")
+    if not separator or not name:
+        raise argparse.ArgumentTypeError(f"se esperaba NOMBRE=VALOR: {text}")
+    try:
+        return name, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return name, value
+
+
+def script_args(default_data, constants=None):
+    """Parse ``[data] [--threads N] [--time-limit S] [--backend B] [--param P=V]... [--mode M=V]...``
+    plus ``[--trace-memory] [--no-model-cache] [--no-tuned-params] [--prefer-binary]``.
+
+    ``data`` defaults to the script's usual instance. ``--param`` sets a
+    Gurobi parameter (see ``apply_params``). ``--mode`` overrides one of the
+    mode constants at the top of the script; the script passes its
+    ``globals()`` as ``constants``::
+
+        args = script_args("Data5.json", globals())
+
+    For the scripts of ``comun.batch.SCRIPTS`` the parameters tuned for
+    their problem (see ``comun.params``) are loaded into ``args.tuned``.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("data", nargs="?", default=default_data, help="fichero de instancia")
+    parser.add_argument("--threads", type=int, default=None, help="hilos del solver (por defecto, todos)")
+    parser.add_argument("--time-limit", type=float, default=None, help="límite de tiempo del solver en segundos")
+    parser.add_argument("--backend", choices=BACKENDS, default="gurobi",
+                        help="solver que resuelve el modelo construido con gurobipy (por defecto, gurobi)")
+    parser.add_argument("--param", type=_assignment, action="append", default=[], metavar="NOMBRE=VALOR",
+                        help="parámetro de Gurobi, p. ej. --param MIPFocus=1 (se puede repetir)")
+    parser.add_argument("--mode", type=_assignment, action="append", default=[], metavar="NOMBRE=VALOR",
+                        help="cambia una constante de modo del script, p. ej. --mode CANDIDATE_EDGES=10 (se puede repetir)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="medir también la memoria de Python por fase (tracemalloc ralentiza la construcción)")
+    parser.add_argument("--no-model-cache", dest="model_cache", action="store_false",
+                        help="construir siempre el modelo, sin leer ni escribir la caché de modelos (TSP y VRP)")
+    parser.add_argument("--no-tuned-params", dest="tuned_params", action="store_false",
+                        help="no cargar los parámetros ajustados por comun/tuning.py")
+    parser.add_argument("--prefer-binary", action="store_true",
+                        help="leer el .inst convertido junto al .json indicado si está al día (ver comun/instances.py)")
+    args = parser.parse_args()
+    for name, value in args.mode:
+        if constants is None or not name.isupper() or name not in constants:
+            parser.error(f"el script no tiene la constante de modo {name}")
+        constants[name] = value
+    script = os.path.abspath(constants["__file__"]) if constants is not None and "__file__" in constants else None
+    problem = next((problem for problem, path in SCRIPTS.items() if os.path.abspath(path) == script), None)
+    args.tuned = tuned_params(problem) if args.tuned_params and problem is not None else {}
+    if args.tuned:
+        print(f"Parámetros ajustados para {problem} ({os.path.basename(TUNED_PARAMS)}): "
+              + ", ".join(f"{name}={value}" for name, value in args.tuned.items()))
+    return args
+
+
+def apply_params(model, args):
+    """Apply the tuned parameters and the solver settings given on the command line to ``model``."""
+    if args.threads is not None:
+        model.Params.Threads = args.threads
+    if args.time_limit is not None:
+        model.Params.TimeLimit = args.time_limit
+    for name, value in {**args.tuned, **dict(args.param)}.items():
+        model.setParam(name, value)
@@ -0,0 +1,141 @@
+"""Seeded random instances in the Data*.json schemas of the solve scripts.
+
+Usage::
+
+    python -m comun.generators TSP 200 --seed 1 --output SegundaIteración/TSP/Gen200.json
+    python -m comun.generators TSP 5000 --seed 1 --output SegundaIteración/TSP/Gen5000.inst
+
+``size`` is the main dimension of each family: items (BPP, Knapsack),
+customers (CFLP), piece widths (CSP) and nodes (TSP, VRP). The other
+dimensions follow from it. The same problem, size and seed always give
+the same file. An output ending in ``.inst`` is written in the binary
+format of ``comun.instances``.
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from comun.instances import SUFFIX, save_instance
+
+GRID = 1000
+
+
+def _distances(rng, n):
+    # Rounded Euclidean distances between random points, symmetric with a zero diagonal
+    points = rng.integers(0, GRID, size=(n, 2))
+    return np.rint(np.hypot(*(points[:, None, :] - points[None, :, :]).transpose(2, 0, 1))).astype(int)
+
+
+def bpp(size, rng):
+    capacity = 100
+    return {
+        "BinCapacity": capacity,
+        "N": size,
+        "ItemSizes": rng.integers(1, capacity + 1, size=size),
+    }
+
+
+def knapsack(size, rng):
+    weights = rng.integers(1, 100, size=size)
+    return {
+        "MaxCapacity": int(weights.sum()) // 2,
+        "N": size,
+        "Values": weights + rng.integers(-10, 30, size=size).clip(min=1 - weights),
+        "Weights": weights,
+    }
+
+
+def cflp(size, rng):
+    facilities = max(2, size // 5)
+    demand = rng.integers(50, 300, size=size)
+    # Enough capacity to serve everything with about two thirds of the facilities open
+    capacity = np.full(facilities, int(1.5 * demand.sum() / facilities))
+    return {
+        "C": size,
+        "L": facilities,
+        "Demand": demand,
+        "Capacity": capacity,
+        "TransportCost": rng.integers(1, 20, size=(facilities, size)),
+        "OpeningCost": rng.integers(500, 2000, size=facilities),
+    }
+
+
+def csp(size, rng):
+    roll_width = 100
+    width = rng.integers(5, roll_width // 2, size=size)
+    # Trivial one-width patterns keep every instance feasible; the rest are random greedy fills
+    patterns = [np.where(np.arange(size) == t, roll_width // width[t], 0) for t in range(size)]
+    for _ in range(2 * size):
+        pattern = np.zeros(size, dtype=int)
+        free = roll_width
+        for t in rng.permutation(size):
+            pieces = rng.integers(0, free // width[t] + 1)
+            pattern[t] = pieces
+            free -= pieces * width[t]
+        if pattern.any():
+            patterns.append(pattern)
+    return {
+        "P": len(patterns),
+        "T": size,
+        "Pattern": np.array(patterns),
+        "MaterialUsedForPattern": [1.0] * len(patterns),
+        "Demand": rng.integers(1, 50, size=size),
+        "RollWidth": roll_width,
+        "Width": width,
+    }
+
+
+def tsp(size, rng):
+    return {"N": size, "Distance": _distances(rng, size)}
+
+
+def vrp(size, rng):
+    return {"M": max(2, size // 8), "N": size, "Distance": _distances(rng, size)}
+
+
+GENERATORS = {
+    "BPP": bpp,
+    "Knapsack": knapsack,
+    "CFLP": cflp,
+    "CSP": csp,
+    "TSP": tsp,
+    "VRP": vrp,
+}
+
+
+def generate(problem, size, seed=0):
+    """Instance dict of ``problem`` at ``size`` with plain Python values."""
+    data = GENERATORS[problem](size, np.random.default_rng(seed))
+    return {key: np.asarray(value).tolist() for key, value in data.items()}
+
+
+def dump_instance(data, path):
+    """Write ``data`` laid out like the hand-written files: one matrix row per line."""
+    lines = []
+    for key, value in data.items():
+        if value and isinstance(value, list) and isinstance(value[0], list):
+            rows = ",\n".join("    " + json.dumps(row) for row in value)
+            lines.append(f'  "{key}": [\n{rows}\n  ]')
+        else:
+            lines.append(f'  "{key}": {json.dumps(value)}')
+    with open(path, "w") as f:
+        f.write("{\n" + ",\n".join(lines) + "\n}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera una instancia aleatoria reproducible de un problema.")
+    parser.add_argument("problem", choices=sorted(GENERATORS), help="problema")
+    parser.add_argument("size", type=int, help="tamaño (objetos, clientes, anchos o nodos)")
+    parser.add_argument("--seed", type=int, default=0, help="semilla")
+    parser.add_argument("--output", required=True, help="fichero JSON de salida (o directorio .inst)")
+    args = parser.parse_args()
+    if args.output.endswith(SUFFIX):
+        save_instance(GENERATORS[args.problem](args.size, np.random.default_rng(args.seed)), args.output)
+    else:
+        dump_instance(generate(args.problem, args.size, args.seed), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Binary instance format: scalars in a JSON header, arrays as memory-mapped .npy files.
+
+An instance ``Data.json`` becomes the directory ``Data.inst/``::
+
+    Data.inst/header.json     {"scalars": {"N": 5}, "arrays": ["Distance"]}
+    Data.inst/Distance.npy
+
+Usage::
+
+    python -m comun.instances "SegundaIteración/TSP/Data*.json"
+
+``load_instance`` reads either format. The arrays are opened with
+``mmap_mode="r"``, so loading costs neither parsing nor a copy and only
+the pages a script touches are read. With ``prefer_binary`` (the scripts'
+``--prefer-binary``), a JSON file whose converted ``.inst`` sibling is up to
+date is read from the sibling instead.
+"""
+
+import argparse
+import glob
+import json
+import os
+
+import numpy as np
+
+SUFFIX = ".inst"
+HEADER = "header.json"
+
+
+def binary_path(path):
+    """``Data.json`` -> ``Data.inst``."""
+    return os.path.splitext(path)[0] + SUFFIX
+
+
+def save_instance(data, path):
+    """Write ``data`` (ints and floats, numeric lists or arrays) to the directory ``path``."""
+    os.makedirs(path, exist_ok=True)
+    scalars, arrays = {}, []
+    for key, value in data.items():
+        if np.ndim(value) == 0:
+            scalars[key] = np.asarray(value).item()
+            continue
+        array = np.asarray(value)
+        if array.dtype.kind not in "iuf":
+            raise ValueError(f"'{key}' no es una matriz numérica regular")
+        if array.dtype.kind in "iu" and array.size:
+            # Narrowest integer type that holds the values, but no narrower than int32
+            # so that sums in the scripts do not overflow
+            array = array.astype(np.result_type(np.min_scalar_type(array.min()), np.min_scalar_type(array.max()), np.int32))
+        np.save(os.path.join(path, key + ".npy"), array)
+        arrays.append(key)
+    with open(os.path.join(path, HEADER), "w") as f:
+        json.dump({"scalars": scalars, "arrays": arrays}, f, indent=2)
+
+
+def _load_binary(path):
+    with open(os.path.join(path, HEADER), "r") as f:
+        header = json.load(f)
+    data = dict(header["scalars"])
+    for key in header["arrays"]:
+        data[key] = np.load(os.path.join(path, key + ".npy"), mmap_mode="r")
+    return data
+
+
+def load_instance(path, prefer_binary=False):
+    """Instance dict from a ``.inst`` directory or a JSON file.
+
+    Arrays come back as read-only ``np.memmap`` in the binary format and as
+    lists in JSON. With ``prefer_binary``, a JSON file whose ``.inst`` sibling
+    is not older than it is read from the sibling.
+    """
+    if os.path.isdir(path):
+        return _load_binary(path)
+    sibling = os.path.join(binary_path(path), HEADER)
+    if prefer_binary and os.path.exists(sibling) and os.path.getmtime(sibling) >= os.path.getmtime(path):
+        return _load_binary(binary_path(path))
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def convert(path, output=None):
+    """Convert the JSON instance ``path``; returns the directory written."""
+    output = output or binary_path(path)
+    with open(path, "r") as f:
+        save_instance(json.load(f), output)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte instancias JSON al formato binario .inst.")
+    parser.add_argument("pattern", nargs="+", help="ficheros JSON o patrones glob")
+    args = parser.parse_args()
+    paths = sorted({path for pattern in args.pattern for path in glob.glob(pattern)})
+    if not paths:
+        parser.error("ningún fichero coincide con el patrón")
+    for path in paths:
+        print(f"{path} -> {convert(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Per-phase timing and memory profile of a solve script.
+
+The scripts mark where each phase starts; a phase ends when the next one
+starts or on ``stop()``::
+
+    profiler = Profiler()
+    profiler.phase("load")      # load_instance
+    profiler.phase("build")     # variables, constraints, objective
+    profiler.watch(model)
+    profiler.phase("optimize")  # model.optimize()
+    profiler.phase("extract")   # extract_results
+    profiler.stop()
+    solving_info["profile"] = profiler.record()
+
+Every phase gets wall and CPU time, the tracemalloc peak of the Python
+allocations made during it (only with ``trace_memory``, since tracing
+slows the build down; None otherwise), the process peak RSS at its end (the solver
+allocates outside Python) and the variables, constraints and nonzeros it
+added to the watched model. A phase marked again adds to its totals.
+"""
+
+import resource
+import time
+import tracemalloc
+
+MB = 1024 * 1024
+
+
+class Profiler:
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.model = None
+        self.phases = {}
+        self.current = None
+        self._counts = (0, 0, 0)
+        self._started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        self._start = self._clock()
+
+    @staticmethod
+    def _clock():
+        return time.perf_counter(), time.process_time()
+
+    def _model_counts(self):
+        if self.model is None:
+            return self._counts
+        self.model.update()
+        return self.model.NumVars, self.model.NumConstrs, self.model.NumNZs
+
+    def watch(self, model):
+        """Count the variables, constraints and nonzeros added to ``model``."""
+        self.model = model
+        self._counts = self._model_counts()
+
+    def phase(self, name):
+        """End the running phase and start ``name``."""
+        self._close()
+        self.current = name
+        self._phase_start = self._clock()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+
+    def _close(self):
+        if self.current is None:
+            return
+        wall, cpu = self._clock()
+        counts = self._model_counts()
+        stats = self.phases.setdefault(self.current, {
+            "wall": 0.0, "cpu": 0.0, "peak_memory_mb": 0.0 if self.trace_memory else None, "peak_rss_mb": 0.0,
+            "vars_added": 0, "constrs_added": 0, "nonzeros_added": 0,
+        })
+        stats["wall"] += wall - self._phase_start[0]
+        stats["cpu"] += cpu - self._phase_start[1]
+        if self.trace_memory:
+            stats["peak_memory_mb"] = max(stats["peak_memory_mb"], tracemalloc.get_traced_memory()[1] / MB)
+        # ru_maxrss is in KiB on Linux
+        stats["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        stats["vars_added"] += counts[0] - self._counts[0]
+        stats["constrs_added"] += counts[1] - self._counts[1]
+        stats["nonzeros_added"] += counts[2] - self._counts[2]
+        self._counts = counts
+        self.current = None
+
+    def stop(self):
+        """End the running phase and stop tracemalloc if this profiler started it."""
+        self._close()
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def record(self):
+        """Plain dict with the phases, the totals and the final model size."""
+        wall, cpu = self._clock()
+        return {
+            "phases": self.phases,
+            "wall": wall - self._start[0],
+            "cpu": cpu - self._start[1],
+            "num_vars": self._counts[0],
+            "num_constrs": self._counts[1],
+            "num_nonzeros": self._counts[2],
+        }
+
+    def report(self):
+        """Print one line per phase."""
+        width = max([len("Fase")] + [len(name) for name in self.phases])
+        print(f"{'Fase':<{width}}  Pared (s)  CPU (s)  Pico Python (MB)  Variables  Restricciones  No nulos")
+        for name, stats in self.phases.items():
+            peak = f"{'-':>16}" if stats["peak_memory_mb"] is None else f"{stats['peak_memory_mb']:16.1f}"
+            print(f"{name:<{width}}  {stats['wall']:9.3f}  {stats['cpu']:7.3f}  {peak}"
+                  f"  {stats['vars_added']:9d}  {stats['constrs_added']:13d}  {stats['nonzeros_added']:8d}")
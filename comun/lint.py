@@ -0,0 +1,194 @@
+"""Model cleaning pass run on a built gurobipy model before optimize().
+
+The generated scripts add rows that do not restrict the model: constant
+comparisons (``Pattern[p][t] >= 0`` reaches the model as an empty row),
+exact or scaled duplicates, single-variable rows that only restate a bound
+and rows that the variable bounds already imply. ``clean_model`` removes
+them, turns single-variable rows into bounds and reports what it did.
+
+The rows are read at once as the sparse matrix of ``model.getA()``, so the
+pass costs a few sparse products on a model that has nothing to remove.
+"""
+
+import math
+
+import numpy as np
+import scipy.sparse as sp
+
+import gurobipy as gp
+
+TOLERANCE = 1e-9
+
+CATEGORIES = {
+    "constant": "constantes",
+    "duplicate": "duplicadas",
+    "bound": "convertidas en cotas",
+    "redundant_bound": "cotas redundantes",
+    "implied": "implícitas por las cotas",
+}
+
+
+def _flip(sense):
+    return {gp.GRB.LESS_EQUAL: gp.GRB.GREATER_EQUAL, gp.GRB.GREATER_EQUAL: gp.GRB.LESS_EQUAL}.get(sense, sense)
+
+
+def _satisfied(activity, sense, rhs):
+    # Elementwise over arrays of activities, senses and right-hand sides
+    return np.where(sense == gp.GRB.LESS_EQUAL, activity <= rhs + TOLERANCE,
+                    np.where(sense == gp.GRB.GREATER_EQUAL, activity >= rhs - TOLERANCE, np.abs(activity - rhs) <= TOLERANCE))
+
+
+def _clean_matrix(A):
+    # Merge repeated variables and drop zeros; column indices sorted in each row
+    A = sp.csr_matrix(A)
+    A.sum_duplicates()
+    A.data[np.abs(A.data) <= TOLERANCE] = 0
+    A.eliminate_zeros()
+    A.sort_indices()
+    return A
+
+
+def _tighten(lb, ub, integer, j, sense, value):
+    # Apply "x_j sense value" to the bound arrays; returns True when it is tighter
+    if integer[j]:
+        value_ub = math.floor(value + TOLERANCE)
+        value_lb = math.ceil(value - TOLERANCE)
+    else:
+        value_ub = value_lb = value
+    tighter = False
+    if sense != gp.GRB.GREATER_EQUAL and value_ub < ub[j] - TOLERANCE:
+        ub[j] = value_ub
+        tighter = True
+    if sense != gp.GRB.LESS_EQUAL and value_lb > lb[j] + TOLERANCE:
+        lb[j] = value_lb
+        tighter = True
+    return tighter
+
+
+def _candidate_groups(A):
+    # Rows with the same pattern and coefficients get the same pair of random
+    # projections; only those groups are compared exactly
+    rng = np.random.default_rng(0)
+    pattern = sp.csr_matrix((np.ones_like(A.data), A.indices, A.indptr), shape=A.shape)
+    keys = np.column_stack([np.diff(A.indptr), A @ rng.random(A.shape[1]), pattern @ rng.random(A.shape[1])])
+    _, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+    repeated = np.flatnonzero(counts[inverse] > 1)
+    groups = {}
+    for r in repeated.tolist():
+        groups.setdefault(inverse[r], []).append(r)
+    return groups.values()
+
+
+def clean_model(model, verbose=True):
+    """Remove rows that do not restrict ``model`` and report them.
+
+    Returns a dict mapping each category (constant, duplicate, bound,
+    redundant_bound, implied) to the names of the removed rows, plus
+    ``infeasible`` with the names of rows that can never be satisfied; those
+    are kept so the solver still reports the model as infeasible.
+    """
+    model.update()
+    variables = model.getVars()
+    constrs = model.getConstrs()
+    report = {category: [] for category in CATEGORIES}
+    report["infeasible"] = []
+    if not constrs:
+        if verbose:
+            print("Limpieza del modelo: 0 de 0 restricciones eliminadas")
+        return report
+
+    A = _clean_matrix(model.getA())
+    rhs = np.array(model.getAttr("RHS", constrs), dtype=float)
+    sense = np.array(model.getAttr("Sense", constrs))
+    names = model.getAttr("ConstrName", constrs)
+    lb = np.array(model.getAttr("LB", variables), dtype=float)
+    ub = np.array(model.getAttr("UB", variables), dtype=float)
+    integer = np.isin(model.getAttr("VType", variables), [gp.GRB.BINARY, gp.GRB.INTEGER])
+    remove = np.zeros(len(constrs), dtype=bool)
+
+    # Pass 1: constant and single-variable rows
+    length = np.diff(A.indptr)
+    empty = length == 0
+    satisfied = _satisfied(0.0, sense, rhs)
+    report["constant"] += [names[r] for r in np.flatnonzero(empty & satisfied).tolist()]
+    report["infeasible"] += [names[r] for r in np.flatnonzero(empty & ~satisfied).tolist()]
+    remove |= empty & satisfied
+    bounds_before = lb.copy(), ub.copy()
+    for r in np.flatnonzero(length == 1).tolist():
+        j, a = A.indices[A.indptr[r]], A.data[A.indptr[r]]
+        row_sense = sense[r] if a > 0 else _flip(sense[r])
+        category = "bound" if _tighten(lb, ub, integer, j, row_sense, rhs[r] / a) else "redundant_bound"
+        report[category].append(names[r])
+        remove[r] = True
+    changed = np.flatnonzero((lb != bounds_before[0]) | (ub != bounds_before[1])).tolist()
+    if changed:
+        model.setAttr("LB", [variables[j] for j in changed], lb[changed].tolist())
+        model.setAttr("UB", [variables[j] for j in changed], ub[changed].tolist())
+
+    # Pass 2: rows implied by the bounds, and duplicates up to a positive or
+    # negative scaling once fixed variables are moved to the rhs
+    rows = np.flatnonzero(length > 1)
+    fixed = ub - lb <= TOLERANCE
+    B = A[rows]
+    rhs2 = rhs[rows] - B @ np.where(fixed, lb, 0.0)
+    B = _clean_matrix(B @ sp.diags((~fixed).astype(float)))
+    sense2 = sense[rows]
+    length2 = np.diff(B.indptr)
+    empty = length2 == 0
+    satisfied = _satisfied(0.0, sense2, rhs2)
+    report["constant"] += [names[r] for r in rows[empty & satisfied].tolist()]
+    report["infeasible"] += [names[r] for r in rows[empty & ~satisfied].tolist()]
+    remove[rows[empty & satisfied]] = True
+
+    positive, negative = B.maximum(0), B.minimum(0)
+    low = positive @ lb + negative @ ub
+    high = positive @ ub + negative @ lb
+    implied = ~empty & (((sense2 == gp.GRB.LESS_EQUAL) & (high <= rhs2 + TOLERANCE))
+                        | ((sense2 == gp.GRB.GREATER_EQUAL) & (low >= rhs2 - TOLERANCE)))
+    report["implied"] += [names[r] for r in rows[implied].tolist()]
+    remove[rows[implied]] = True
+
+    # Duplicates among the rows left, each scaled by its first coefficient
+    left = np.flatnonzero(~empty & ~implied)
+    C = B[left]
+    scale = C.data[C.indptr[:-1]] if C.nnz else np.zeros(0)
+    C = sp.diags(1 / scale) @ C if len(left) else C
+    C.data = np.round(C.data, 12)
+    for candidates in _candidate_groups(C) if len(left) else ():
+        groups = {}
+        for k in candidates:
+            start, end = C.indptr[k], C.indptr[k + 1]
+            key = (C.indices[start:end].tobytes(), C.data[start:end].tobytes())
+            r = rows[left[k]]
+            row_sense = sense2[left[k]] if scale[k] > 0 else _flip(sense2[left[k]])
+            groups.setdefault(key, []).append((r, row_sense, rhs2[left[k]] / scale[k]))
+        for group in groups.values():
+            if len(group) == 1:
+                continue
+            equalities = [entry for entry in group if entry[1] == gp.GRB.EQUAL]
+            if equalities:
+                kept = [equalities[0]]
+            else:
+                lower = [entry for entry in group if entry[1] == gp.GRB.GREATER_EQUAL]
+                upper = [entry for entry in group if entry[1] == gp.GRB.LESS_EQUAL]
+                kept = ([max(lower, key=lambda entry: entry[2])] if lower else []) + ([min(upper, key=lambda entry: entry[2])] if upper else [])
+            if any(not _satisfied(other[2], entry[1], entry[2]) for entry in group for other in kept if other[1] == gp.GRB.EQUAL):
+                report["infeasible"].extend(names[entry[0]] for entry in group)
+                continue
+            for entry in group:
+                if all(entry[0] != other[0] for other in kept):
+                    report["duplicate"].append(names[entry[0]])
+                    remove[entry[0]] = True
+
+    removed = np.flatnonzero(remove).tolist()
+    if removed:
+        model.remove([constrs[r] for r in removed])
+        model.update()
+
+    if verbose:
+        summary = ", ".join(f"{len(report[category])} {label}" for category, label in CATEGORIES.items() if report[category])
+        print(f"Limpieza del modelo: {len(removed)} de {len(constrs)} restricciones eliminadas" + (f" ({summary})" if summary else ""))
+        if report["infeasible"]:
+            print("Restricciones imposibles de satisfacer:", ", ".join(report["infeasible"]))
+    return report
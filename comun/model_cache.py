@@ -0,0 +1,160 @@
+"""Built models saved to disk and read back instead of rebuilt.
+
+A script wraps its construction like this::
+
+    key = model_key("VRP", {"SUBTOUR_MODE": SUBTOUR_MODE}, data, __file__)
+    cached = load_model(key)
+    if cached is None:
+        model = gp.Model('model')
+        ...
+        save_model(model, key, {"Travel": Travel})
+    else:
+        model, groups = cached
+        Travel = groups["Travel"]
+
+The key hashes the problem, the formulation variant, the instance data
+(see ``comun.cache.instance_digest``) and the source of the script's
+directory and of ``comun`` (``comun.cache.source_digest``), since
+``comun.lint`` and the other shared modules shape the model too. The model
+goes to ``<key>.mps.bz2`` and its variable groups, stored as the keys and
+the position in ``model.getVars()`` of each variable, to ``<key>.json``;
+``load_model`` rebuilds them as tupledicts so that callbacks and
+``extract_results`` work unchanged. MPS keeps the variables, rows, bounds,
+types and objective but not parameters or MIP starts, so scripts set
+those after loading. Reading an entry refreshes its modification time,
+and ``save_model`` deletes the least recently used entries while the
+cache is above ``max_bytes``, together with the temporary files of saves
+that were killed halfway.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+import time
+
+import gurobipy as gp
+
+from comun.cache import instance_digest, source_digest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", os.path.join(ROOT, ".model_cache"))
+MAX_BYTES = 1024 * 1024 * 1024
+MODEL_SUFFIX = ".mps.bz2"
+# A temporary file this old belongs to a save that will never finish, even if
+# its process id has been reused
+STALE_SECONDS = 3600
+
+
+def model_key(problem, variant, data, script):
+    parts = {
+        "problem": problem,
+        "variant": variant,
+        "instance": instance_digest(data),
+        "source": source_digest(script),
+        "gurobi": ".".join(map(str, gp.gurobi.version())),
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def _paths(key, directory):
+    base = os.path.join(directory, key)
+    return base + MODEL_SUFFIX, base + ".json"
+
+
+def save_model(model, key, groups, directory=MODEL_CACHE_DIR, max_bytes=MAX_BYTES):
+    """Write ``model`` and its variable ``groups`` (name -> tupledict, or list of Var)."""
+    os.makedirs(directory, exist_ok=True)
+    model_path, meta_path = _paths(key, directory)
+    model.update()
+    metadata = {}
+    for name, group in groups.items():
+        items = group.items() if isinstance(group, dict) else enumerate(group)
+        keys, indices = [], []
+        for index, var in items:
+            keys.append(list(index) if isinstance(index, tuple) else index)
+            indices.append(var.index)
+        metadata[name] = {"keys": keys, "indices": indices, "tuple": isinstance(group, dict)}
+    # Temporary names so a concurrent reader never sees half an entry; the
+    # metadata goes last because load_model looks for it first
+    temporary = f"{os.getpid()}.tmp"
+    model_temporary = os.path.join(directory, f"{key}.{temporary}{MODEL_SUFFIX}")
+    meta_temporary = meta_path + "." + temporary
+    try:
+        model.write(model_temporary)
+        os.replace(model_temporary, model_path)
+        with open(meta_temporary, "w") as f:
+            json.dump(metadata, f)
+        os.replace(meta_temporary, meta_path)
+    finally:
+        for path in (model_temporary, meta_temporary):
+            if os.path.exists(path):
+                os.remove(path)
+    evict(directory, max_bytes)
+
+
+def load_model(key, directory=MODEL_CACHE_DIR):
+    """``(model, groups)`` for ``key``, or None if it is not cached."""
+    model_path, meta_path = _paths(key, directory)
+    try:
+        with open(meta_path, "r") as f:
+            metadata = json.load(f)
+        model = gp.read(model_path)
+    except (OSError, ValueError, gp.GurobiError):
+        return None
+    os.utime(model_path)
+    os.utime(meta_path)
+    variables = model.getVars()
+    groups = {}
+    for name, group in metadata.items():
+        members = [variables[i] for i in group["indices"]]
+        if group["tuple"]:
+            keys = [tuple(k) if isinstance(k, list) else k for k in group["keys"]]
+            groups[name] = gp.tupledict(zip(keys, members))
+        else:
+            groups[name] = members
+    return model, groups
+
+
+def _writer_alive(path):
+    # Temporary names carry the writer's process id: "<key>.<pid>.tmp..."
+    match = re.search(r"\.(\d+)\.tmp", os.path.basename(path))
+    if match is None:
+        return False
+    try:
+        os.kill(int(match.group(1)), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def evict(directory=MODEL_CACHE_DIR, max_bytes=MAX_BYTES):
+    """Delete stale temporary files, then the least recently used models until the cache fits in ``max_bytes``."""
+    now = time.time()
+    for path in glob.glob(os.path.join(directory, "*.tmp*")):
+        try:
+            if not _writer_alive(path) or now - os.path.getmtime(path) > STALE_SECONDS:
+                os.remove(path)
+        except OSError:
+            pass
+    entries = []
+    for meta_path in glob.glob(os.path.join(directory, "*.json")):
+        model_path = meta_path[:-len(".json")] + MODEL_SUFFIX
+        try:
+            size = os.path.getsize(meta_path) + os.path.getsize(model_path)
+            entries.append((os.path.getmtime(meta_path), size, meta_path, model_path))
+        except OSError:
+            continue
+    total = sum(entry[1] for entry in entries)
+    for _, size, meta_path, model_path in sorted(entries):
+        if total <= max_bytes:
+            break
+        for path in (meta_path, model_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= size
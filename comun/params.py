@@ -0,0 +1,38 @@
+"""Best-known Gurobi parameters per problem, as found by ``comun.tuning``.
+
+``tuned_params.json`` maps each problem of ``comun.batch.SCRIPTS`` to its
+parameters and the evidence behind them::
+
+    {"CSP": {"params": {"MIPFocus": 1}, "score": 0.41, "default_score": 0.57, ...}}
+
+The scripts apply them before the ``--param`` values given on the command
+line (see ``comun.cli``); ``--no-tuned-params`` ignores them.
+"""
+
+import json
+import os
+
+TUNED_PARAMS = os.environ.get("TUNED_PARAMS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tuned_params.json"))
+
+
+def load_tuned(path=TUNED_PARAMS):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def tuned_params(problem, path=TUNED_PARAMS):
+    """Parameters stored for ``problem``; empty when it has not been tuned."""
+    return dict(load_tuned(path).get(problem, {}).get("params", {}))
+
+
+def save_tuned_params(problem, entry, path=TUNED_PARAMS):
+    """Store ``entry`` (``{"params": {...}, ...}``) as the configuration of ``problem``."""
+    tuned = load_tuned(path)
+    tuned[problem] = entry
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(tuned, f, indent=2, sort_keys=True)
+    os.replace(temporary, path)
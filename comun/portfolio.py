@@ -0,0 +1,215 @@
+"""Portfolio mode: one instance solved by several configurations racing in parallel.
+
+Usage::
+
+    python -m comun.portfolio TSP SegundaIteración/TSP/Data5.json --time-limit 60
+    python -m comun.portfolio CFLP SegundaIteración/CFLP/Data5.json --configs matrix sparse mip_focus_1
+
+Every configuration is the problem's script (see ``comun.batch``) with
+extra arguments: Gurobi parameters (``--param Seed=1``, ``MIPFocus``,
+``Cuts``) or a formulation variant selected with the script's mode
+constants (``--mode CANDIDATE_EDGES=10``). Each one runs in its own
+process; the first to finish with a final status (optimal or infeasible)
+wins and the others are terminated. If none does, the best objective is
+kept.
+
+While they run, the Gurobi MIP solves share their incumbents through a
+``SharedIncumbent`` (see ``comun.backend.share_incumbents``): every
+configuration stops as soon as its bound shows that it cannot beat the
+best objective found by any of them, and configurations with the same
+variables and rows load each other's solutions. The winner's record, with
+the outcome of every configuration under ``"portfolio"``, is written to
+``--output``; the solver log of each configuration goes to
+``<output>.logs/<configuration>.log``. The configurations always build
+their model (``--no-model-cache``).
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import queue
+import tempfile
+import time
+
+import numpy as np
+
+import gurobipy as gp
+
+from comun import backend
+from comun.backend import BACKENDS
+from comun.batch import SCRIPTS, solve_instance
+from comun.results import status_name
+
+# Configurations every MIP portfolio includes besides the script's defaults
+PARAMETER_VARIANTS = {
+    "seed_1": ["--param", "Seed=1"],
+    "mip_focus_1": ["--param", "MIPFocus=1"],
+    "mip_focus_2": ["--param", "MIPFocus=2"],
+    "cuts_2": ["--param", "Cuts=2"],
+}
+
+PORTFOLIOS = {
+    "BPP": {"assignment": [], "set_covering": ["--mode", "SOLVE_MODE=set_covering"], **PARAMETER_VARIANTS},
+    "Knapsack": {"dp": [], "mip": ["--mode", "SOLVER=gurobi"]},
+    "CFLP": {"matrix": [], "sparse": ["--mode", "BUILD_MODE=sparse"], "lagrangian": ["--mode", "SOLVE_MODE=lagrangian"],
+             **PARAMETER_VARIANTS},
+    "CSP": {"patterns": [], **PARAMETER_VARIANTS},
+    "TSP": {"lazy": [], "sparse_10": ["--mode", "CANDIDATE_EDGES=10"], **PARAMETER_VARIANTS},
+    "VRP": {"separate": [], "no_warm_start": ["--mode", "WARM_START=False"], **PARAMETER_VARIANTS},
+}
+
+# Statuses that settle the instance, whichever configuration reaches them
+FINAL_STATUSES = {status_name(status) for status in (gp.GRB.OPTIMAL, gp.GRB.INFEASIBLE, gp.GRB.INF_OR_UNBD, gp.GRB.UNBOUNDED)}
+MAXIMIZE = {"Knapsack"}
+
+
+class SharedIncumbent:
+    """Best objective (minimization form) and solution of a portfolio run, shared between processes.
+
+    The objective and a version counter live in shared memory; each new
+    solution vector is written to ``directory`` as ``<version>.npz`` with the
+    signature of the model that found it.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._objective = multiprocessing.Value("d", math.inf)
+        self._version = multiprocessing.Value("i", 0)
+
+    def objective(self):
+        return self._objective.value
+
+    def version(self):
+        return self._version.value
+
+    def _path(self, version):
+        return os.path.join(self.directory, f"{version}.npz")
+
+    def publish(self, signature, objective, values):
+        with self._objective.get_lock():
+            if objective >= self._objective.value - backend.OBJECTIVE_TOLERANCE:
+                return
+            version = self._version.value + 1
+            temporary = os.path.join(self.directory, f"{version}.{os.getpid()}.tmp.npz")
+            np.savez(temporary, signature=np.array(signature), values=np.asarray(values, dtype=float))
+            os.replace(temporary, self._path(version))
+            self._objective.value = objective
+            self._version.value = version
+
+    def values(self, signature):
+        """Latest shared solution, or None if it belongs to a model with another signature."""
+        version = self.version()
+        if not version:
+            return None
+        with np.load(self._path(version)) as archive:
+            if tuple(archive["signature"].tolist()) != tuple(signature):
+                return None
+            return archive["values"]
+
+
+def _solve_configuration(problem, data, name, script_argv, threads, log_path, shared, results):
+    # Worker process: solve with one configuration, sharing incumbents through shared
+    backend.share_incumbents(shared)
+    results.put((name, solve_instance(problem, data, threads, log_path, script_argv)))
+
+
+def _best(problem, records):
+    solved = [(name, record) for name, record in records.items() if record.get("objective_value") is not None]
+    if not solved:
+        return next(iter(records), None)
+    sense = -1 if problem in MAXIMIZE else 1
+    return min(solved, key=lambda item: sense * item[1]["objective_value"])[0]
+
+
+def run_portfolio(problem, data, output, configurations=None, threads=1, time_limit=None, backend_name="gurobi"):
+    """Race the ``configurations`` (name -> extra script arguments) on ``data``; returns the winner's record."""
+    configurations = configurations or PORTFOLIOS[problem]
+    logs = output + ".logs"
+    os.makedirs(logs, exist_ok=True)
+    # Configurations with the same formulation would build and write the same
+    # model cache entry at once, and the losers are killed in the middle of it
+    common_argv = ["--backend", backend_name, "--no-model-cache"]
+    if time_limit:
+        common_argv += ["--time-limit", str(time_limit)]
+
+    start = time.time()
+    results = multiprocessing.Queue()
+    records = {}
+    winner = None
+    with tempfile.TemporaryDirectory() as directory:
+        shared = SharedIncumbent(directory)
+        processes = {
+            name: multiprocessing.Process(target=_solve_configuration, daemon=True, args=(
+                problem, data, name, common_argv + list(extra), threads, os.path.join(logs, name + ".log"), shared, results))
+            for name, extra in configurations.items()
+        }
+        for process in processes.values():
+            process.start()
+
+        running = set(processes)
+        # A process that exited without a record gets one more timeout for it to arrive
+        suspects = set()
+        while running and winner is None:
+            try:
+                name, record = results.get(timeout=1)
+            except queue.Empty:
+                for name in sorted(running):
+                    if processes[name].exitcode is None:
+                        continue
+                    if name in suspects:
+                        running.discard(name)
+                        records[name] = {"status": "Error", "error": f"el proceso terminó con código {processes[name].exitcode}"}
+                        print(f"{name}: Error")
+                    suspects.add(name)
+                continue
+            running.discard(name)
+            records[name] = record
+            print(f"{name}: {record['status']}, objetivo {record.get('objective_value')} ({record['wall_time']:.2f} s)")
+            if record["status"] in FINAL_STATUSES:
+                winner = name
+
+        for name in running:
+            processes[name].terminate()
+        for process in processes.values():
+            process.join()
+
+    if winner is None:
+        winner = _best(problem, records)
+    record = {"problem": problem, "instance": data, **records.get(winner, {"status": "Error"}), "configuration": winner}
+    record["wall_time"] = time.time() - start
+    record["portfolio"] = {
+        name: {key: records[name].get(key) for key in ("status", "objective_value", "wall_time", "error") if key in records[name]}
+        if name in records else {"status": "Terminated"}
+        for name in configurations
+    }
+    with open(output, "w") as f:
+        json.dump(record, f)
+    print(f"Ganadora: {winner} ({record['status']}, objetivo {record.get('objective_value')}) en {record['wall_time']:.2f} s")
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resuelve una instancia con varias configuraciones en paralelo y se queda con la primera que termina.")
+    parser.add_argument("problem", choices=sorted(SCRIPTS), help="problema a resolver")
+    parser.add_argument("data", help="fichero de instancia")
+    parser.add_argument("--configs", nargs="+", default=None,
+                        help="configuraciones de PORTFOLIOS que se lanzan (por defecto, todas las del problema)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="hilos del solver por configuración (por defecto, núcleos / configuraciones)")
+    parser.add_argument("--time-limit", type=float, default=None, help="límite de tiempo por configuración en segundos")
+    parser.add_argument("--backend", choices=BACKENDS, default="gurobi", help="solver de los modelos (ver comun/backend.py)")
+    parser.add_argument("--output", default="portfolio.json", help="fichero JSON con el registro de la ganadora")
+    args = parser.parse_args()
+    portfolio = PORTFOLIOS[args.problem]
+    unknown = sorted(set(args.configs or ()) - set(portfolio))
+    if unknown:
+        parser.error(f"configuraciones desconocidas para {args.problem}: {', '.join(unknown)} (disponibles: {', '.join(portfolio)})")
+    configurations = {name: portfolio[name] for name in args.configs} if args.configs else portfolio
+    threads = args.threads or max(1, (os.cpu_count() or 1) // len(configurations))
+    run_portfolio(args.problem, args.data, args.output, configurations, threads, args.time_limit, args.backend)
+
+
+if __name__ == "__main__":
+    main()
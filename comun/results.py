@@ -0,0 +1,153 @@
+"""Solution extraction shared by the solve scripts.
+
+Replaces the ``solving_info`` block every script used to carry. Values are
+read with one bulk attribute query per variable group and kept as NumPy
+arrays, and only the nonzero entries are stored::
+
+    solving_info["variables"] == {"X": {"index": array([[0, 3], [1, 0]]), "value": array([1., 1.])}}
+
+``save_results`` writes the result as compact JSON or as an NPZ archive.
+"""
+
+import json
+
+import numpy as np
+
+import gurobipy as gp
+
+ZERO_TOLERANCE = 1e-9
+
+STATUS_NAMES = {
+    gp.GRB.LOADED: "Loaded",
+    gp.GRB.OPTIMAL: "Optimal",
+    gp.GRB.INFEASIBLE: "Infeasible",
+    gp.GRB.INF_OR_UNBD: "Infeasible or Unbounded",
+    gp.GRB.UNBOUNDED: "Unbounded",
+    gp.GRB.CUTOFF: "Cutoff",
+    gp.GRB.ITERATION_LIMIT: "Iteration limit",
+    gp.GRB.NODE_LIMIT: "Node limit",
+    gp.GRB.TIME_LIMIT: "Time limit",
+    gp.GRB.SOLUTION_LIMIT: "Solution limit",
+    gp.GRB.INTERRUPTED: "Interrupted",
+    gp.GRB.NUMERIC: "Numeric",
+    gp.GRB.SUBOPTIMAL: "Suboptimal",
+    gp.GRB.INPROGRESS: "In progress",
+    gp.GRB.USER_OBJ_LIMIT: "User objective limit",
+    gp.GRB.WORK_LIMIT: "Work limit",
+    gp.GRB.MEM_LIMIT: "Memory limit",
+}
+
+
+def status_name(status):
+    """``"Optimal (2)"``, ``"Time limit (9)"``..., also for codes this module does not know."""
+    return f"{STATUS_NAMES.get(status, 'Unknown')} ({status})"
+
+
+def _group_arrays(model, group):
+    # (index, value) arrays of one group: tupledict, MVar, list of Var or Var.
+    # Values go through model.getAttr so that a comun.backend.Solution works too
+    if isinstance(group, gp.MVar):
+        values = np.asarray(model.getAttr("X", group.reshape(-1).tolist()), dtype=float).reshape(group.shape)
+        return np.argwhere(np.ones(values.shape, dtype=bool)), values.ravel()
+    if isinstance(group, gp.Var):
+        return np.zeros((1, 0), dtype=int), np.array([model.getAttr("X", [group])[0]], dtype=float)
+    if isinstance(group, dict):
+        keys = list(group.keys())
+        index = np.array([key if isinstance(key, tuple) else (key,) for key in keys]).reshape(len(keys), -1)
+        return index, np.array(model.getAttr("X", list(group.values())), dtype=float)
+    group = list(group)
+    return np.arange(len(group))[:, np.newaxis], np.array(model.getAttr("X", group), dtype=float)
+
+
+def _groups_by_name(model):
+    # Fallback when the script does not pass its groups: split VarName "Group[i,j]"
+    variables = model.getVars()
+    names = model.getAttr("VarName", variables)
+    values = model.getAttr("X", variables)
+    groups = {}
+    for name, value in zip(names, values):
+        group, _, index = name.partition("[")
+        indices, group_values = groups.setdefault(group, ([], []))
+        indices.append(tuple(int(i) for i in index.rstrip("]").split(",")) if index else ())
+        group_values.append(value)
+    return {
+        group: (np.array(indices, dtype=int).reshape(len(indices), -1), np.array(group_values, dtype=float))
+        for group, (indices, group_values) in groups.items()
+    }
+
+
+def sparse(index, value):
+    """Keep only the nonzero entries of a group."""
+    index = np.asarray(index)
+    value = np.asarray(value, dtype=float)
+    nonzero = np.abs(value) > ZERO_TOLERANCE
+    return {"index": index[nonzero], "value": value[nonzero]}
+
+
+def make_results(status, objective_value, variables, runtime, iteration_count, mip_gap=None):
+    """Build a ``solving_info`` dict from values computed without a model (heuristics, DP)."""
+    return {
+        "status": status_name(status),
+        "objective_value": objective_value,
+        "variables": {group: sparse(index, value) for group, (index, value) in variables.items()},
+        "runtime": runtime,
+        "iteration_count": iteration_count,
+        "mip_gap": mip_gap,
+    }
+
+
+def extract_results(model, groups=None):
+    """Build the ``solving_info`` dict of a solved model.
+
+    ``model`` may also be the ``Solution`` of ``comun.backend.optimize``.
+    ``groups`` maps a group name to its variables (tupledict, MVar, list of
+    Var or a single Var). Without it the groups are rebuilt from VarName.
+    The objective and the solution are reported whenever the model has one,
+    including time-limited and interrupted runs.
+    """
+    has_solution = model.SolCount > 0
+    if not has_solution:
+        variables = {}
+    elif groups is None:
+        variables = _groups_by_name(model)
+    else:
+        variables = {name: _group_arrays(model, group) for name, group in groups.items()}
+    return make_results(
+        model.Status,
+        model.ObjVal if has_solution else None,
+        variables,
+        model.Runtime,
+        model.IterCount,
+        model.MIPGap if has_solution and model.IsMIP else None,
+    )
+
+
+def symbols(variables):
+    """Yield ``("X[0,3]", 1.0)`` pairs for the stored (nonzero) values."""
+    for group, arrays in variables.items():
+        for index, value in zip(arrays["index"], arrays["value"]):
+            yield (f"{group}[{','.join(str(i) for i in index)}]" if len(index) else group), float(value)
+
+
+def to_json(solving_info):
+    """Plain-Python copy of ``solving_info`` that ``json.dumps`` accepts."""
+    info = dict(solving_info)
+    info["variables"] = {
+        group: {"index": arrays["index"].tolist(), "value": arrays["value"].tolist()}
+        for group, arrays in solving_info["variables"].items()
+    }
+    return info
+
+
+def save_results(solving_info, path):
+    """Write ``solving_info`` to ``path``: NPZ archive for ``.npz``, compact JSON otherwise."""
+    if path.endswith(".npz"):
+        arrays = {}
+        for group, group_arrays in solving_info["variables"].items():
+            arrays[f"{group}.index"] = group_arrays["index"]
+            arrays[f"{group}.value"] = group_arrays["value"]
+        info = {key: value for key, value in solving_info.items() if key != "variables"}
+        np.savez_compressed(path, info=json.dumps(info), **arrays)
+    else:
+        with open(path, "w") as f:
+            json.dump(to_json(solving_info), f, separators=(",", ":"))
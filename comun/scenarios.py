@@ -0,0 +1,142 @@
+"""Scenario streams: one instance re-solved with changing data by an incremental model.
+
+The incremental models (``CFLP/CFLPIncremental.py`` and
+``CSP/CPPIncremental.py``) keep one Gurobi model per instance and apply each
+scenario in place: a scenario is a dict of the data fields that change, e.g.
+``{"Demand": [80, 290, 240, 160, 175]}``. Scenarios are read from a JSON
+Lines file (``--scenarios``) or drawn by scaling every demand by a random
+factor within ``--spread`` (``--count`` of them, seeded).
+
+With ``--compare`` every scenario is also solved the usual way: the data is
+written to a temporary file and the problem's script (see ``comun.batch``)
+builds and solves it from scratch, so the objectives and times of both
+loops can be checked side by side. Changes are cumulative: a field keeps
+its last value until a later scenario changes it again.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from comun.backend import BACKENDS
+from comun.batch import redirect_output, run_script
+from comun.cli import _assignment
+from comun.generators import dump_instance
+from comun.params import tuned_params
+from comun.results import to_json
+
+# Objectives of the two loops further apart than this are reported as a mismatch
+OBJECTIVE_TOLERANCE = 1e-6
+
+
+def scenario_parser(description):
+    """Parser of the instance, the scenario source and the solver settings; a module may add its own options."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("data", help="fichero de instancia")
+    parser.add_argument("--scenarios", default=None, help="fichero JSON Lines con los datos que cambian en cada escenario")
+    parser.add_argument("--count", type=int, default=20, help="escenarios aleatorios si no se da --scenarios")
+    parser.add_argument("--spread", type=float, default=0.2, help="variación relativa máxima de cada demanda")
+    parser.add_argument("--seed", type=int, default=0, help="semilla de los escenarios aleatorios")
+    parser.add_argument("--compare", action="store_true", help="resolver también cada escenario reconstruyendo el modelo")
+    parser.add_argument("--threads", type=int, default=None, help="hilos del solver (por defecto, todos)")
+    parser.add_argument("--time-limit", type=float, default=None, help="límite de tiempo del solver por escenario en segundos")
+    parser.add_argument("--backend", choices=BACKENDS, default="gurobi", help="solver de los modelos (ver comun/backend.py)")
+    parser.add_argument("--param", type=_assignment, action="append", default=[], metavar="NOMBRE=VALOR",
+                        help="parámetro de Gurobi, p. ej. --param MIPFocus=1 (se puede repetir)")
+    parser.add_argument("--no-tuned-params", dest="tuned_params", action="store_false",
+                        help="no cargar los parámetros ajustados por comun/tuning.py")
+    parser.add_argument("--output", default=None, help="fichero JSON Lines con un registro por escenario")
+    return parser
+
+
+def scenario_args(problem, parser):
+    """Parse the command line; ``args.tuned`` holds the parameters tuned for ``problem`` (see ``comun.params``),
+    so that ``comun.cli.apply_params`` can set up the models."""
+    args = parser.parse_args()
+    args.tuned = tuned_params(problem) if args.tuned_params else {}
+    return args
+
+
+def read_scenarios(path):
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def random_scenarios(data, count, spread, seed=0):
+    """``count`` demand vectors: each demand scaled by a factor in ``[1 - spread, 1 + spread]`` and rounded."""
+    rng = np.random.default_rng(seed)
+    Demand = np.asarray(data["Demand"], dtype=float)
+    return [{"Demand": np.maximum(np.rint(Demand * rng.uniform(1 - spread, 1 + spread, Demand.shape)), 1).astype(int).tolist()}
+            for _ in range(count)]
+
+
+def _script_argv(args):
+    script_argv = ["--no-model-cache", "--backend", args.backend]
+    if args.threads is not None:
+        script_argv += ["--threads", str(args.threads)]
+    if args.time_limit is not None:
+        script_argv += ["--time-limit", str(args.time_limit)]
+    if not args.tuned_params:
+        script_argv.append("--no-tuned-params")
+    for name, value in args.param:
+        script_argv += ["--param", f"{name}={value}"]
+    return script_argv
+
+
+def rebuild_and_solve(problem, data, script_argv=()):
+    """Solve ``data`` with the problem's script from scratch; returns its ``solving_info``."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "scenario.json")
+        # Arrays of a .inst instance are memmaps; the JSON writer expects lists
+        dump_instance({key: np.asarray(value).tolist() for key, value in data.items()}, path)
+        with redirect_output(os.devnull):
+            return run_script(problem, path, script_argv)["solving_info"]
+
+
+def run_scenarios(problem, args, data, incremental, script_argv=()):
+    """Solve every scenario with ``incremental.solve(**scenario)``; returns one record per scenario.
+
+    ``script_argv`` is added to the script's command line under ``--compare``
+    so that it builds the same formulation as the incremental model.
+    """
+    scenarios = read_scenarios(args.scenarios) if args.scenarios else random_scenarios(data, args.count, args.spread, args.seed)
+    script_argv = _script_argv(args) + list(script_argv)
+    records = []
+    totals = {"incremental": 0.0, "rebuild": 0.0}
+    mismatches = 0
+    for index, scenario in enumerate(scenarios):
+        start = time.time()
+        record = incremental.solve(**scenario)
+        record = {"scenario": index, **to_json(record), "wall_time": time.time() - start}
+        totals["incremental"] += record["wall_time"]
+        line = f"Escenario {index}: {record['status']}, objetivo {record['objective_value']} ({record['wall_time']:.3f} s)"
+        if args.compare:
+            data = {**data, **scenario}
+            start = time.time()
+            rebuilt = rebuild_and_solve(problem, data, script_argv)
+            record["rebuild"] = {"status": rebuilt["status"], "objective_value": rebuilt["objective_value"],
+                                 "wall_time": time.time() - start}
+            totals["rebuild"] += record["rebuild"]["wall_time"]
+            line += f"; reconstruyendo: {rebuilt['objective_value']} ({record['rebuild']['wall_time']:.3f} s)"
+            if (record["objective_value"] is None) != (rebuilt["objective_value"] is None) or (
+                    record["objective_value"] is not None
+                    and abs(record["objective_value"] - rebuilt["objective_value"])
+                    > OBJECTIVE_TOLERANCE * max(1.0, abs(rebuilt["objective_value"]))):
+                mismatches += 1
+                line += " DISTINTO"
+        print(line)
+        records.append(record)
+
+    print(f"{len(scenarios)} escenarios en {totals['incremental']:.3f} s con el modelo incremental")
+    if args.compare:
+        print(f"Reconstruyendo cada vez: {totals['rebuild']:.3f} s "
+              f"({totals['rebuild'] / max(totals['incremental'], 1e-9):.1f} veces más), {mismatches} objetivos distintos")
+    if args.output:
+        with open(args.output, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+    return records
@@ -0,0 +1,121 @@
+"""Candidate arc sets for the TSP models and the reduced costs that justify them.
+
+The models are built over the k nearest successors and predecessors of
+every city plus the arcs of a heuristic tour (``candidate_arcs``).
+``subtour_bound`` solves the LP relaxation with degree rows and subtour
+cuts over those arcs, pricing the rest of the matrix with the duals until
+no arc has a negative reduced cost. Its bound and reduced costs then hold
+for the full arc set: a tour that uses arc (i, j) costs at least
+bound + reduced_costs[i, j], so once a tour of cost z is known only the
+arcs with reduced cost below z - bound can improve it
+(``improving_arcs``).
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+import gurobipy as gp
+
+from comun.backend import optimize
+from comun.tsp_heuristics import tour_arcs
+
+TOLERANCE = 1e-6
+# Support graph thresholds used to look for subtour cuts in a fractional solution
+CUT_THRESHOLDS = (TOLERANCE, 0.3, 0.5, 0.7)
+
+
+def candidate_arcs(distance, k, tour=()):
+    """Boolean N x N mask: k nearest successors and predecessors of each city and the tour arcs."""
+    distance = np.array(distance, dtype=float)
+    n = len(distance)
+    np.fill_diagonal(distance, np.inf)
+    k = max(1, min(k, n - 1))
+    mask = np.zeros((n, n), dtype=bool)
+    mask[np.arange(n)[:, np.newaxis], np.argpartition(distance, k - 1, axis=1)[:, :k]] = True
+    mask[np.argpartition(distance, k - 1, axis=0)[:k], np.arange(n)] = True
+    for i, j in tour_arcs(list(tour)):
+        mask[i, j] = True
+    np.fill_diagonal(mask, False)
+    return mask
+
+
+def _subtour_cuts(n, arcs, values):
+    # Vertex sets S with x(S) > |S| - 1 among the components of the support graph
+    x = sp.coo_matrix((values, tuple(np.array(arcs).T)), shape=(n, n)).tocsr()
+    symmetric = x + x.T
+    cuts = {}
+    for threshold in CUT_THRESHOLDS:
+        support = symmetric.multiply(symmetric >= threshold)
+        count, labels = connected_components(support, directed=False)
+        if count == 1:
+            continue
+        for component in range(count):
+            members = labels == component
+            size = int(members.sum())
+            if 2 <= size <= n - 1 and x[members][:, members].sum() > size - 1 + TOLERANCE:
+                cuts[members.tobytes()] = members
+    return list(cuts.values())
+
+
+def subtour_bound(distance, arcs, setup=None, backend="gurobi"):
+    """LP relaxation with subtour cuts, priced over the whole matrix.
+
+    ``arcs`` is the candidate mask; it is returned with the arcs added by
+    pricing. ``setup`` is called on the LP to apply the solver settings, and
+    ``backend`` (see ``comun.backend``) solves it.
+
+    Returns a dict with the bound, the reduced cost of every arc, the arc
+    mask and the number of cuts and arcs added.
+    """
+    distance = np.asarray(distance, dtype=float)
+    n = len(distance)
+    arcs = arcs.copy()
+    lp = gp.Model('subtour_lp')
+    lp.Params.OutputFlag = 0
+    if setup is not None:
+        setup(lp)
+    out_rows = [lp.addLConstr(gp.LinExpr(), gp.GRB.EQUAL, 1, name=f"out_{i}") for i in range(n)]
+    in_rows = [lp.addLConstr(gp.LinExpr(), gp.GRB.EQUAL, 1, name=f"in_{j}") for j in range(n)]
+    cuts = []
+    x = {}
+
+    def add_arc(i, j):
+        rows = [out_rows[i], in_rows[j]] + [cut for members, cut in cuts if members[i] and members[j]]
+        x[i, j] = lp.addVar(ub=1, obj=distance[i, j], column=gp.Column([1] * len(rows), rows))
+
+    for i, j in np.argwhere(arcs).tolist():
+        add_arc(i, j)
+
+    added = 0
+    while True:
+        solution = optimize(lp, backend)
+        keys = list(x)
+        values = np.array(solution.getAttr("X", [x[key] for key in keys]))
+        new_cuts = _subtour_cuts(n, keys, values)
+        for members in new_cuts:
+            inside = [x[i, j] for i, j in keys if members[i] and members[j]]
+            cuts.append((members, lp.addLConstr(gp.quicksum(inside), gp.GRB.LESS_EQUAL, int(members.sum()) - 1)))
+        if new_cuts:
+            continue
+
+        reduced = distance - np.array(solution.getAttr("Pi", out_rows))[:, np.newaxis] - np.array(solution.getAttr("Pi", in_rows))[np.newaxis, :]
+        if cuts:
+            members = np.array([members for members, _ in cuts], dtype=float)
+            duals = np.array(solution.getAttr("Pi", [cut for _, cut in cuts]))
+            reduced -= members.T @ (duals[:, np.newaxis] * members)
+        np.fill_diagonal(reduced, np.inf)
+        negative = (reduced < -TOLERANCE) & ~arcs
+        if not negative.any():
+            break
+        for i, j in np.argwhere(negative).tolist():
+            add_arc(i, j)
+            arcs[i, j] = True
+            added += 1
+
+    return {"bound": solution.ObjVal, "reduced_costs": reduced, "arcs": arcs, "cuts": len(cuts), "added": added}
+
+
+def improving_arcs(reduced_costs, arcs, objective, bound):
+    """Arcs outside the model that a tour cheaper than ``objective`` could use."""
+    return np.argwhere((reduced_costs < objective - bound - TOLERANCE) & ~arcs).tolist()
@@ -0,0 +1,102 @@
+"""Construction and local search for TSP tours on a distance matrix.
+
+Tours are lists of cities starting at city 0 and are closed (the last
+city returns to the first). The matrix may be asymmetric: 2-opt prices
+the reversed segment in its new direction.
+"""
+
+import numpy as np
+
+
+def tour_length(distance, tour):
+    distance = np.asarray(distance)
+    return distance[tour, np.roll(tour, -1)].sum().item()
+
+
+def tour_arcs(tour):
+    """``(i, j)`` arcs of the closed tour."""
+    return list(zip(tour, tour[1:] + tour[:1]))
+
+
+def nearest_neighbour(distance, start=0):
+    distance = np.asarray(distance, dtype=float)
+    n = len(distance)
+    visited = np.zeros(n, dtype=bool)
+    tour = [start]
+    visited[start] = True
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, distance[tour[-1]])
+        city = int(np.argmin(row))
+        tour.append(city)
+        visited[city] = True
+    return tour
+
+
+def two_opt(distance, tour):
+    """Reverse segments while that shortens the tour (first improvement)."""
+    distance = np.asarray(distance, dtype=float)
+    tour = list(tour)
+    n = len(tour)
+    improved = True
+    while improved:
+        improved = False
+        t = np.array(tour)
+        nxt = np.roll(t, -1)
+        # forward[k] / backward[k]: cost of the arcs t[0..k] walked forwards / backwards
+        forward = np.concatenate(([0.0], np.cumsum(distance[t[:-1], t[1:]])))
+        backward = np.concatenate(([0.0], np.cumsum(distance[t[1:], t[:-1]])))
+        for i in range(n - 2):
+            # Reverse t[i+1..j]: arcs (t[i], t[i+1]) and (t[j], t[j+1]) become (t[i], t[j]) and (t[i+1], t[j+1])
+            j = np.arange(i + 2, n)
+            inner = (backward[j] - backward[i + 1]) - (forward[j] - forward[i + 1])
+            delta = (distance[t[i], t[j]] + distance[t[i + 1], nxt[j]]
+                     - distance[t[i], t[i + 1]] - distance[t[j], nxt[j]] + inner)
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                j = int(j[best])
+                tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1]
+                improved = True
+                break
+    return tour
+
+
+def or_opt(distance, tour, max_segment=3):
+    """Move chains of up to ``max_segment`` cities elsewhere while that shortens the tour."""
+    distance = np.asarray(distance, dtype=float)
+    tour = list(tour)
+    n = len(tour)
+    improved = True
+    while improved:
+        improved = False
+        for length in range(1, min(max_segment, n - 2) + 1):
+            for start in range(1, n - length + 1):
+                segment = tour[start:start + length]
+                prev, after = tour[start - 1], tour[(start + length) % n]
+                removed = distance[prev, segment[0]] + distance[segment[-1], after] - distance[prev, after]
+                rest = tour[:start] + tour[start + length:]
+                a = np.array(rest)
+                b = np.roll(a, -1)
+                added = distance[a, segment[0]] + distance[segment[-1], b] - distance[a, b]
+                k = int(np.argmin(added))
+                if added[k] < removed - 1e-9:
+                    tour = rest[:k + 1] + segment + rest[k + 1:]
+                    improved = True
+                    break
+            if improved:
+                break
+    return tour
+
+
+def heuristic_tour(distance):
+    """Nearest neighbour from city 0 improved by 2-opt and Or-opt until neither helps.
+
+    Returns the tour and its length.
+    """
+    tour = nearest_neighbour(distance)
+    length = tour_length(distance, tour)
+    while True:
+        tour = or_opt(distance, two_opt(distance, tour))
+        new_length = tour_length(distance, tour)
+        if new_length >= length - 1e-9:
+            return tour, new_length
+        length = new_length
@@ -0,0 +1,204 @@
+"""Parameter tuning per problem: search Gurobi settings and keep the best-known one.
+
+Usage::
+
+    python -m comun.tuning CSP --trials 12 --sizes 20 40 --seeds 2 --time-limit 30
+    python -m comun.tuning CFLP --trials 8 --no-save
+
+Each trial is a set of ``SEARCH_SPACE`` values (the defaults always come
+first, then a seeded random sample). Every trial solves the problem's
+``Data*.json`` instances and, for each size and seed, a generated
+instance (see ``comun.generators``), with the script's usual command line
+plus ``--param`` arguments and without the tuned parameters already
+stored. During each solve the incumbent and bound are logged over time
+(see ``comun.backend.track_progress``), and each run gets two measures:
+
+- time to optimal: the solver time of all the run's solves (column
+  generation and re-solve loops solve several models) if the run was
+  proven optimal, ``PENALTY`` times the time limit otherwise;
+- primal-dual integral: the relative gap between incumbent and bound
+  integrated over the time limit and divided by it (0 for a run that is
+  optimal at once, 1 for a run that never finds a solution).
+
+Trials are ranked by the shifted geometric mean of the time to optimal,
+then by the mean integral. The best one is stored with its scores in
+``comun/tuned_params.json`` (see ``comun.params``), which the scripts
+load from then on, unless ``--no-save`` is given. Every run is written to
+``--output`` as one JSON line.
+"""
+
+import argparse
+import glob
+import itertools
+import json
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import gurobipy as gp
+
+from comun import backend
+from comun.batch import SCRIPTS, solve_instance
+from comun.generators import dump_instance, generate
+from comun.params import TUNED_PARAMS, save_tuned_params, tuned_params
+from comun.results import status_name
+
+# Values tried for each parameter; the first one is Gurobi's default
+SEARCH_SPACE = {
+    "MIPFocus": [0, 1, 2, 3],
+    "Cuts": [-1, 0, 1, 2],
+    "Presolve": [-1, 0, 2],
+    "Heuristics": [0.05, 0.2, 0.5],
+    "Symmetry": [-1, 0, 2],
+}
+# Time to optimal charged to a run that is not proven optimal, in time limits (PAR2)
+PENALTY = 2
+# Shift of the geometric mean, in seconds, so that very short runs do not dominate
+SHIFT = 1.0
+
+OPTIMAL = status_name(gp.GRB.OPTIMAL)
+
+
+def trials(count, seed=0):
+    """The default settings followed by ``count - 1`` distinct random points of ``SEARCH_SPACE``."""
+    names = sorted(SEARCH_SPACE)
+    points = list(itertools.product(*(SEARCH_SPACE[name] for name in names)))
+    random.Random(seed).shuffle(points)
+    chosen = [{}]
+    for point in points:
+        if len(chosen) >= count:
+            break
+        params = {name: value for name, value in zip(names, point) if value != SEARCH_SPACE[name][0]}
+        if params not in chosen:
+            chosen.append(params)
+    return chosen
+
+
+def primal_dual_integral(progress, runtime, horizon):
+    """Relative gap between incumbent and bound integrated over ``horizon`` seconds, divided by it."""
+    if not progress:
+        return 0.0 if runtime is not None else 1.0
+    integral, time, gap = 0.0, 0.0, 1.0
+    for point_time, incumbent, bound in progress:
+        point_time = min(point_time, horizon)
+        integral += gap * (point_time - time)
+        time = point_time
+        if abs(incumbent) >= gp.GRB.INFINITY:
+            gap = 1.0
+        else:
+            gap = min(1.0, abs(incumbent - bound) / max(abs(incumbent), abs(bound), 1e-9))
+    integral += gap * (horizon - time)
+    return integral / horizon
+
+
+def tune_instance(problem, data, params, threads, time_limit, log_path):
+    """Worker: solve one instance with ``params`` and add the tuning measures."""
+    progress = []
+    backend.track_progress(progress)
+    script_argv = ["--time-limit", str(time_limit), "--no-tuned-params"]
+    for name, value in params.items():
+        script_argv += ["--param", f"{name}={value}"]
+    record = solve_instance(problem, data, threads, log_path, script_argv)
+    record.pop("variables", None)
+    record["params"] = params
+    record["progress"] = progress
+    optimal = record["status"] == OPTIMAL
+    record["solver_time"] = backend.tracked_time()
+    record["time_to_optimal"] = record["solver_time"] if optimal else PENALTY * time_limit
+    record["primal_dual_integral"] = 0.0 if optimal and not progress else primal_dual_integral(progress, record.get("runtime"), time_limit)
+    return record
+
+
+def score(records):
+    """(shifted geometric mean of the time to optimal, mean primal-dual integral, optimal runs) of one trial."""
+    if any(record["status"] == "Error" for record in records):
+        return math.inf, math.inf, 0
+    times = [record["time_to_optimal"] for record in records]
+    geometric = math.exp(sum(math.log(t + SHIFT) for t in times) / len(times)) - SHIFT
+    integral = sum(record["primal_dual_integral"] for record in records) / len(records)
+    return geometric, integral, sum(record["status"] == OPTIMAL for record in records)
+
+
+def _label(params):
+    return ", ".join(f"{name}={value}" for name, value in sorted(params.items())) or "(por defecto)"
+
+
+def run_tuning(problem, output, trial_count=8, sizes=(), seeds=1, time_limit=60, workers=1, threads=1, save=True, seed=0):
+    """Evaluate ``trial_count`` parameter sets on the problem's instances; returns the stored entry."""
+    directory = os.path.dirname(SCRIPTS[problem])
+    instances = sorted(glob.glob(os.path.join(directory, "Data*.json")))
+    generated = output + ".instances"
+    logs = output + ".logs"
+    os.makedirs(generated, exist_ok=True)
+    os.makedirs(logs, exist_ok=True)
+    for size in sizes:
+        for instance_seed in range(seeds):
+            path = os.path.join(generated, f"{problem}_{size}_{instance_seed}.json")
+            dump_instance(generate(problem, size, instance_seed), path)
+            instances.append(path)
+
+    candidates = trials(trial_count, seed)
+    jobs = []
+    for index, params in enumerate(candidates):
+        for data in instances:
+            stem = os.path.splitext(os.path.basename(data))[0]
+            jobs.append((problem, data, params, threads, time_limit, os.path.join(logs, f"{index}_{stem}.log")))
+
+    results = {index: [] for index in range(len(candidates))}
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as pool, open(output, "w") as f:
+        for job, record in zip(jobs, pool.map(tune_instance, *zip(*jobs))):
+            index = candidates.index(job[2])
+            record["trial"] = index
+            results[index].append(record)
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+
+    # Instances that fail with the default settings (a Data file in another
+    # schema) say nothing about the parameters
+    broken = {record["instance"] for record in results[0] if record["status"] == "Error"}
+    scores = {index: score([record for record in records if record["instance"] not in broken])
+              for index, records in results.items()}
+    print("ensayo\tóptimas\ttiempo (media geom.)\tintegral\tparámetros")
+    for index in sorted(scores, key=lambda index: scores[index][:2]):
+        geometric, integral, optimal = scores[index]
+        print(f"{index}\t{optimal}/{len(instances) - len(broken)}\t{geometric:.3f}\t{integral:.4f}\t{_label(candidates[index])}")
+
+    best = min(scores, key=lambda index: scores[index][:2])
+    entry = {
+        "params": candidates[best],
+        "score": scores[best][0],
+        "primal_dual_integral": scores[best][1],
+        "default_score": scores[0][0],
+        "instances": len(instances) - len(broken),
+        "time_limit": time_limit,
+        "trials": len(candidates),
+    }
+    print(f"Mejor configuración para {problem}: {_label(entry['params'])} "
+          f"({entry['score']:.3f} s frente a {entry['default_score']:.3f} s por defecto)")
+    if save:
+        previous = tuned_params(problem)
+        save_tuned_params(problem, entry)
+        print(f"Guardada en {TUNED_PARAMS} (antes: {_label(previous)})")
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Busca los parámetros de Gurobi con los que mejor se resuelve un problema.")
+    parser.add_argument("problem", choices=sorted(SCRIPTS), help="problema a ajustar")
+    parser.add_argument("--trials", type=int, default=8, help="configuraciones evaluadas, incluida la por defecto")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[], help="tamaños de las instancias generadas que se añaden a los Data*.json")
+    parser.add_argument("--seeds", type=int, default=1, help="instancias generadas por tamaño")
+    parser.add_argument("--time-limit", type=float, default=60, help="límite de tiempo por ejecución en segundos")
+    parser.add_argument("--workers", type=int, default=1, help="procesos en paralelo (1 para tiempos comparables)")
+    parser.add_argument("--threads", type=int, default=1, help="hilos del solver por ejecución")
+    parser.add_argument("--seed", type=int, default=0, help="semilla del muestreo de configuraciones")
+    parser.add_argument("--output", default="tuning.jsonl", help="fichero JSON Lines con una línea por ejecución")
+    parser.add_argument("--no-save", dest="save", action="store_false", help="no guardar la mejor configuración")
+    args = parser.parse_args()
+    run_tuning(args.problem, args.output, args.trials, args.sizes, args.seeds, args.time_limit, args.workers,
+               args.threads, args.save, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Savings construction and local search for VRP routes on a distance matrix.
+
+City 0 is the depot. A route is the list of customers a vehicle visits
+between leaving and returning to the depot. The models require exactly
+``vehicles`` non-empty routes, so the heuristics keep that count fixed.
+"""
+
+import numpy as np
+
+from comun.tsp_heuristics import or_opt, two_opt
+
+
+def route_cost(distance, route):
+    stops = [0] + list(route) + [0]
+    return sum(distance[a][b] for a, b in zip(stops, stops[1:]))
+
+
+def route_arcs(route):
+    """``(i, j)`` arcs of the route, depot included."""
+    stops = [0] + list(route) + [0]
+    return list(zip(stops, stops[1:]))
+
+
+def savings_routes(distance, vehicles):
+    """Clarke-Wright savings merged down to exactly ``vehicles`` routes.
+
+    Routes are joined end to start in decreasing order of the saving
+    d[i][0] + d[0][j] - d[i][j], which also covers asymmetric matrices.
+    Merging stops at ``vehicles`` routes and continues past negative
+    savings if more routes than vehicles are left.
+    """
+    distance = np.asarray(distance, dtype=float)
+    n = len(distance)
+    if not 1 <= vehicles <= n - 1:
+        raise ValueError(f"Se necesitan entre 1 y {n - 1} vehículos, hay {vehicles}")
+    customers = np.arange(1, n)
+    savings = distance[customers, 0][:, None] + distance[0, customers][None, :] - distance[np.ix_(customers, customers)]
+    np.fill_diagonal(savings, -np.inf)
+    order = np.argsort(savings, axis=None)[::-1]
+
+    routes = {c: [c] for c in customers.tolist()}
+    route_of = {c: c for c in customers.tolist()}
+    for flat in order:
+        if len(routes) == vehicles:
+            break
+        i, j = (int(k) + 1 for k in np.unravel_index(flat, savings.shape))
+        a, b = route_of[i], route_of[j]
+        if a == b or routes[a][-1] != i or routes[b][0] != j:
+            continue
+        routes[a].extend(routes[b])
+        for c in routes.pop(b):
+            route_of[c] = a
+    return list(routes.values())
+
+
+def improve_route(distance, route):
+    """2-opt and Or-opt on a single route with the depot fixed in front."""
+    tour = or_opt(distance, two_opt(distance, [0] + list(route)))
+    return tour[1:]
+
+
+def _best_insertion(distance, route, city):
+    # Cheapest position to insert city into route and its extra cost
+    stops = [0] + route + [0]
+    costs = [distance[a][city] + distance[city][b] - distance[a][b] for a, b in zip(stops, stops[1:])]
+    k = int(np.argmin(costs))
+    return k, costs[k]
+
+
+def relocate(distance, routes):
+    """Move one customer to its cheapest position in another route; True if a move was made."""
+    for a, route in enumerate(routes):
+        if len(route) == 1:
+            continue
+        for position, city in enumerate(route):
+            rest = route[:position] + route[position + 1:]
+            gain = route_cost(distance, route) - route_cost(distance, rest)
+            for b, other in enumerate(routes):
+                if b == a:
+                    continue
+                k, extra = _best_insertion(distance, other, city)
+                if extra < gain - 1e-9:
+                    routes[a] = rest
+                    routes[b] = other[:k] + [city] + other[k:]
+                    return True
+    return False
+
+
+def exchange(distance, routes):
+    """Swap two customers of different routes; True if a swap was made."""
+    costs = [route_cost(distance, route) for route in routes]
+    for a in range(len(routes)):
+        for b in range(a + 1, len(routes)):
+            for p in range(len(routes[a])):
+                for q in range(len(routes[b])):
+                    new_a = routes[a][:p] + [routes[b][q]] + routes[a][p + 1:]
+                    new_b = routes[b][:q] + [routes[a][p]] + routes[b][q + 1:]
+                    if route_cost(distance, new_a) + route_cost(distance, new_b) < costs[a] + costs[b] - 1e-9:
+                        routes[a], routes[b] = new_a, new_b
+                        return True
+    return False
+
+
+def heuristic_routes(distance, vehicles):
+    """Savings routes improved by 2-opt/Or-opt within routes and relocate/exchange between them.
+
+    Returns the routes and their total cost.
+    """
+    routes = [improve_route(distance, route) for route in savings_routes(distance, vehicles)]
+    while relocate(distance, routes) or exchange(distance, routes):
+        routes = [improve_route(distance, route) for route in routes]
+    return routes, sum(route_cost(distance, route) for route in routes)
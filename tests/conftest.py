@@ -0,0 +1,35 @@
+"""The tests run the scripts of ``comun.batch.SCRIPTS`` on their bundled Data*.json instances."""
+
+import glob
+import os
+import sys
+
+import gurobipy as gp
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from comun.batch import SCRIPTS, redirect_output, run_script
+
+
+def data_files(problem, pattern="Data*.json"):
+    return sorted(glob.glob(os.path.join(os.path.dirname(SCRIPTS[problem]), pattern)))
+
+
+@pytest.fixture
+def solve():
+    """``solve(problem, data, "NAME=VALUE", ...)`` runs the script with those modes and returns its globals."""
+    def solve(problem, data, *modes):
+        script_argv = ["--threads", "1", "--no-model-cache", "--no-tuned-params"]
+        for mode in modes:
+            script_argv += ["--mode", mode]
+        try:
+            with redirect_output(os.devnull):
+                return run_script(problem, data, script_argv)
+        except gp.GurobiError as error:
+            # The pip license stops at 2000 variables or constraints
+            if "size-limited" in str(error):
+                pytest.skip(f"{os.path.basename(data)} no cabe en la licencia restringida")
+            raise
+    return solve
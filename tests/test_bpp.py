@@ -0,0 +1,42 @@
+import math
+
+import gurobipy as gp
+import pytest
+
+from comun.generators import dump_instance, generate
+from comun.results import status_name
+from conftest import data_files
+
+
+@pytest.mark.parametrize("data", data_files("BPP"))
+def test_set_covering_matches_assignment(solve, data):
+    assignment = solve("BPP", data, "SOLVE_MODE=assignment", "HEURISTIC_PRESOLVE=False")["solving_info"]
+    set_covering = solve("BPP", data, "SOLVE_MODE=set_covering", "HEURISTIC_PRESOLVE=False")["solving_info"]
+    assert set_covering["objective_value"] == pytest.approx(assignment["objective_value"])
+
+
+@pytest.mark.parametrize("data", data_files("BPP"))
+def test_l2_bound_below_heuristics(solve, data):
+    script = solve("BPP", data, "SOLVE_MODE=set_covering", "HEURISTIC_PRESOLVE=False")
+    sizes, capacity = list(script["ItemSizes"]), script["BinCapacity"]
+    lower_bound = script["martello_toth_l2"](sizes, capacity)
+    optimum = script["solving_info"]["objective_value"]
+    for heuristic in (script["first_fit_decreasing"], script["best_fit_decreasing"]):
+        bins = heuristic(sizes, capacity)
+        assert sorted(i for packed in bins for i in packed) == list(range(len(sizes)))
+        assert all(sum(sizes[i] for i in packed) <= capacity for packed in bins)
+        assert lower_bound <= optimum + 1e-6 <= len(bins) + 1e-6
+
+
+def test_set_covering_above_the_lp_bound_is_not_optimal(solve, tmp_path):
+    # The generated patterns of this instance only pack it in 16 bins; the optimum is 15
+    data = str(tmp_path / "bpp.json")
+    dump_instance(generate("BPP", 25, 37), data)
+    set_covering = solve("BPP", data, "SOLVE_MODE=set_covering", "HEURISTIC_PRESOLVE=False")["solving_info"]
+    assignment = solve("BPP", data, "SOLVE_MODE=assignment", "HEURISTIC_PRESOLVE=False")["solving_info"]
+    assert assignment["status"] == status_name(gp.GRB.OPTIMAL)
+    certified = set_covering["objective_value"] <= math.ceil(set_covering["lp_bound"] - 1e-6)
+    assert set_covering["status"] == status_name(gp.GRB.OPTIMAL if certified else gp.GRB.SUBOPTIMAL)
+    assert set_covering["objective_value"] >= assignment["objective_value"]
+    if set_covering["objective_value"] > assignment["objective_value"]:
+        assert not certified
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from comun.candidates import cheapest_arcs
+from comun.generators import dump_instance, generate
+from conftest import data_files
+
+
+def test_cheapest_arcs():
+    cost = np.array([[3, 1, 5], [1, 2, 4], [2, 3, 6]])
+    assert cheapest_arcs(cost, 1).tolist() == [[False, True, False], [True, False, True], [False, False, False]]
+    assert cheapest_arcs(cost, 2).sum(axis=0).tolist() == [2, 2, 2]
+    assert cheapest_arcs(cost, 3).all()
+
+
+def generated(tmp_path, seed):
+    path = str(tmp_path / f"cflp_{seed}.json")
+    dump_instance(generate("CFLP", 30, seed), path)
+    return path
+
+
+def check_sparse(solve, data, k):
+    dense = solve("CFLP", data, "BUILD_MODE=matrix")
+    relaxation = dense["model"].relax()
+    relaxation.optimize()
+    sparse = solve("CFLP", data, "BUILD_MODE=sparse", f"CANDIDATE_ARCS={k}")
+    assert sparse["pricing"]["certified"]
+    assert sparse["solving_info"]["objective_value"] == pytest.approx(dense["solving_info"]["objective_value"])
+    assert sparse["pricing"]["lp_bound"] == pytest.approx(relaxation.ObjVal)
+
+
+@pytest.mark.parametrize("k", [1, 2])
+@pytest.mark.parametrize("data", data_files("CFLP"))
+def test_sparse_matches_dense(solve, data, k):
+    check_sparse(solve, data, k)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_sparse_matches_dense_generated(solve, tmp_path, seed):
+    check_sparse(solve, generated(tmp_path, seed), 1)
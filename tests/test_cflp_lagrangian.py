@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+
+import gurobipy as gp
+import numpy as np
+import pytest
+
+from comun.instances import load_instance
+from comun.results import status_name
+from conftest import ROOT, data_files
+
+sys.path.insert(0, os.path.join(ROOT, "SegundaIteración", "CFLP"))
+import CFLPLagrangian
+
+
+def lagrangian(data, Capacity=None):
+    data = load_instance(data)
+    return CFLPLagrangian.solve(data["TransportCost"], data["OpeningCost"], data["Demand"],
+                                data["Capacity"] if Capacity is None else Capacity)
+
+
+def check_solution(data, result, Capacity=None):
+    data = load_instance(data)
+    Capacity = np.asarray(data["Capacity"] if Capacity is None else Capacity, dtype=float)
+    shipped, opened = result["shipped"], result["open"]
+    assert shipped.sum(axis=0) == pytest.approx(np.asarray(data["Demand"], dtype=float))
+    assert np.all(shipped.sum(axis=1) <= Capacity * opened + 1e-6)
+    cost = np.asarray(data["OpeningCost"]) @ opened + (np.asarray(data["TransportCost"]) * shipped).sum()
+    assert cost == pytest.approx(result["upper_bound"])
+
+
+@pytest.mark.parametrize("data", data_files("CFLP"))
+def test_bounds_enclose_the_mip_optimum(solve, data):
+    optimum = solve("CFLP", data, "SOLVE_MODE=mip")["solving_info"]["objective_value"]
+    result = lagrangian(data)
+    assert result["lower_bound"] <= optimum + 1e-6
+    assert result["upper_bound"] >= optimum - 1e-6
+    check_solution(data, result)
+
+
+def test_zero_capacity_facility():
+    data = data_files("CFLP", "Data5.json")[0]
+    Capacity = np.asarray(load_instance(data)["Capacity"], dtype=float)
+    Capacity[0] = 0
+    with np.errstate(all="raise"):
+        result = lagrangian(data, Capacity)
+    assert np.isfinite(result["lower_bound"]) and not result["open"][0]
+    assert result["lower_bound"] <= result["upper_bound"] + 1e-6
+    check_solution(data, result, Capacity)
+
+
+def test_zero_cost_instance(solve, tmp_path):
+    data = load_instance(data_files("CFLP", "Data3.json")[0])
+    data["TransportCost"] = np.zeros_like(np.asarray(data["TransportCost"])).tolist()
+    data["OpeningCost"] = [0] * len(data["OpeningCost"])
+    path = str(tmp_path / "free.json")
+    with open(path, "w") as f:
+        json.dump(data, f)
+    solving_info = solve("CFLP", path, "SOLVE_MODE=lagrangian")["solving_info"]
+    assert solving_info["status"] == status_name(gp.GRB.OPTIMAL)
+    assert solving_info["objective_value"] == 0
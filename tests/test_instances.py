@@ -0,0 +1,46 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from comun.batch import SCRIPTS
+from comun.instances import binary_path, convert, load_instance
+from conftest import data_files
+
+ALL_DATA = [data for problem in sorted(SCRIPTS) for data in data_files(problem)]
+
+
+@pytest.mark.parametrize("data", ALL_DATA)
+def test_round_trip(tmp_path, data):
+    with open(data, "r") as f:
+        original = json.load(f)
+    binary = load_instance(convert(data, str(tmp_path / "instance.inst")))
+    assert sorted(binary) == sorted(original)
+    for key, value in original.items():
+        assert np.array_equal(np.asarray(binary[key]), np.asarray(value)), key
+        if np.ndim(value):
+            assert isinstance(binary[key], np.memmap)
+
+
+def test_sibling_only_on_request(tmp_path):
+    data = str(tmp_path / "Data.json")
+    shutil.copy(data_files("TSP", "Data5.json")[0], data)
+    convert(data)
+    assert isinstance(load_instance(data)["Distance"], list)
+    assert isinstance(load_instance(data, prefer_binary=True)["Distance"], np.memmap)
+    # A JSON file edited after the conversion wins over its sibling
+    header = os.path.join(binary_path(data), "header.json")
+    os.utime(data, (os.path.getmtime(header) + 10,) * 2)
+    assert isinstance(load_instance(data, prefer_binary=True)["Distance"], list)
+
+
+@pytest.mark.parametrize("problem", sorted(SCRIPTS))
+def test_scripts_solve_binary_instances(solve, tmp_path, problem):
+    data = data_files(problem, "Data3.json")[0]
+    binary = convert(data, str(tmp_path / "instance.inst"))
+    from_json = solve(problem, data)["solving_info"]
+    from_binary = solve(problem, binary)["solving_info"]
+    assert from_binary["status"] == from_json["status"]
+    assert from_binary["objective_value"] == pytest.approx(from_json["objective_value"])
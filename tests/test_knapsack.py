@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+import pytest
+
+from conftest import ROOT, data_files
+
+sys.path.insert(0, os.path.join(ROOT, "PrimeraIteración", "Knapsack"))
+import KnapsackDP
+
+
+@pytest.mark.parametrize("data", data_files("Knapsack"))
+def test_dp_matches_mip(solve, data):
+    dp = solve("Knapsack", data, "SOLVER=dp")["solving_info"]
+    mip = solve("Knapsack", data, "SOLVER=gurobi")["solving_info"]
+    assert dp["objective_value"] == pytest.approx(mip["objective_value"])
+
+
+def test_batch_matches_single_solves():
+    instances = []
+    for path in data_files("Knapsack"):
+        with open(path, "r") as f:
+            instances.append(json.load(f))
+    best, selected = KnapsackDP.solve_batch(instances)
+    for b, data in enumerate(instances):
+        value, items = KnapsackDP.solve(data["Values"], data["Weights"], data["MaxCapacity"])
+        assert best[b] == value
+        assert selected[b].nonzero()[0].tolist() == items
+        assert sum(data["Weights"][i] for i in items) <= data["MaxCapacity"]
+        assert sum(data["Values"][i] for i in items) == value
+
+
+def test_empty_batch():
+    best, selected = KnapsackDP.solve_batch([])
+    assert best.shape == (0,) and selected.shape == (0, 0)
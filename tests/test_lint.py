@@ -0,0 +1,62 @@
+import gurobipy as gp
+import pytest
+
+from comun.lint import clean_model
+from conftest import data_files
+
+
+def small_model():
+    model = gp.Model()
+    model.Params.OutputFlag = 0
+    x = model.addVars(3, ub=10, name="x")
+    y = model.addVar(vtype=gp.GRB.BINARY, name="y")
+    model.addConstr(x[0] + x[1] + x[2] <= 12, name="capacity")
+    model.addConstr(2 * x[0] + 2 * x[1] + 2 * x[2] <= 30, name="scaled_capacity")
+    model.addConstr(-x[0] - x[1] - x[2] >= -12, name="flipped_capacity")
+    model.addConstr(x[0] + x[1] >= 3 * y, name="linking")
+    model.addConstr(gp.LinExpr() <= 1, name="empty")
+    model.addConstr(x[0] <= 8, name="bound")
+    model.addConstr(x[1] <= 20, name="loose_bound")
+    model.addConstr(x[0] + x[2] <= 25, name="implied")
+    model.setObjective(-x[0] - 2 * x[1] - 3 * x[2] + y)
+    return model, x
+
+
+def test_clean_model_report():
+    model, x = small_model()
+    report = clean_model(model, verbose=False)
+    assert report["constant"] == ["empty"]
+    assert sorted(report["duplicate"]) == ["flipped_capacity", "scaled_capacity"]
+    assert report["bound"] == ["bound"]
+    assert report["redundant_bound"] == ["loose_bound"]
+    assert report["implied"] == ["implied"]
+    assert report["infeasible"] == []
+    assert [constr.ConstrName for constr in model.getConstrs()] == ["capacity", "linking"]
+    assert x[0].UB == 8
+
+
+def test_clean_model_keeps_the_optimum():
+    model, _ = small_model()
+    model.optimize()
+    before = model.ObjVal
+    clean_model(model, verbose=False)
+    model.optimize()
+    assert model.ObjVal == pytest.approx(before)
+
+
+def test_infeasible_rows_are_kept():
+    model = gp.Model()
+    model.Params.OutputFlag = 0
+    x = model.addVar(name="x")
+    model.addConstr(gp.LinExpr() >= 1, name="impossible")
+    model.addConstr(x + 0 * x >= 0, name="x_nonnegative")
+    report = clean_model(model, verbose=False)
+    assert report["infeasible"] == ["impossible"]
+    assert [constr.ConstrName for constr in model.getConstrs()] == ["impossible"]
+
+
+@pytest.mark.parametrize("data", data_files("TSP"))
+def test_cleaning_keeps_the_tsp_optimum(solve, data):
+    cleaned = solve("TSP", data, "CLEAN_MODEL=True")["solving_info"]
+    raw = solve("TSP", data, "CLEAN_MODEL=False")["solving_info"]
+    assert cleaned["objective_value"] == pytest.approx(raw["objective_value"])
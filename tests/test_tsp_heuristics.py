@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from comun.generators import generate
+from comun.instances import load_instance
+from comun.tsp_heuristics import heuristic_tour, nearest_neighbour, or_opt, tour_length, two_opt
+from conftest import data_files
+
+
+def is_tour(tour, n):
+    return tour[0] == 0 and sorted(tour) == list(range(n))
+
+
+@pytest.mark.parametrize("data", data_files("TSP"))
+def test_heuristic_tour_bounds_the_optimum(solve, data):
+    Distance = load_instance(data)["Distance"]
+    tour, length = heuristic_tour(Distance)
+    assert is_tour(tour, len(Distance))
+    assert length == pytest.approx(tour_length(Distance, tour))
+    optimum = solve("TSP", data, "WARM_START=False")["solving_info"]["objective_value"]
+    warm = solve("TSP", data, "WARM_START=True")["solving_info"]["objective_value"]
+    assert warm == pytest.approx(optimum)
+    assert length >= optimum - 1e-6
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_local_search_never_lengthens_asymmetric_tours(seed):
+    rng = np.random.default_rng(seed)
+    Distance = rng.integers(1, 100, (30, 30)).astype(float)
+    np.fill_diagonal(Distance, 0)
+    tour = nearest_neighbour(Distance)
+    length = tour_length(Distance, tour)
+    for search in (two_opt, or_opt):
+        improved = search(Distance, tour)
+        assert is_tour(improved, 30)
+        assert tour_length(Distance, improved) <= length + 1e-9
+
+
+def test_generated_instance():
+    Distance = generate("TSP", 40, 0)["Distance"]
+    tour, length = heuristic_tour(Distance)
+    assert is_tour(tour, 40)
+    assert length <= tour_length(Distance, nearest_neighbour(Distance)) + 1e-9
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from comun.instances import load_instance
+from comun.vrp_heuristics import heuristic_routes, route_cost, savings_routes
+from conftest import data_files
+
+
+def check_routes(routes, n, vehicles):
+    assert len(routes) == vehicles and all(routes)
+    assert sorted(city for route in routes for city in route) == list(range(1, n))
+
+
+@pytest.mark.parametrize("data", data_files("VRP"))
+def test_heuristic_routes_bound_the_optimum(solve, data):
+    instance = load_instance(data)
+    Distance, M = instance["Distance"], instance["M"]
+    check_routes(savings_routes(Distance, M), len(Distance), M)
+    routes, cost = heuristic_routes(Distance, M)
+    check_routes(routes, len(Distance), M)
+    assert cost == pytest.approx(sum(route_cost(Distance, route) for route in routes))
+    optimum = solve("VRP", data, "WARM_START=False")["solving_info"]["objective_value"]
+    warm = solve("VRP", data, "WARM_START=True")["solving_info"]["objective_value"]
+    assert warm == pytest.approx(optimum)
+    assert cost >= optimum - 1e-6
+
+
+@pytest.mark.parametrize("vehicles", [1, 3, 9])
+def test_savings_keep_the_vehicle_count(vehicles):
+    rng = np.random.default_rng(vehicles)
+    Distance = rng.integers(1, 100, (10, 10)).astype(float)
+    np.fill_diagonal(Distance, 0)
+    check_routes(savings_routes(Distance, vehicles), 10, vehicles)
+    routes, _ = heuristic_routes(Distance, vehicles)
+    check_routes(routes, 10, vehicles)
+
+
+def test_too_many_vehicles():
+    with pytest.raises(ValueError):
+        savings_routes(np.ones((4, 4)), 4)